@@ -0,0 +1,140 @@
+"""
+Compares decoding gateway payloads as JSON and as ETF.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+Usage:
+    python benchmarks/gateway_encoding.py [recording.jsonl]
+
+A recording is one gateway payload (as JSON) per line, captured from a real connection.
+Without one, a few made up MESSAGE_CREATE, GUILD_CREATE and PRESENCE_UPDATE payloads are used.
+"""
+
+import json
+import sys
+import timeit
+import zlib
+
+from inkcord import codec, etf
+
+
+def _snowflakes_to_ints(term):
+    """Discord sends snowflakes as big ints over ETF (and as strings over JSON), so the recording is converted the same way."""
+    if isinstance(term, dict):
+        return {key: _snowflakes_to_ints(value) for key, value in term.items()}
+    if isinstance(term, list):
+        return [_snowflakes_to_ints(item) for item in term]
+    if isinstance(term, str) and term.isdigit() and len(term) >= 17:
+        return int(term)
+    return term
+
+
+def _sample_payloads() -> list[dict]:
+    user = {
+        "id": "80351110224678912",
+        "username": "inkcord",
+        "global_name": "Inkcord",
+        "avatar": "8342729096ea3675442027381ff50dfe",
+        "discriminator": "0",
+        "public_flags": 64,
+        "bot": False,
+    }
+    message = {
+        "op": 0,
+        "s": 42,
+        "t": "MESSAGE_CREATE",
+        "d": {
+            "id": "1234567890123456789",
+            "channel_id": "1234567890123456000",
+            "guild_id": "1234567890123450000",
+            "author": user,
+            "content": "hello there, this is a fairly normal message " * 3,
+            "timestamp": "2025-01-01T00:00:00.000000+00:00",
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [user],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+            "flags": 0,
+            "member": {"roles": ["1234567890123450001"], "nick": None, "deaf": False, "mute": False},
+        },
+    }
+    guild = {
+        "op": 0,
+        "s": 2,
+        "t": "GUILD_CREATE",
+        "d": {
+            "id": "1234567890123450000",
+            "name": "a guild",
+            "owner_id": "80351110224678912",
+            "member_count": 500,
+            "roles": [
+                {"id": str(1234567890123450000 + i), "name": f"role {i}", "permissions": "2248473465835073", "position": i, "color": 0}
+                for i in range(30)
+            ],
+            "channels": [
+                {"id": str(1234567890123460000 + i), "name": f"channel-{i}", "type": 0, "position": i, "topic": None}
+                for i in range(50)
+            ],
+            "members": [
+                {"user": dict(user, id=str(80351110224670000 + i)), "roles": [], "joined_at": "2025-01-01T00:00:00+00:00"}
+                for i in range(100)
+            ],
+        },
+    }
+    presence = {
+        "op": 0,
+        "s": 7,
+        "t": "PRESENCE_UPDATE",
+        "d": {
+            "user": {"id": "80351110224678912"},
+            "guild_id": "1234567890123450000",
+            "status": "online",
+            "activities": [{"name": "a game", "type": 0, "created_at": 1735689600000}],
+            "client_status": {"desktop": "online"},
+        },
+    }
+    return [message] * 20 + [presence] * 20 + [guild]
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            payloads = [json.loads(line) for line in f if line.strip()]
+    else:
+        payloads = _sample_payloads()
+
+    json_frames = [codec.dumps(payload) for payload in payloads]
+    etf_frames = [etf.dumps(_snowflakes_to_ints(payload)) for payload in payloads]
+    assert [etf.loads(frame) for frame in etf_frames] == [
+        _snowflakes_to_ints(codec.loads(frame)) for frame in json_frames
+    ]
+
+    print(f"{len(payloads)} payloads, json codec: {codec.get_codec().name}, etf accelerated: {etf.ACCELERATED}")
+    for name, frames, decode in (
+        ("json", json_frames, codec.loads),
+        ("etf", etf_frames, etf.loads),
+    ):
+        raw = sum(len(frame) for frame in frames)
+        compressor = zlib.compressobj()
+        compressed = sum(len(compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)) for frame in frames)
+        runs = 20
+        seconds = timeit.timeit(lambda: [decode(frame) for frame in frames], number=runs) / runs
+        print(
+            f"{name:>4}: {raw:>9} bytes raw, {compressed:>8} bytes zlib-stream, "
+            f"{seconds * 1000:8.2f}ms to decode, {raw / seconds / 1e6:7.1f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+A response cache for read only REST routes.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import collections
+import threading
+import time
+import typing
+
+DEFAULT_TTLS: dict[str, float] = {
+    "guilds/:id": 60,
+    "guilds/:id/channels": 30,
+    "users/:id": 300,
+    "users/@me/guilds": 60,
+}
+"""Seconds a response stays fresh, by route template. Routes that aren't in here never get cached."""
+
+
+def route_template(route: str) -> str:
+    """Replaces every id in a route with `:id`, and drops the query string. `guilds/1?with_counts=true` -> `guilds/:id`"""
+    return "/".join(
+        ":id" if segment.isdigit() else segment
+        for segment in route.split("?")[0].strip("/").split("/")
+    )
+
+
+class CacheEntry:
+    def __init__(self, response: typing.Any, expires_at: float):
+        self.response = response
+        self.expires_at = expires_at
+        """`time.monotonic()` timestamp for when this entry goes stale."""
+        self.etag: str | None = response.headers.get("ETag")
+
+
+class ResponseCache:
+    """An LRU cache of GET responses, keyed by route (including the query string).
+    Anything sent with another method to a route drops the cached copies of that route, the routes under it and the collection it's in.
+    Subclass this and override `get`/`set`/`invalidate` to plug in a different store.
+
+    To turn caching off, pass `ResponseCache(ttls={})` to the client.
+    """
+
+    def __init__(self, max_size: int = 1024, ttls: dict[str, float] | None = None):
+        self.max_size = max_size
+        """The max number of responses kept, the least recently used one is dropped first."""
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        """Seconds a response stays fresh, by route template (see `route_template`). A copy, so changing it only affects this cache."""
+        self._entries: collections.OrderedDict[str, CacheEntry] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.revalidated: int = 0
+        """How many stale responses were kept after discord answered a conditional request with 304."""
+
+    def cacheable(self, route: str) -> bool:
+        return route_template(route) in self.ttls
+
+    def get(self, route: str) -> CacheEntry | None:
+        """Returns the entry for a route, fresh or stale, or None. Use `CacheEntry.expires_at` to tell which."""
+        with self._lock:
+            entry = self._entries.get(route)
+            if entry is None or entry.expires_at <= time.monotonic():
+                self.misses += 1
+            else:
+                self.hits += 1
+            if entry is not None:
+                self._entries.move_to_end(route)
+            return entry
+
+    def set(self, route: str, response: typing.Any):
+        """Stores a response, for as long as it's route's TTL."""
+        ttl = self.ttls.get(route_template(route))
+        if ttl is None:
+            return
+        with self._lock:
+            self._entries[route] = CacheEntry(response, time.monotonic() + ttl)
+            self._entries.move_to_end(route)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def revalidate(self, route: str) -> typing.Any:
+        """Marks a stale entry as fresh again after a 304, and returns it's response. Returns None if it was evicted in the meantime."""
+        ttl = self.ttls.get(route_template(route), 0)
+        with self._lock:
+            entry = self._entries.get(route)
+            if entry is None:
+                return None
+            entry.expires_at = time.monotonic() + ttl
+            self.revalidated += 1
+            return entry.response
+
+    def invalidate(self, route: str):
+        """Drops every cached response a write to `route` could have changed."""
+        path = route.split("?")[0].strip("/")
+        parent = path.rsplit("/", 1)[0]
+        with self._lock:
+            for key in list(self._entries):
+                cached = key.split("?")[0]
+                if cached in (path, parent) or cached.startswith(f"{path}/"):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,13 +1,20 @@
 import typing
 import functools
-import json
+
+from . import codec
+from .cache import ResponseCache
+from .dispatch import event_key
+from .http_gateway import AsyncClient
+from .intents import can_arrive
+from .listener import EventListener
+from .members import MemberChunk
+from .resourceid import ResourceID
+from .retry import RetryPolicy
+from .session_store import SessionStore
+from .shared_types import BitIntents, logger
 
 if typing.TYPE_CHECKING:
-    from .shared_types import BitIntents
-    from .listener import EventListener
-    from .http_gateway import AsyncClient
     from .slash_cmd import InteractionCommand
-    from .resourceid import ResourceID
 
 
 class HttpClient:
@@ -28,13 +35,65 @@ class Client:
     ```
     """
 
-    def __init__(self, intents: BitIntents, token: str, version: int = 10):
+    def __init__(
+        self,
+        intents: BitIntents,
+        token: str,
+        version: int = 10,
+        minimize_intents: bool = False,
+        global_rate: float = 50,
+        pool_size: int = 10,
+        idle_timeout: float = 60,
+        request_timeout: float | None = 30,
+        cache: ResponseCache | None = None,
+        retry_policy: RetryPolicy | None = None,
+        compress: bool = True,
+        encoding: typing.Literal["json", "etf"] = "json",
+        handler_workers: int = 16,
+        handler_queue: int = 1000,
+        session_store: SessionStore | None = None,
+    ):
+        """
+        Args:
+            intents (BitIntents): The intents the bot asks for.
+            token (str): The bot's token.
+            version (int, optional): The API version. Defaults to 10.
+            minimize_intents (bool, optional): Whether to IDENTIFY with only the intents the listeners need. Defaults to False.
+            global_rate (float, optional): Max REST requests per second across every route. Defaults to 50.
+            pool_size (int, optional): How many REST connections are kept open (and requests sent) at once. Defaults to 10.
+            idle_timeout (float, optional): Seconds an unused REST connection is kept open. Defaults to 60.
+            request_timeout (float | None, optional): Max seconds to connect or wait for a response. Defaults to 30, None waits forever.
+            cache (ResponseCache | None, optional): The cache for read only routes. Defaults to None, which makes one with the default TTLs.
+            retry_policy (RetryPolicy | None, optional): Decides which failed requests are sent again. Defaults to None, which makes the default one.
+            compress (bool, optional): Whether the gateway uses zlib-stream compression. Defaults to True.
+            encoding (Literal["json", "etf"], optional): The gateway encoding. Defaults to "json".
+            handler_workers (int, optional): How many event handlers can run at once. Defaults to 16.
+            handler_queue (int, optional): How many events can wait for a handler before the gateway reader pauses. Defaults to 1000.
+            session_store (SessionStore | None, optional): Keeps the session on disk so a restart can RESUME it. Defaults to None.
+        """
         self.intents = intents
+        self.token = token
         self.current_interaction: dict = {}
         self.slash_cmds: list[InteractionCommand] = []
         self.listeners = []
         self._CONN = AsyncClient.setup(
-            token, intents, version=10, gateway=True, event_listners=self.listeners
+            token,
+            intents,
+            version=version,
+            gateway=True,
+            event_listners=self.listeners,
+            global_rate=global_rate,
+            pool_size=pool_size,
+            idle_timeout=idle_timeout,
+            cache=cache,
+            retry_policy=retry_policy,
+            compress=compress,
+            encoding=encoding,
+            handler_workers=handler_workers,
+            handler_queue=handler_queue,
+            session_store=session_store,
+            minimize_intents=minimize_intents,
+            request_timeout=request_timeout,
         )
 
         self.version = version
@@ -47,10 +106,73 @@ class Client:
 
         @functools.wraps(func)
         def functiond(**kwargs):
-            self.listeners.append(EventListener(func, func.__name__))
+            listener = EventListener(func, func.__name__)
+            self.listeners.append(listener)
+            self._CONN.dispatcher.add_listener(listener)
 
         return functiond
 
+    def add_listener(self, event: str, func: typing.Callable):
+        """Adds a handler for an event while the bot is running. `event` can also be a wildcard, like `*` or `GUILD_*`."""
+        self._CONN.dispatcher.add(event, func)
+
+    def remove_listener(self, event: str, func: typing.Callable) -> bool:
+        """Removes a handler added with `listener` or `add_listener`. Returns whether it was there."""
+        return self._CONN.dispatcher.remove(event, func)
+
+    def require(self, intents: int = 0, events: typing.Iterable[str] = ()):
+        """Keeps intents (or the intents of events) when `minimize_intents` is on, for things that don't have a listener,
+        like events that are only ever `wait_for`ed. Has to be called before the bot connects.
+        """
+        self._CONN.require(intents, events)
+
+    async def wait_for(
+        self,
+        event: str,
+        key: dict[str, typing.Any] | None = None,
+        check: typing.Callable[[typing.Any], bool] | None = None,
+        timeout: float | None = 60,
+    ) -> typing.Any:
+        """Waits for the next event that matches, and returns what a listener for it would have gotten.
+        Awaited inside an event handler, the events after the handler's one (same guild or channel) no longer wait for the handler to finish.
+        Give everything you can as a `key` rather than in `check`: waiters are looked up by their key,
+        so only the ones whose key matches have their `check` called.
+
+        Example:
+        ```python
+        message = await bot.wait_for(
+            "MESSAGE_CREATE",
+            key={"channel_id": channel.id, "author.id": user.id},
+            timeout=60,
+        )
+        ```
+
+        Args:
+            event (str): The event to wait for, like `MESSAGE_CREATE` (or `on_message_create`).
+            key (dict[str, Any] | None, optional): Fields of the event (dotted paths, like `author.id`) and the values they have to have. Defaults to None, which is any event.
+            check (Callable | None, optional): Gets the event, and returns whether it's the one being waited for. Defaults to None.
+            timeout (float | None, optional): Max seconds to wait before raising `asyncio.TimeoutError`. Defaults to 60, None waits forever.
+        """
+        plan = self._CONN.intent_plan
+        if plan is not None and not can_arrive(event_key(event), plan.intents):
+            logger.warning(
+                f"Waiting for {event_key(event)}, but it can't arrive with the intents the bot IDENTIFYed with. "
+                "Call `require` with it before connecting when minimizing intents."
+            )
+        return await self._CONN.waiters.wait(event, key, check, timeout)
+
+    def request_members(
+        self, guild_ids: list[ResourceID], concurrency: int = 4, **kwargs
+    ) -> typing.AsyncIterator[MemberChunk]:
+        """Loads the members of several guilds over the gateway at once, and yields every chunk as it comes in.
+        Takes the same keyword arguments as `Guild.request_members`.
+
+        Args:
+            guild_ids (list[ResourceID]): The guilds to load members from.
+            concurrency (int, optional): How many guilds to load at once. Defaults to 4.
+        """
+        return self._CONN.member_chunker.request_many(guild_ids, concurrency, **kwargs)
+
     def command(
         self,
         name: str | None,
@@ -81,6 +203,7 @@ class Client:
             cmds.private = private  # type: ignore
             self.slash_cmds.append(cmds)
             self._CONN.slash_cmds = self.slash_cmds
+            self._CONN.dispatcher.add_command(cmds)
             return cmds
 
         return add_to_list
@@ -99,7 +222,7 @@ class Client:
         curr_synced = connection.send_request(
             "GET", f"applications/{self._CONN.app_id}/commands", None
         )
-        synced = json.loads(curr_synced.result().read())  # type: ignore
+        synced = codec.loads(curr_synced.result().read())  # type: ignore
         if len(synced) < len(self.slash_cmds):
             for cmd in self.slash_cmds:
                 if cmd not in synced:
@@ -107,11 +230,11 @@ class Client:
                         connection.send_request(
                             "POST",
                             f"applications/{self._CONN.app_id}/commands",
-                            json.loads(cmd._jsonify()),
+                            codec.loads(cmd._jsonify()),
                         )
                         # this is pretty redundant but i'm too lazy to change the _jsonify func
                     else:
-                        connection.send_request("POST", f"applications/{self._CONN.app_id}/guilds/{cmd.private}/commands", json.loads(cmd._jsonify()))  # type: ignore
+                        connection.send_request("POST", f"applications/{self._CONN.app_id}/guilds/{cmd.private}/commands", codec.loads(cmd._jsonify()))  # type: ignore
 
     def prereq(self, func):
         """This is a decorator to mark a function to be ran during the gateway handshake. The decorated function must not take any arguments.
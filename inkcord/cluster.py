@@ -0,0 +1,301 @@
+"""
+Cluster mode: shards spread over several processes, so a big bot can use every core.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+The supervisor (the process `Cluster.run` is called in) asks discord how many shards to use, splits them into groups,
+and starts one worker process per group. Every worker builds the bot by calling the factory it was given,
+so the same bot code runs in every worker, and runs it's group with a `ShardManager`.
+
+Workers don't talk to each other. A guild's events only reach the worker that owns it's shard (`Cluster.group_for` says which one),
+and gateway sends for a guild (`send_gateway`, voice state updates, member requests) only work from that worker,
+anywhere else they raise `ValueError`. Presence updates go out on the shards of the worker they're called in,
+so set the presence from a handler that runs in every worker, like `on_ready`. REST requests work from every worker.
+"""
+
+import asyncio
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+import typing
+
+from .shard import IDENTIFY_INTERVAL, IdentifyLimiter, ShardManager
+from .shared_types import logger
+
+FATAL_EXIT_CODE = 3
+"""The exit code of a worker that stopped because of a fatal close code, it isn't restarted since it would fail again."""
+
+
+class SharedIdentifyLimiter(IdentifyLimiter):
+    """An `IdentifyLimiter` that works across processes, with one lock and one timestamp per concurrency bucket in shared memory."""
+
+    def __init__(self, max_concurrency: int, locks: list, last: typing.Any):
+        super().__init__(max_concurrency)
+        self._shared_locks = locks
+        self._shared_last = last
+
+    async def wait(self, shard_id: int):
+        bucket = shard_id % self.max_concurrency
+        # the locks are blocking, so waiting on one happens in a thread to keep the event loop (and heartbeats) going
+        await asyncio.to_thread(self._wait_blocking, shard_id, bucket)
+
+    def _wait_blocking(self, shard_id: int, bucket: int):
+        """INTERNAL!!! Takes the bucket's turn, sleeping while holding the lock so no other process gets in first."""
+        with self._shared_locks[bucket]:
+            delay = self._shared_last[bucket] + IDENTIFY_INTERVAL - time.time()
+            if delay > 0:
+                logger.debug(
+                    f"Shard {shard_id} waiting {delay:.2f}s to IDENTIFY (bucket {bucket}, pid {os.getpid()})."
+                )
+                time.sleep(delay)
+            self._shared_last[bucket] = time.time()
+
+
+def _run_group(
+    factory: typing.Callable[[], typing.Any],
+    shard_ids: list[int],
+    shard_count: int,
+    max_concurrency: int,
+    gateway_url: str,
+    locks: list,
+    last: typing.Any,
+):
+    """INTERNAL!!! The entry point of a worker process."""
+    bot = factory()
+    # the factory can return a Client or an AsyncClient
+    client = getattr(bot, "_CONN", bot)
+
+    async def main() -> ShardManager:
+        manager = ShardManager(
+            client,
+            shard_count,
+            shard_ids,
+            max_concurrency,
+            gateway_url,
+            SharedIdentifyLimiter(max_concurrency, locks, last),
+        )
+        await manager.start()
+        await manager.wait()
+        return manager
+
+    manager = asyncio.run(main())
+    if any(shard.close_code is not None for shard in manager.shards.values()):
+        sys.exit(FATAL_EXIT_CODE)
+
+
+class _Group:
+    def __init__(self, index: int, shard_ids: list[int]):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process: multiprocessing.process.BaseProcess | None = None
+        self.restarts: int = 0
+        self.started_at: float = 0
+        self.restart_at: float | None = None
+        self.fatal = False
+        self.finished = False
+
+
+class Cluster:
+    """Runs a bot's shards in a pool of worker processes and restarts workers that die.
+
+    The factory has to be a module level function (it gets sent to the workers) that builds and returns the bot,
+    with all it's listeners and commands attached:
+
+    ```python
+    def make_bot():
+        bot = Client(intents, token)
+        # - rest of your bot's code here - #
+        return bot
+
+    if __name__ == "__main__":
+        Cluster(make_bot, token).run()
+    ```
+    """
+
+    def __init__(
+        self,
+        factory: typing.Callable[[], typing.Any],
+        token: str,
+        shard_count: int | None = None,
+        processes: int | None = None,
+        max_restarts: int | None = 5,
+        restart_window: float = 600,
+    ):
+        """
+        Args:
+            factory (Callable): Builds the bot in every worker.
+            token (str): The bot token, only used by the supervisor to ask discord for the shard count.
+            shard_count (int | None, optional): The total number of shards. Defaults to None, which is what discord recommends.
+            processes (int | None, optional): How many worker processes to start. Defaults to None, which is one per core.
+            max_restarts (int | None, optional): How many times a worker can be restarted within `restart_window` before it's given up on. None is no limit.
+            restart_window (float, optional): A worker that stayed up this many seconds gets it's restart count reset.
+        """
+        self.factory = factory
+        self.token = token
+        self.shard_count = shard_count
+        self.processes = processes or os.cpu_count() or 1
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.max_concurrency: int = 1
+        self.gateway_url: str | None = None
+        self.groups: list[_Group] = []
+        self._context = multiprocessing.get_context("spawn")
+        self._locks: list = []
+        self._last: typing.Any = None
+        self._stopping = False
+
+    def fetch_gateway(self) -> dict:
+        """Asks discord (`gateway/bot`) for the gateway url, the recommended shard count and the IDENTIFY concurrency."""
+        from .http_gateway import AsyncClient
+
+        client = AsyncClient(self.token, 0, gateway=False)  # type: ignore
+        try:
+            info = client.send_request("GET", "gateway/bot").result().json()
+        finally:
+            client.close()
+        self.gateway_url = info["url"]
+        self.max_concurrency = info["session_start_limit"]["max_concurrency"]
+        if self.shard_count is None:
+            self.shard_count = info["shards"]
+        return info
+
+    def _plan(self):
+        """INTERNAL!!! Splits the shards into one contiguous group per process."""
+        count = min(self.processes, self.shard_count)  # type: ignore
+        size, extra = divmod(self.shard_count, count)  # type: ignore
+        start = 0
+        self.groups = []
+        for index in range(count):
+            end = start + size + (1 if index < extra else 0)
+            self.groups.append(_Group(index, list(range(start, end))))
+            start = end
+        self._locks = [self._context.Lock() for _ in range(self.max_concurrency)]
+        self._last = self._context.Array("d", self.max_concurrency)
+
+    def _start(self, group: _Group):
+        """INTERNAL!!! Starts (or restarts) a group's worker process."""
+        group.process = self._context.Process(
+            target=_run_group,
+            args=(
+                self.factory,
+                group.shard_ids,
+                self.shard_count,
+                self.max_concurrency,
+                self.gateway_url,
+                self._locks,
+                self._last,
+            ),
+            name=f"inkcord-cluster-{group.index}",
+        )
+        group.process.start()
+        group.started_at = time.monotonic()
+        group.restart_at = None
+        logger.info(
+            f"Started worker {group.index} (pid {group.process.pid}) for shards {group.shard_ids[0]}-{group.shard_ids[-1]}."
+        )
+
+    def _on_exit(self, group: _Group):
+        """INTERNAL!!! Decides what happens to a group whose worker exited."""
+        code = group.process.exitcode  # type: ignore
+        if self._stopping:
+            return
+        if code == 0:
+            logger.info(f"Worker {group.index} finished.")
+            group.finished = True
+            return
+        if code == FATAL_EXIT_CODE:
+            logger.fatal(
+                f"Worker {group.index} stopped because of a fatal close code, not restarting it."
+            )
+            group.fatal = True
+            return
+        if time.monotonic() - group.started_at >= self.restart_window:
+            group.restarts = 0
+        if self.max_restarts is not None and group.restarts >= self.max_restarts:
+            logger.fatal(
+                f"Worker {group.index} died {group.restarts} times in a row, giving up on shards {group.shard_ids}."
+            )
+            group.fatal = True
+            return
+        delay = min(60, 2**group.restarts)
+        group.restarts += 1
+        group.restart_at = time.monotonic() + delay
+        logger.error(
+            f"Worker {group.index} exited with code {code}, restarting it in {delay}s."
+        )
+
+    def run(self):
+        """Starts every worker and supervises them until they've all stopped for good (or until interrupted)."""
+        if self.gateway_url is None:
+            self.fetch_gateway()
+        self._plan()
+        logger.info(
+            f"Running {self.shard_count} shards in {len(self.groups)} processes (max concurrency {self.max_concurrency})."
+        )
+        for group in self.groups:
+            self._start(group)
+        try:
+            while True:
+                # a worker can die before it's ever waited on, so exits are handled before anything else
+                for group in self.groups:
+                    if group.restart_at is not None:
+                        if group.restart_at <= time.monotonic():
+                            self._start(group)
+                    elif not (group.fatal or group.finished) and not group.process.is_alive():  # type: ignore
+                        self._on_exit(group)
+                if all(group.fatal or group.finished for group in self.groups):
+                    break
+                waiting = [group for group in self.groups if group.restart_at is not None]
+                # a dead worker's sentinel is ready right away, so one that dies in between isn't missed
+                running = [
+                    group for group in self.groups if not (group.fatal or group.finished or group in waiting)
+                ]
+                timeout = None
+                if waiting:
+                    timeout = max(0, min(group.restart_at for group in waiting) - time.monotonic())  # type: ignore
+                multiprocessing.connection.wait(
+                    [group.process.sentinel for group in running], timeout  # type: ignore
+                )
+        except KeyboardInterrupt:
+            logger.info("Stopping the cluster...")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Terminates every worker."""
+        self._stopping = True
+        for group in self.groups:
+            if group.process is not None and group.process.is_alive():
+                group.process.terminate()
+        for group in self.groups:
+            if group.process is not None:
+                group.process.join(10)
+
+    def group_for(self, guild_id: int) -> int | None:
+        """Returns the index of the worker that gets a guild's events, and the only one that can send gateway payloads for it."""
+        shard_id = (int(guild_id) >> 22) % self.shard_count  # type: ignore
+        for group in self.groups:
+            if shard_id in group.shard_ids:
+                return group.index
+        return None
+
+    def status(self) -> dict[int, dict]:
+        """Returns the pid, shards, liveness and restart count of every worker."""
+        return {
+            group.index: {
+                "pid": group.process.pid if group.process is not None else None,
+                "shards": group.shard_ids,
+                "alive": group.process is not None and group.process.is_alive(),
+                "restarts": group.restarts,
+                "fatal": group.fatal,
+            }
+            for group in self.groups
+        }
@@ -0,0 +1,142 @@
+"""
+The JSON codec every part of inkcord encodes and decodes with.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+inkcord only needs the standard library, so the stdlib `json` module is always there as the fallback,
+but if orjson or msgspec happens to be installed it gets picked automatically since they're a lot faster.
+"""
+
+import json
+import re
+import typing
+
+
+class JSONCodec:
+    """The interface a codec has to implement. Subclass this and pass it to `set_codec` to use your own."""
+
+    name = "json"
+
+    def loads(self, data: bytes | str) -> typing.Any:
+        """Decodes JSON straight from bytes (or a str)."""
+        return json.loads(data)
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        """Encodes to UTF-8 JSON bytes, ready to be sent as a request body."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def dumps_text(self, obj: typing.Any) -> str:
+        """Encodes to a JSON str, for gateway frames (which have to be sent as text)."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+class OrjsonCodec(JSONCodec):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def loads(self, data: bytes | str) -> typing.Any:
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        return self._orjson.dumps(obj)
+
+    def dumps_text(self, obj: typing.Any) -> str:
+        return self._orjson.dumps(obj).decode()
+
+
+class MsgspecCodec(JSONCodec):
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def loads(self, data: bytes | str) -> typing.Any:
+        return self._decoder.decode(data)
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def dumps_text(self, obj: typing.Any) -> str:
+        return self._encoder.encode(obj).decode()
+
+
+def _best_codec() -> JSONCodec:
+    """Returns the fastest codec that's installed."""
+    for codec in (OrjsonCodec, MsgspecCodec):
+        try:
+            return codec()
+        except ImportError:
+            continue
+    return JSONCodec()
+
+
+_active: JSONCodec = _best_codec()
+
+
+def set_codec(codec: JSONCodec):
+    """Changes the codec everything in inkcord uses from now on."""
+    global _active
+    _active = codec
+
+
+def get_codec() -> JSONCodec:
+    """Returns the codec currently in use."""
+    return _active
+
+
+def loads(data: bytes | str) -> typing.Any:
+    return _active.loads(data)
+
+
+def dumps(obj: typing.Any) -> bytes:
+    return _active.dumps(obj)
+
+
+def dumps_text(obj: typing.Any) -> str:
+    return _active.dumps_text(obj)
+
+
+_HEAD_FIELDS = re.compile(rb'"(t|s|op)":(null|"[^"]*"|\d+)')
+
+
+def peek_event(message: bytes | str) -> tuple[int, str | None, int | None] | None:
+    """Reads the opcode, event name and sequence number of a gateway payload without decoding it.
+    Only the part before `"d":` is looked at, which is where discord puts them.
+    The first `"d":` is always the top level one, since the values of `t`, `s` and `op` can't contain it.
+
+    Returns:
+        tuple[int, str | None, int | None] | None: (op, t, s), or None if they weren't all before `d` (decode the whole payload then).
+    """
+    if isinstance(message, str):
+        end = message.find('"d":')
+        # only the head gets encoded, not the whole frame
+        head = message[:end].encode()
+        end = len(head) if end >= 0 else -1
+    else:
+        end = message.find(b'"d":')
+        head = message
+    if end < 0:
+        return None
+    fields = dict(_HEAD_FIELDS.findall(head, 0, end))
+    if b"op" not in fields or b"t" not in fields or b"s" not in fields:
+        return None
+    t = fields[b"t"]
+    s = fields[b"s"]
+    return (
+        int(fields[b"op"]),
+        None if t == b"null" else t[1:-1].decode(),
+        None if s == b"null" else int(s),
+    )
@@ -0,0 +1,425 @@
+"""
+The registry gateway events are dispatched through, the worker pool their handlers run on, and the waiters of `Client.wait_for`.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import collections
+import contextvars
+import fnmatch
+import heapq
+import time
+import typing
+
+from .listener import EventListener
+from .shared_types import logger
+
+
+def event_key(name: str) -> str:
+    """Turns a listener name into the event it listens to, so `on_message_create`, `message_create` and `MESSAGE_CREATE` are all the same event."""
+    name = name.upper()
+    if name.startswith("ON_"):
+        name = name[3:]
+    return name
+
+
+class EventRegistry:
+    """Maps event names to their handlers, and command names to their commands.
+    Finding the handlers of an event is one dict lookup no matter how many are registered:
+    the handlers of every event name (wildcards included) are worked out the first time it's dispatched and cached until something changes.
+
+    Wildcard handlers use shell style patterns, `*` gets every event and `GUILD_*` every event starting with `GUILD_`.
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, list[typing.Callable]] = {}
+        self._patterns: dict[str, list[typing.Callable]] = {}
+        self._commands: dict[str, typing.Any] = {}
+        self._resolved: dict[str, tuple[typing.Callable, ...]] = {}
+
+    def add(self, event: str, func: typing.Callable):
+        """Registers `func` for `event` (which can be a wildcard pattern). A function can be registered for more than one event."""
+        event = event_key(event)
+        table = self._patterns if any(c in event for c in "*?[") else self._handlers
+        table.setdefault(event, []).append(func)
+        self._resolved.clear()
+
+    def remove(self, event: str, func: typing.Callable) -> bool:
+        """Unregisters `func` from `event`.
+
+        Returns:
+            bool: Whether it was registered.
+        """
+        event = event_key(event)
+        for table in (self._handlers, self._patterns):
+            handlers = table.get(event)
+            if handlers and func in handlers:
+                handlers.remove(func)
+                if not handlers:
+                    del table[event]
+                self._resolved.clear()
+                return True
+        return False
+
+    def add_listener(self, listener: EventListener):
+        self.add(listener.event_name, listener.func)
+
+    def remove_listener(self, listener: EventListener) -> bool:
+        return self.remove(listener.event_name, listener.func)
+
+    def handlers(self, event: str) -> tuple[typing.Callable, ...]:
+        """Returns every handler for an event name, exact ones first and then wildcards, in the order they were added."""
+        resolved = self._resolved.get(event)
+        if resolved is None:
+            matched = list(self._handlers.get(event, ()))
+            for pattern, handlers in self._patterns.items():
+                if fnmatch.fnmatchcase(event, pattern):
+                    matched.extend(handlers)
+            resolved = self._resolved[event] = tuple(matched)
+        return resolved
+
+    def listens_to(self, event: str) -> bool:
+        return bool(self.handlers(event))
+
+    def add_command(self, command: typing.Any):
+        """Registers a slash command under it's name (or it's function's name if it doesn't have one)."""
+        self._commands[command.name or command.func.__name__] = command
+
+    def remove_command(self, name: str) -> typing.Any:
+        return self._commands.pop(name, None)
+
+    def command(self, name: str) -> typing.Any:
+        """Returns the command with this name, or None."""
+        return self._commands.get(name)
+
+    @property
+    def commands(self) -> list[typing.Any]:
+        return list(self._commands.values())
+
+    @property
+    def events(self) -> set[str]:
+        """Every event name and pattern that has at least one handler."""
+        return set(self._handlers) | set(self._patterns)
+
+
+def ordering_key(name: str, data: typing.Any) -> tuple[str, typing.Any] | None:
+    """Returns what an event has to stay in order with: it's guild, or it's channel for events outside of guilds (like DMs).
+    Events without either (like READY) return None and aren't ordered with anything.
+    """
+    if not isinstance(data, dict):
+        return None
+    if data.get("guild_id") is not None:
+        return ("guild", data["guild_id"])
+    if data.get("channel_id") is not None:
+        return ("channel", data["channel_id"])
+    if name.startswith("GUILD_") and data.get("id") is not None:
+        # GUILD_CREATE/UPDATE/DELETE are the guild itself
+        return ("guild", data["id"])
+    return None
+
+
+_current_job: contextvars.ContextVar[asyncio.Future | None] = contextvars.ContextVar("inkcord_current_job", default=None)
+"""Resolved to let the handler pool move on from the handler that's running in this context."""
+
+
+def release_order():
+    """Lets the handler this is called from stop holding up the events queued behind it (the rest of it's guild or channel).
+    The handler keeps running, but the events after it no longer wait for it to finish.
+    `wait_for` and member requests call this before they wait, otherwise a handler waiting for a reply in it's own channel
+    would hold up that channel, fill the queue, stop the gateway reader, and never get the reply. Does nothing outside of a handler.
+    """
+    job = _current_job.get()
+    if job is not None and not job.done():
+        job.set_result(None)
+
+
+class HandlerPool:
+    """Runs event handlers on a fixed number of worker tasks.
+    Every ordering key that has events waiting gets it's own queue, and only one worker at a time takes jobs off a key's queue,
+    so the handlers of one guild (or channel) run one after the other in the order the events came in.
+    A worker that finishes a job puts it's key at the back of the line and takes whichever key is next,
+    so a slow handler only holds up it's own guild, never the guilds that happen to share a worker with it.
+    Events without a key aren't ordered with anything and just wait for the next free worker.
+
+    When `max_queue` events are waiting, `submit` waits until there's room, which stops the gateway reader
+    from reading more frames until the handlers catch up (backpressure).
+    A handler that calls `release_order` (which `wait_for` does) stops holding it's key, so waiting inside a handler
+    never keeps the reader from getting the event it waits for.
+    """
+
+    def __init__(self, workers: int = 16, max_queue: int = 1000):
+        """
+        Args:
+            workers (int, optional): How many handlers can run at once. Defaults to 16.
+            max_queue (int, optional): How many events can wait across all keys before the reader is paused. Defaults to 1000.
+        """
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._pending: dict[typing.Hashable, collections.deque] = {}
+        """key -> jobs waiting for it. A key is in here while it's queued in `_ready` or one of it's jobs is running."""
+        self._ready: asyncio.Queue | None = None
+        """Keys that have jobs waiting and no worker on them, in the order they got ready."""
+        self._queued = 0
+        self._room: asyncio.Event | None = None
+        self._idle: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._running: set[asyncio.Task] = set()
+        self.handled: int = 0
+        self.failed: int = 0
+        self.lag: float = 0
+        """How long the last handler waited in the queue before it started, in seconds."""
+        self.max_lag: float = 0
+        self.backpressure_waits: int = 0
+        """How many times the reader had to wait for room in the queue."""
+        self.released: int = 0
+        """How many handlers let go of their key with `release_order` before they finished."""
+
+    def _start(self):
+        """INTERNAL!!! Starts the workers, on the first event (there has to be a running event loop)."""
+        self._ready = asyncio.Queue()
+        self._room = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"inkcord-handler-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def submit(self, key: typing.Hashable | None, func: typing.Callable, *args: typing.Any):
+        """Queues `func(*args)` behind the other events of `key`, waiting for room if `max_queue` events are already waiting."""
+        if not self._tasks:
+            self._start()
+        if self._queued >= self.max_queue:
+            self.backpressure_waits += 1
+            while self._queued >= self.max_queue:
+                self._room.clear()  # type: ignore
+                await self._room.wait()  # type: ignore
+        if key is None:
+            # unordered, so it gets a key of it's own
+            key = object()
+        job = (time.monotonic(), func, args)
+        self._queued += 1
+        self._idle.clear()  # type: ignore
+        jobs = self._pending.get(key)
+        if jobs is None:
+            self._pending[key] = collections.deque((job,))
+            self._ready.put_nowait(key)  # type: ignore
+        else:
+            # a worker is on this key (or it's already in line), that worker picks this up when it's done
+            jobs.append(job)
+
+    async def _work(self):
+        """INTERNAL!!! One worker, runs the next job of whichever key is next in line."""
+        while True:
+            key = await self._ready.get()  # type: ignore
+            jobs = self._pending[key]
+            queued_at, func, args = jobs.popleft()
+            self._queued -= 1
+            self._room.set()  # type: ignore
+            self.lag = time.monotonic() - queued_at
+            self.max_lag = max(self.max_lag, self.lag)
+            released = asyncio.get_running_loop().create_future()
+            # the job's task copies the context, so `release_order` inside it finds this job
+            token = _current_job.set(released)
+            try:
+                task = asyncio.ensure_future(self._run(func, args))
+            finally:
+                _current_job.reset(token)
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            try:
+                await asyncio.wait((task, released), return_when=asyncio.FIRST_COMPLETED)
+                if not task.done():
+                    self.released += 1
+            finally:
+                released.cancel()
+                if jobs:
+                    self._ready.put_nowait(key)  # type: ignore
+                else:
+                    del self._pending[key]
+                    if not self._pending:
+                        self._idle.set()  # type: ignore
+
+    async def _run(self, func: typing.Callable, args: tuple):
+        """INTERNAL!!! Runs one handler, logging (and counting) whatever it raises."""
+        try:
+            await func(*args)
+            self.handled += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed += 1
+            logger.exception(f"Handler {getattr(func, '__name__', func)!r} raised.")
+
+    @property
+    def queue_depth(self) -> int:
+        """How many events are waiting across every key."""
+        return self._queued
+
+    def busiest(self, count: int = 5) -> list[tuple[typing.Hashable, int]]:
+        """The keys with the most events waiting and how many each, a key with a lot more than the rest means one guild is very busy."""
+        return heapq.nlargest(
+            count,
+            ((key, len(jobs)) for key, jobs in self._pending.items() if jobs),
+            key=lambda item: item[1],
+        )
+
+    async def join(self):
+        """Waits until every queued handler has run, including the ones that released their key."""
+        while self._idle is not None:
+            await self._idle.wait()
+            if not self._running:
+                return
+            await asyncio.wait(set(self._running))
+
+    async def close(self):
+        """Stops the workers and the handlers that are still running, handlers that haven't started yet are dropped."""
+        tasks = [*self._tasks, *self._running]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._pending.clear()
+        self._queued = 0
+        self._ready = self._room = self._idle = None
+
+
+_MISSING = object()
+
+
+def _field(data: typing.Any, path: str) -> typing.Any:
+    """INTERNAL!!! Gets a dotted path (`author.id`) out of an event, snowflakes as strings so ints (ETF) and strings (JSON) match."""
+    for part in path.split("."):
+        if not isinstance(data, dict):
+            return _MISSING
+        data = data.get(part, _MISSING)
+        if data is _MISSING:
+            return _MISSING
+    return str(data)
+
+
+class _Waiter:
+    def __init__(self, future: asyncio.Future, check: typing.Callable[[typing.Any], bool] | None):
+        self.future = future
+        self.check = check
+
+
+class WaiterIndex:
+    """One shot waiters for events, indexed by event name and then by the values of their key fields
+    (like `{"channel_id": ..., "author.id": ...}`). An event only looks up the waiters whose key it matches,
+    one dict lookup per set of key fields in use for that event, so thousands of waiters in different channels
+    don't slow down every event. `check` only runs for waiters whose key already matched.
+    """
+
+    def __init__(self):
+        self._index: dict[str, dict[tuple[str, ...], dict[tuple[str, ...], dict[_Waiter, None]]]] = {}
+        """event -> key fields -> key values -> waiters, in the order they were added."""
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def waiting_for(self, event: str) -> bool:
+        return event in self._index
+
+    @property
+    def events(self) -> set[str]:
+        """Every event something is waiting for."""
+        return set(self._index)
+
+    def add(
+        self,
+        event: str,
+        key: dict[str, typing.Any] | None = None,
+        check: typing.Callable[[typing.Any], bool] | None = None,
+    ) -> asyncio.Future:
+        """Registers a waiter, and returns the future it's resolved through. Cancelling the future removes the waiter.
+
+        Args:
+            event (str): The event to wait for.
+            key (dict[str, Any] | None, optional): Fields (dotted paths into the event data) and the values they have to have. Defaults to None, which is any event.
+            check (Callable | None, optional): Called with the event once the key matched, the waiter is only resolved if it returns True. Defaults to None.
+        """
+        event = event_key(event)
+        fields = tuple(sorted(key)) if key else ()
+        values = tuple(str(key[field]) for field in fields) if key else ()
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), check)
+        self._index.setdefault(event, {}).setdefault(fields, {}).setdefault(values, {})[waiter] = None
+        self._count += 1
+        waiter.future.add_done_callback(lambda _: self._discard(event, fields, values, waiter))
+        return waiter.future
+
+    def _discard(self, event: str, fields: tuple[str, ...], values: tuple[str, ...], waiter: _Waiter):
+        """INTERNAL!!! Drops a waiter (and every index level it leaves empty)."""
+        shapes = self._index.get(event)
+        if shapes is None:
+            return
+        buckets = shapes.get(fields, {})
+        waiters = buckets.get(values)
+        if waiters is None or waiter not in waiters:
+            return
+        del waiters[waiter]
+        self._count -= 1
+        if not waiters:
+            del buckets[values]
+            if not buckets:
+                del shapes[fields]
+                if not shapes:
+                    del self._index[event]
+
+    def dispatch(self, event: str, data: typing.Any, result: typing.Any = None) -> int:
+        """Resolves every waiter for `event` whose key and check match `data`.
+
+        Args:
+            event (str): The event name.
+            data (Any): The `d` field of the event, what keys are matched against.
+            result (Any, optional): What the waiters get instead of `data`, like a `ShardEvent`.
+
+        Returns:
+            int: How many waiters were resolved.
+        """
+        shapes = self._index.get(event)
+        if shapes is None:
+            return 0
+        result = data if result is None else result
+        matched: list[_Waiter] = []
+        for fields, buckets in shapes.items():
+            values = tuple(_field(data, field) for field in fields)
+            if _MISSING in values:
+                continue
+            matched.extend(buckets.get(values, ()))
+        resolved = 0
+        for waiter in matched:
+            if waiter.future.done():
+                continue
+            if waiter.check is not None:
+                try:
+                    if not waiter.check(result):
+                        continue
+                except Exception as e:
+                    waiter.future.set_exception(e)
+                    continue
+            waiter.future.set_result(result)
+            resolved += 1
+        return resolved
+
+    async def wait(
+        self,
+        event: str,
+        key: dict[str, typing.Any] | None = None,
+        check: typing.Callable[[typing.Any], bool] | None = None,
+        timeout: float | None = 60,
+    ) -> typing.Any:
+        """Waits for the next matching event, see `add`. Raises `asyncio.TimeoutError` if none comes within `timeout` seconds.
+        Called from an event handler, the handler stops holding up the events after it while it waits (see `release_order`).
+        """
+        future = self.add(event, key, check)
+        release_order()
+        return await asyncio.wait_for(future, timeout)
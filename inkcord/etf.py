@@ -0,0 +1,236 @@
+"""
+ETF (Erlang External Term Format), the binary encoding the gateway speaks with `encoding=etf`.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+`loads` gives back the same dicts the JSON encoding would, so the models don't care which one is used:
+binaries and atoms become str and the atoms nil/true/false become None/True/False.
+The one difference is that discord sends snowflakes as integers over ETF (they're strings in JSON),
+which is fine since `ResourceID` takes either.
+If `erlpack` is installed it does the parsing instead, which is a lot faster.
+"""
+
+import struct
+import typing
+import zlib
+
+VERSION = 131
+
+NEW_FLOAT_EXT = 70
+COMPRESSED = 80
+SMALL_INTEGER_EXT = 97
+INTEGER_EXT = 98
+FLOAT_EXT = 99
+ATOM_EXT = 100
+SMALL_TUPLE_EXT = 104
+LARGE_TUPLE_EXT = 105
+NIL_EXT = 106
+STRING_EXT = 107
+LIST_EXT = 108
+BINARY_EXT = 109
+SMALL_BIG_EXT = 110
+LARGE_BIG_EXT = 111
+SMALL_ATOM_EXT = 115
+MAP_EXT = 116
+ATOM_UTF8_EXT = 118
+SMALL_ATOM_UTF8_EXT = 119
+
+INT32_MIN = -(2**31)
+INT32_MAX = 2**31 - 1
+
+_ATOMS = {"nil": None, "true": True, "false": False}
+
+_u16 = struct.Struct(">H").unpack_from
+_u32 = struct.Struct(">I").unpack_from
+_i32 = struct.Struct(">i").unpack_from
+_f64 = struct.Struct(">d").unpack_from
+
+
+class ETFDecodeError(ValueError):
+    """Raised when a frame isn't valid ETF (or uses a term the gateway never sends)."""
+
+
+def _decode(data: bytes, i: int) -> tuple[typing.Any, int]:
+    """INTERNAL!!! Decodes the term starting at `i`, returns it and where the next term starts."""
+    tag = data[i]
+    i += 1
+    if tag == BINARY_EXT:
+        (size,) = _u32(data, i)
+        i += 4
+        return data[i : i + size].decode(), i + size
+    if tag == MAP_EXT:
+        (arity,) = _u32(data, i)
+        i += 4
+        result = {}
+        for _ in range(arity):
+            key, i = _decode(data, i)
+            result[key], i = _decode(data, i)
+        return result, i
+    if tag == SMALL_INTEGER_EXT:
+        return data[i], i + 1
+    if tag == INTEGER_EXT:
+        return _i32(data, i)[0], i + 4
+    if tag in (SMALL_ATOM_UTF8_EXT, SMALL_ATOM_EXT):
+        size = data[i]
+        i += 1
+        name = data[i : i + size].decode()
+        return _ATOMS.get(name, name), i + size
+    if tag in (ATOM_UTF8_EXT, ATOM_EXT):
+        (size,) = _u16(data, i)
+        i += 2
+        name = data[i : i + size].decode()
+        return _ATOMS.get(name, name), i + size
+    if tag == LIST_EXT:
+        (length,) = _u32(data, i)
+        i += 4
+        result = []
+        for _ in range(length):
+            item, i = _decode(data, i)
+            result.append(item)
+        # proper lists always end with NIL_EXT
+        _, i = _decode(data, i)
+        return result, i
+    if tag == NIL_EXT:
+        return [], i
+    if tag in (SMALL_BIG_EXT, LARGE_BIG_EXT):
+        if tag == SMALL_BIG_EXT:
+            size = data[i]
+            i += 1
+        else:
+            (size,) = _u32(data, i)
+            i += 4
+        sign = data[i]
+        i += 1
+        value = int.from_bytes(data[i : i + size], "little")
+        return -value if sign else value, i + size
+    if tag == NEW_FLOAT_EXT:
+        return _f64(data, i)[0], i + 8
+    if tag == FLOAT_EXT:
+        return float(data[i : i + 31].rstrip(b"\x00")), i + 31
+    if tag == STRING_EXT:
+        (size,) = _u16(data, i)
+        i += 2
+        return data[i : i + size].decode(), i + size
+    if tag in (SMALL_TUPLE_EXT, LARGE_TUPLE_EXT):
+        if tag == SMALL_TUPLE_EXT:
+            arity = data[i]
+            i += 1
+        else:
+            (arity,) = _u32(data, i)
+            i += 4
+        result = []
+        for _ in range(arity):
+            item, i = _decode(data, i)
+            result.append(item)
+        return tuple(result), i
+    raise ETFDecodeError(f"Unsupported ETF tag {tag} at offset {i - 1}.")
+
+
+def _normalize(term: typing.Any) -> typing.Any:
+    """INTERNAL!!! Makes what erlpack returns look like what `_decode` (and JSON) returns."""
+    if isinstance(term, dict):
+        return {_normalize(key): _normalize(value) for key, value in term.items()}
+    if isinstance(term, list):
+        return [_normalize(item) for item in term]
+    if isinstance(term, bytes):
+        return term.decode()
+    return term
+
+
+def _py_loads(data: bytes) -> typing.Any:
+    """Decodes one ETF frame into the same dict the JSON encoding would give."""
+    if not data or data[0] != VERSION:
+        raise ETFDecodeError("Not an ETF frame (missing the version byte).")
+    if data[1] == COMPRESSED:
+        (size,) = _u32(data, 2)
+        data = bytes([VERSION]) + zlib.decompress(data[6:], bufsize=size)
+    term, end = _decode(data, 1)
+    if end != len(data):
+        raise ETFDecodeError(f"{len(data) - end} trailing bytes after the term.")
+    return term
+
+
+def _encode(term: typing.Any, out: bytearray):
+    """INTERNAL!!! Appends the encoded term to `out`."""
+    if term is None:
+        out += b"\x77\x03nil"
+    elif term is True:
+        out += b"\x77\x04true"
+    elif term is False:
+        out += b"\x77\x05false"
+    elif isinstance(term, str):
+        encoded = term.encode()
+        out.append(BINARY_EXT)
+        out += len(encoded).to_bytes(4, "big")
+        out += encoded
+    elif isinstance(term, int):
+        if 0 <= term <= 255:
+            out.append(SMALL_INTEGER_EXT)
+            out.append(term)
+        elif INT32_MIN <= term <= INT32_MAX:
+            out.append(INTEGER_EXT)
+            out += term.to_bytes(4, "big", signed=True)
+        else:
+            digits = abs(term).to_bytes((abs(term).bit_length() + 7) // 8, "little")
+            if len(digits) > 255:
+                out.append(LARGE_BIG_EXT)
+                out += len(digits).to_bytes(4, "big")
+            else:
+                out.append(SMALL_BIG_EXT)
+                out.append(len(digits))
+            out.append(1 if term < 0 else 0)
+            out += digits
+    elif isinstance(term, float):
+        out.append(NEW_FLOAT_EXT)
+        out += struct.pack(">d", term)
+    elif isinstance(term, dict):
+        out.append(MAP_EXT)
+        out += len(term).to_bytes(4, "big")
+        for key, value in term.items():
+            _encode(key, out)
+            _encode(value, out)
+    elif isinstance(term, (list, tuple)):
+        if term:
+            out.append(LIST_EXT)
+            out += len(term).to_bytes(4, "big")
+            for item in term:
+                _encode(item, out)
+        out.append(NIL_EXT)
+    else:
+        raise TypeError(f"Can't encode {type(term).__name__} as ETF.")
+
+
+def _py_dumps(term: typing.Any) -> bytes:
+    """Encodes a payload to send over an ETF gateway connection."""
+    out = bytearray([VERSION])
+    _encode(term, out)
+    return bytes(out)
+
+
+try:
+    import erlpack
+except ImportError:
+    erlpack = None
+
+ACCELERATED = erlpack is not None
+"""Whether erlpack is doing the work instead of the pure python implementation."""
+
+
+def loads(data: bytes) -> typing.Any:
+    """Decodes one ETF frame into the same dict the JSON encoding would give."""
+    if erlpack is not None:
+        return _normalize(erlpack.unpack(data))
+    return _py_loads(data)
+
+
+def dumps(term: typing.Any) -> bytes:
+    """Encodes a payload to send over an ETF gateway connection."""
+    if erlpack is not None:
+        return erlpack.pack(term)
+    return _py_dumps(term)
@@ -0,0 +1,193 @@
+"""
+The outbound side of a gateway connection.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+Every payload sent over a connection goes through it's `GatewaySendQueue`, so nothing can go past discord's
+send ratelimit. Heartbeats and IDENTIFY/RESUME skip the line (`send_now`), everything else waits it's turn (`send`).
+"""
+
+import asyncio
+import collections
+import time
+import typing
+
+from .ratelimit import GatewayLimiter
+from .shared_types import logger
+
+
+def coalesce_key(payload: dict) -> typing.Hashable | None:
+    """Returns what a payload replaces when it's queued, or None if it doesn't replace anything.
+    Only the latest presence (op 3) and the latest voice state of every guild (op 4) matter, older ones would be overwritten straight away.
+    """
+    op = payload.get("op")
+    if op == 3:
+        return ("presence",)
+    if op == 4:
+        return ("voice_state", str(payload["d"]["guild_id"]))
+    return None
+
+
+class _Entry:
+    def __init__(self, payload: dict, key: typing.Hashable | None):
+        self.payload = payload
+        self.key = key
+        self.queued_at = time.monotonic()
+        self.waiters: list[asyncio.Future] = []
+
+
+class GatewaySendQueue:
+    """Sends the payloads of one connection in order, as fast as it's `GatewayLimiter` allows.
+    A queued presence or voice state update that hasn't gone out yet is replaced by a newer one instead of both being sent,
+    and whoever was waiting on the old one is told once the new one goes out.
+
+    The queue outlives it's connections: while disconnected, payloads wait until `attach` is called with the next connection's send function.
+    """
+
+    def __init__(self, limiter: GatewayLimiter | None = None, name: str = "gateway", window: int = 100):
+        """
+        Args:
+            limiter (GatewayLimiter | None, optional): The send budget. Defaults to None, which makes one with discord's limit.
+            name (str, optional): What to call this connection in the logs. Defaults to "gateway".
+            window (int, optional): How many sends `average_latency` is worked out over. Defaults to 100.
+        """
+        self.limiter = limiter if limiter is not None else GatewayLimiter()
+        self.name = name
+        self._send: typing.Callable[[dict], typing.Awaitable[typing.Any]] | None = None
+        self._entries: collections.deque[_Entry] = collections.deque()
+        self._coalescable: dict[typing.Hashable, _Entry] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.sent: int = 0
+        self.coalesced: int = 0
+        """How many payloads were replaced by a newer one before they went out."""
+        self.latencies: collections.deque[float] = collections.deque(maxlen=window)
+        """How long the last `window` payloads waited in the queue, in seconds."""
+        self.max_latency: float = 0
+
+    def attach(self, send: typing.Callable[[dict], typing.Awaitable[typing.Any]]):
+        """Starts sending over a new connection, with a fresh send budget."""
+        self._send = send
+        self.limiter.reset()
+        self._wake()
+
+    def detach(self):
+        """Stops sending until the next `attach`, for when the connection closed."""
+        self._send = None
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name=f"inkcord-{self.name}-send")
+
+    def put(self, payload: dict) -> asyncio.Future:
+        """Queues a payload without waiting for it.
+
+        Returns:
+            asyncio.Future: Done once the payload (or whatever replaced it) has been sent.
+        """
+        self._ensure_running()
+        waiter = asyncio.get_running_loop().create_future()
+        key = coalesce_key(payload)
+        entry = self._coalescable.get(key) if key is not None else None
+        if entry is not None:
+            # latest wins, but it keeps the old one's place in line
+            entry.payload = payload
+            self.coalesced += 1
+        else:
+            entry = _Entry(payload, key)
+            self._entries.append(entry)
+            if key is not None:
+                self._coalescable[key] = entry
+        entry.waiters.append(waiter)
+        self._wake()
+        return waiter
+
+    async def send(self, payload: dict):
+        """Queues a payload and waits until it has been sent."""
+        await self.put(payload)
+
+    async def send_now(self, payload: dict):
+        """Sends a payload straight away, ahead of the queue, for heartbeats and IDENTIFY/RESUME.
+        It only waits if even the headroom kept for these is used up.
+        """
+        if self._send is None:
+            raise ConnectionError(f"{self.name} isn't connected.")
+        delay = self.limiter.delay(urgent=True)
+        if delay > 0:
+            logger.warning(f"{self.name} used up it's whole send budget, holding an urgent payload for {delay:.2f}s.")
+            await asyncio.sleep(delay)
+        self.limiter.record()
+        await self._send(payload)
+
+    async def _run(self):
+        """INTERNAL!!! Sends the queued payloads one at a time."""
+        while True:
+            if not self._entries or self._send is None:
+                self._wakeup.clear()  # type: ignore
+                await self._wakeup.wait()  # type: ignore
+                continue
+            delay = self.limiter.delay()
+            if delay > 0:
+                logger.debug(f"{self.name} reached it's send ratelimit, {len(self._entries)} payload(s) waiting {delay:.2f}s.")
+                await asyncio.sleep(delay)
+                continue
+            entry = self._entries.popleft()
+            if entry.key is not None:
+                del self._coalescable[entry.key]
+            send = self._send
+            self.limiter.record()
+            try:
+                await send(entry.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                for waiter in entry.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                continue
+            latency = time.monotonic() - entry.queued_at
+            self.latencies.append(latency)
+            self.max_latency = max(self.max_latency, latency)
+            self.sent += 1
+            for waiter in entry.waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    @property
+    def depth(self) -> int:
+        """How many payloads are waiting to be sent."""
+        return len(self._entries)
+
+    @property
+    def latency(self) -> float | None:
+        """How long the last payload waited in the queue, in seconds."""
+        return self.latencies[-1] if self.latencies else None
+
+    @property
+    def average_latency(self) -> float | None:
+        """The average time payloads waited in the queue, over the last `window` sends."""
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    def close(self):
+        """Stops the queue, payloads that weren't sent yet fail with `ConnectionError`."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._send = None
+        while self._entries:
+            entry = self._entries.popleft()
+            for waiter in entry.waiters:
+                if not waiter.done():
+                    waiter.set_exception(ConnectionError(f"{self.name} was closed."))
+        self._coalescable.clear()
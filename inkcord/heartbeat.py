@@ -0,0 +1,117 @@
+"""
+The heartbeat of a gateway connection.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import collections
+import random
+import time
+import typing
+
+import websockets
+
+from .shared_types import logger
+
+
+class Heartbeat:
+    """Heartbeats one gateway connection on it's own task, independent of whatever frames come in.
+    The first beat goes out after a random part of the interval (what discord asks for), every other one exactly `interval` after the one before.
+    If a beat is due and the last one was never ACKed, the connection is a zombie: `on_zombie` is called and the heartbeat stops.
+    If the connection is closed under it, the heartbeat just stops, the reader sees the close too and reconnects.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        send: typing.Callable[[dict], typing.Awaitable[typing.Any]],
+        sequence: typing.Callable[[], int | None],
+        on_zombie: typing.Callable[[], typing.Awaitable[typing.Any]],
+        window: int = 10,
+    ):
+        """
+        Args:
+            interval (float): Seconds between beats, `heartbeat_interval` from HELLO divided by 1000.
+            send (Callable): Sends a payload over the connection.
+            sequence (Callable): Returns the last sequence number received, sent with every beat.
+            on_zombie (Callable): Called when an ACK was missed, should close the connection so it gets resumed.
+            window (int, optional): How many ACKs `average_latency` is worked out over. Defaults to 10.
+        """
+        self.interval = interval
+        self._send = send
+        self._sequence = sequence
+        self._on_zombie = on_zombie
+        self.latencies: collections.deque[float] = collections.deque(maxlen=window)
+        """The latency of the last `window` ACKed beats, in seconds."""
+        self.last_sent: float | None = None
+        self.last_ack: float | None = None
+        self.acked = True
+        """Whether the last beat has been ACKed."""
+        self.missed_acks: int = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self.stop()
+        self.acked = True
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self):
+        """INTERNAL!!! The heartbeat loop. Sleeps until the next deadline rather than for `interval`, so time spent sending doesn't add up."""
+        deadline = time.monotonic() + self.interval * random.random()
+        while True:
+            await asyncio.sleep(max(0, deadline - time.monotonic()))
+            if not self.acked:
+                self.missed_acks += 1
+                logger.warning(
+                    f"Heartbeat wasn't ACKed within {self.interval:.1f}s, the connection is a zombie. Reconnecting..."
+                )
+                self._task = None
+                await self._on_zombie()
+                return
+            try:
+                await self.beat()
+            except (websockets.ConnectionClosed, OSError) as e:
+                logger.debug(f"Heartbeat stopped, the connection is closed ({e!r}).")
+                self._task = None
+                return
+            deadline += self.interval
+
+    async def beat(self):
+        """Sends a heartbeat right now (also what to do when the gateway sends op 1)."""
+        self.acked = False
+        self.last_sent = time.perf_counter()
+        await self._send({"op": 1, "d": self._sequence()})
+        logger.debug("Heartbeat sent.")
+
+    def ack(self):
+        """Called on every op 11."""
+        self.acked = True
+        self.last_ack = time.perf_counter()
+        if self.last_sent is not None:
+            self.latencies.append(self.last_ack - self.last_sent)
+
+    @property
+    def latency(self) -> float | None:
+        """The latency of the last ACKed beat in seconds, None before the first ACK."""
+        return self.latencies[-1] if self.latencies else None
+
+    @property
+    def average_latency(self) -> float | None:
+        """The average latency over the last `window` ACKed beats."""
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
@@ -11,24 +11,46 @@ THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR I
 import http.client as httcl
 import asyncio
 import typing
-import json
+from . import codec, etf
 import os
 import logging
 import websockets
 import platform
 import random
-import urllib.parse
+import collections
+import concurrent.futures
+import itertools
+import threading
+import time
+
+from .cache import ResponseCache
+from .intents import IntentPlan, plan_intents, warn_missing
+from .members import MemberChunker
+from .dispatch import EventRegistry, HandlerPool, WaiterIndex, ordering_key
+from .gateway_queue import GatewaySendQueue
+from .heartbeat import Heartbeat
+from .multipart import MultipartBody
+from .pool import ConnectionPool
+from .transport import AsyncTransport
+from .zlib_stream import ZlibStreamDecompressor
+from .ratelimit import RateLimiter, GlobalLimiter
+from .retry import RetryPolicy, RETRYABLE_ERRORS, IDEMPOTENT_METHODS
+from .session_store import SessionStore
+from .shard import FATAL_CLOSE_CODES
+from .util import query_string
+from .scheduler import Priority, RequestScheduler, DEADLINES, priority_for
+from .shared_types import (
+    BitIntents,
+    RESUMABLE_CLOSE_CODES,
+    logger,
+    FormatterThreading,
+)
 
 if typing.TYPE_CHECKING:
-    from .shared_types import (
-        BitIntents,
-        RESUMABLE_CLOSE_CODES,
-        logger,
-        FormatterThreading,
-    )
     from .listener import EventListener
     from .exceptions import RequestException
     from .inter import Interaction
+    from .types.attach import Attachment
 
 
 handler = logging.StreamHandler()
@@ -47,39 +69,190 @@ class Request:
         method: typing.Literal["POST", "GET", "PUT", "DELETE", "PATCH"],
         data: dict | None,
         route: str,
+        headers: dict[str, str] | None = None,
+        priority: Priority | None = None,
+        files: "list[Attachment] | None" = None,
     ):
         self.method = method
-        self.data = json.dumps(data) if data else None
+        self.data = codec.dumps(data) if data and not files else None
         self.api_route = route
+        self.headers = headers or {}
+        """Extra headers sent on top of the client's own."""
+        self.multipart = MultipartBody(data or {}, files) if files else None
+        """The streamed multipart body, if this request uploads files. `data` is sent as it's `payload_json` part."""
+        if self.multipart is not None:
+            self.headers["Content-Type"] = self.multipart.content_type
+            self.headers["Content-Length"] = str(self.multipart.content_length)
+        self.priority = priority if priority is not None else priority_for(route)
+        """Which lane this request waits in for a connection. Interaction callbacks default to `Priority.INTERACTION`, everything else to `Priority.USER`."""
+        deadline = DEADLINES[self.priority]
+        self.deadline = time.monotonic() + deadline if deadline is not None else None
+
+
+    @property
+    def body(self) -> bytes | MultipartBody | None:
+        """What actually gets sent as the request body."""
+        return self.multipart if self.multipart is not None else self.data
+
+
+class Response:
+    """A fully read response. The body is read straight away so the connection can be reused by the next request."""
+
+    def __init__(self, status: int, headers: httcl.HTTPMessage, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def getcode(self) -> int:
+        return self.status
+
+    def read(self) -> bytes:
+        return self.body
+
+    def json(self) -> typing.Any:
+        return codec.loads(self.body)
+
+
+class BatchResult:
+    """The result of one request in a batch. Exactly one of `response` and `error` is set."""
+
+    def __init__(
+        self,
+        index: int,
+        request: Request,
+        response: Response | None,
+        error: BaseException | None,
+    ):
+        self.index = index
+        """The position of the request in the batch."""
+        self.request = request
+        self.response = response
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def _as_async_iterator(iterable: typing.Iterable) -> typing.AsyncIterator:
+    for item in iterable:
+        yield item
+
+
+ALWAYS_DECODED_EVENTS = frozenset({"READY", "RESUMED"})
+"""Dispatches that are decoded even when nothing listens to them, since the library needs them."""
 
 
 class AsyncClient:
     """This is the basis for http and gateway interactions. (do not instantiate, this class is already instantiated in inkcord.Client)"""
 
     def __init__(
-        self, token: str, intents: BitIntents, version: int = 10, gateway: bool = True
+        self,
+        token: str,
+        intents: BitIntents,
+        version: int = 10,
+        gateway: bool = True,
+        global_rate: float = 50,
+        pool_size: int = 10,
+        idle_timeout: float = 60,
+        cache: ResponseCache | None = None,
+        retry_policy: RetryPolicy | None = None,
+        compress: bool = True,
+        encoding: typing.Literal["json", "etf"] = "json",
+        handler_workers: int = 16,
+        handler_queue: int = 1000,
+        session_store: SessionStore | None = None,
+        minimize_intents: bool = False,
+        request_timeout: float | None = 30,
     ):
         self.headers = {
             "User-Agent": "DiscordBot (https://github.com/inkcord,0.1.0a)",
             "Content-Type": "application/json",
             "Authorization": f"Bot {token}",
         }
-        self.path: str = f"https://discord.com/api/v{version}/"
-        self.http_connection = httcl.HTTPSConnection(host=self.path)
-        self.http_connection.connect()
-        self.loop = asyncio.new_event_loop()
+        self.path: str = f"/api/v{version}/"
+        self.pool = ConnectionPool("discord.com", pool_size, idle_timeout, request_timeout)
+        self.transport = AsyncTransport(
+            "discord.com", 443, pool_size, idle_timeout, request_timeout
+        )
+        self.scheduler = RequestScheduler(pool_size)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        """Decides which failed requests get sent again, and keeps per route retry counts in `retry_policy.retries`."""
+        self.executors = {
+            priority: concurrent.futures.ThreadPoolExecutor(
+                max_workers=pool_size,
+                thread_name_prefix=f"inkcord-http-{priority.name.lower()}",
+            )
+            for priority in Priority
+        }
+        """One thread pool per priority lane. Threads sit in ratelimit and scheduler waits, so with a single pool
+        a pile of BACKGROUND requests would take every thread and an interaction reply would never even reach the scheduler."""
+        self.ratelimiter = RateLimiter()
+        self.cache = cache if cache is not None else ResponseCache()
+        """Cache for read only routes, see `inkcord.cache.ResponseCache` for how to configure or turn it off."""
+        self._inflight: dict[str, concurrent.futures.Future] = {}
+        self._inflight_tasks: dict[str, asyncio.Future] = {}
+        self._inflight_lock = threading.RLock()
+        self.coalesced_requests: int = 0
+        """How many GET requests were answered by an identical request that was already in flight."""
+        self.global_limiter = GlobalLimiter(global_rate)
         self.gateway = gateway
         self.gate_url: str | None = None
+        self.compress = compress
+        """Whether the gateway connection uses zlib-stream transport compression."""
+        self.encoding = encoding
+        """The gateway encoding, "json" or "etf". Both give the exact same payloads, only the wire format (and decode speed) differs."""
+        self.inflator: ZlibStreamDecompressor | None = None
+        """The decompressor of the current gateway connection, `inflator.ratio` says how much bandwidth it's saving."""
         self.num_reconnects: int = 0
+        """How many reconnects in a row haven't reached READY/RESUMED yet, the backoff before the next one grows with it."""
+        self.max_reconnects: int | None = 10
+        """How many reconnects in a row can fail before `establish_handshake` gives up. None keeps trying forever."""
+        self.session_id: str | None = None
+        self.resume_url: str | None = None
+        self.app_id: str | None = None
+        """The bot's application id, from READY (or the stored session, when the first connection RESUMEs)."""
+        self.session_store = session_store
+        """Where the session is kept between restarts, so `start` can RESUME it. None keeps it in memory only."""
+        self.heartbeat: Heartbeat | None = None
+        """The heartbeat of the current gateway connection."""
+        self.gateway_conn: typing.Any = None
+        self.gateway_queue = GatewaySendQueue()
+        """Everything sent over the gateway connection goes through here (when it isn't sharded, every shard has it's own).
+        `gateway_queue.depth` and `gateway_queue.average_latency` say how far behind it is."""
+        self.member_chunker = MemberChunker(self)
+        """Sends REQUEST_GUILD_MEMBERS and routes the chunks back by nonce."""
+        self.shard_manager: typing.Any = None
+        """The `ShardManager` running this client's shards, when it's sharded."""
         self.event_listeners: list[EventListener] = []
+        self.dispatcher = EventRegistry()
+        """Where event handlers and slash commands are looked up when an event comes in, handlers can be added and removed at any time."""
+        self.waiters = WaiterIndex()
+        """The pending `Client.wait_for` calls."""
+        self.handler_pool = HandlerPool(handler_workers, handler_queue)
+        """Runs the event handlers, `handler_pool.queue_depth` and `handler_pool.lag` say how far behind they are."""
+        self.decoded_bytes: int = 0
+        """How many bytes of gateway payloads were decoded."""
+        self.skipped_bytes: int = 0
+        """How many bytes of gateway payloads were dropped without decoding, since nothing listens to their event."""
+        self.skipped_events: int = 0
+        self.skipped_by_event: collections.Counter[str] = collections.Counter()
+        """Bytes of skipped payloads per event name, to see which events are worth dropping an intent for."""
         self.s: int = 0
         self.interval = 0
         self.token = token
         self.intents = intents
+        self.minimize_intents = minimize_intents
+        """Whether to IDENTIFY with only the intents the registered listeners need, instead of `intents`."""
+        self.required_intents: int = 0
+        """Intents needed for something other than listeners, always kept when minimizing. Add to it with `require`."""
+        self.required_events: set[str] = set()
+        """Events needed without a listener (like ones that are only ever `wait_for`ed), their intents are kept when minimizing."""
+        self.intent_plan: IntentPlan | None = None
+        """The intents worked out at the last IDENTIFY, `intent_plan.report()` says what was dropped."""
         self.version = version
         self.slash_cmds = []
         self._debug = True if "debug" in os.listdir("..") else False
-        self.pending_reqs = []
 
     @classmethod
     def setup(
@@ -88,262 +261,861 @@ class AsyncClient:
         intents: BitIntents,
         version: int = 10,
         gateway: bool = True,
-        event_listners: list[EventListener] | None = None,
+        event_listners: "list[EventListener] | None" = None,
+        global_rate: float = 50,
+        pool_size: int = 10,
+        idle_timeout: float = 60,
+        cache: ResponseCache | None = None,
+        retry_policy: RetryPolicy | None = None,
+        compress: bool = True,
+        encoding: typing.Literal["json", "etf"] = "json",
+        handler_workers: int = 16,
+        handler_queue: int = 1000,
+        session_store: SessionStore | None = None,
+        minimize_intents: bool = False,
+        request_timeout: float | None = 30,
     ):
         """A class method that does the gateway setup."""
-        class_setup = cls(token, intents, version, gateway)
+        class_setup = cls(
+            token,
+            intents,
+            version,
+            gateway,
+            global_rate,
+            pool_size,
+            idle_timeout,
+            cache,
+            retry_policy,
+            compress,
+            encoding,
+            handler_workers,
+            handler_queue,
+            session_store,
+            minimize_intents,
+            request_timeout,
+        )
         class_setup.get_gateway_url()
         class_setup.event_listeners = event_listners  # pyright: ignore
+        for listener in event_listners or ():
+            class_setup.dispatcher.add_listener(listener)
         return class_setup
 
-    def send_multiple_requests(self, *requests: list[Request]):
-        """Lowest level interface in this library to send and recieve the result of multiple requests."""
-        futures: list[asyncio.Future] = []
-        for request in requests:
-            self.loop.run_in_executor(
+    def close(self):
+        """Stops the REST thread pools and closes every idle connection. Requests that are already running still finish."""
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
+        self.pool.close()
+        self.transport.close()
+
+    def send_multiple_requests(self, *requests: Request) -> list[BatchResult]:
+        """Sends multiple requests at once (at most `pool_size` at a time) and waits for all of them.
+        One request failing doesn't stop the others, check `BatchResult.error` on each result.
+        Coroutines should use `send_batch` or `iter_batch` instead.
+
+        Returns:
+            list[BatchResult]: One result per request, in the same order as `requests`.
+        """
+        futures = [self._submit_sync(request) for request in requests]
+        results = []
+        for index, (request, future) in enumerate(zip(requests, futures)):
+            try:
+                results.append(BatchResult(index, request, future.result(), None))
+            except Exception as e:
+                results.append(BatchResult(index, request, None, e))
+        return results
+
+    async def send_batch(
+        self,
+        requests: typing.Iterable[Request] | typing.AsyncIterable[Request],
+        concurrency: int = 10,
+    ) -> list[BatchResult]:
+        """Sends a batch of requests, with at most `concurrency` in flight at a time, and waits for all of them.
+        Every request still waits on it's own ratelimit bucket, so requests to different buckets
+        keep going while one bucket is exhausted. One request failing doesn't stop the others.
+
+        Example:
+        ```python
+
+        results = await bot._CONN.send_batch(
+            Request(
+                "PUT",
                 None,
-                self.http_connection.request,
-                request.method,
-                f"{self.path}{request.api_route}",
-                request.data,
-                self.headers,
+                f"guilds/{guild_id}/members/{member}/roles/{role_id}",
+                priority=Priority.BACKGROUND,
             )
-            # this also needs to run in an executor so it's also multithreaded and isn't blocking
-            current_future = self.loop.run_in_executor(
-                None, self.http_connection.getresponse
+            for member in members
+        )
+        failed = [result for result in results if not result.ok]
+
+        ```
+
+        Args:
+            requests (Iterable[Request] | AsyncIterable[Request]): The requests to send. They're pulled lazily, so this can be a generator.
+            concurrency (int, optional): How many requests can be in flight at once. Defaults to 10.
+
+        Returns:
+            list[BatchResult]: One result per request, in the same order as `requests`.
+        """
+        results = [result async for result in self.iter_batch(requests, concurrency)]
+        results.sort(key=lambda result: result.index)
+        return results
+
+    async def iter_batch(
+        self,
+        requests: typing.Iterable[Request] | typing.AsyncIterable[Request],
+        concurrency: int = 10,
+    ) -> typing.AsyncIterator[BatchResult]:
+        """Like `send_batch`, but yields every result as soon as it's request finishes instead of waiting for all of them.
+        `BatchResult.index` is the position of the request in `requests`.
+        Breaking out of the loop cancels whatever requests are still in flight."""
+        if isinstance(requests, typing.AsyncIterable):
+            source = requests.__aiter__()
+        else:
+            source = _as_async_iterator(requests)
+        pull_lock = asyncio.Lock()
+        indexes = itertools.count()
+        results: asyncio.Queue[BatchResult] = asyncio.Queue()
+
+        async def worker():
+            while True:
+                # async generators can't be advanced by two workers at once
+                async with pull_lock:
+                    try:
+                        request = await source.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    index = next(indexes)
+                try:
+                    response = await self._submit(request)
+                    await results.put(BatchResult(index, request, response, None))
+                except Exception as e:
+                    await results.put(BatchResult(index, request, None, e))
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        finished = asyncio.gather(*workers)
+        # retrieves the CancelledError if the loop cancels the workers before this generator gets closed
+        finished.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            while True:
+                getter = asyncio.ensure_future(results.get())
+                await asyncio.wait(
+                    {getter, finished}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter.done():
+                    yield getter.result()
+                    continue
+                getter.cancel()
+                while not results.empty():
+                    yield results.get_nowait()
+                finished.result()
+                return
+        finally:
+            # cancelling the gather cancels every worker that's still running
+            finished.cancel()
+
+    async def _submit(self, request: Request) -> Response:
+        """INTERNAL!!!
+        Sends an already built request, going through the cache and in-flight GET coalescing like `request` does."""
+        if request.method == "GET" and not request.headers:
+            return await self.request(
+                "GET", request.api_route, priority=request.priority
             )
-            futures.append(current_future)
-            # absolutely no idea if the *args argument is for the func or not
-        return futures
+        return await self._request(request)
 
     def send_request(
         self,
         method: typing.Literal["POST", "GET", "PUT", "DELETE", "PATCH"],
         route: str,
         data: dict | None = None,
+        priority: Priority | None = None,
+        files: "list[Attachment] | None" = None,
         **params,
     ):
-        """Lowest level interface in this library to send and recieve the result of a request"""
-        if method == "GET" or method == "DELETE":
-            self.loop.run_in_executor(
-                None,
-                self.http_connection.request,
-                method,
-                f"{self.path}{route}{urllib.parse.urlencode(params)}",
-                None,
-                self.headers,
+        """Lowest level interface in this library to send and recieve the result of a request.
+        If `files` is given the request is sent as multipart/form-data, with `data` as the `payload_json` part and the files streamed after it.
+        """
+        if params:
+            route = f"{route}?{query_string(params)}"
+        if method != "GET":
+            return self._submit_sync(
+                Request(method, data, route, priority=priority, files=files)
             )
-        else:
-            request_to_check = self.loop.run_in_executor(
-                None, self.http_connection.request, method, f"{self.path}{route}", data
+        cached = self._cached_request(route, priority)
+        if isinstance(cached, Response):
+            future = concurrent.futures.Future()
+            future.set_result(cached)
+            return future
+        # identical GETs that are already in flight share one request instead of each sending their own
+        with self._inflight_lock:
+            future = self._inflight.get(route)
+            if future is not None:
+                self.coalesced_requests += 1
+                return future
+            future = self._submit_sync(cached)
+            self._inflight[route] = future
+            future.add_done_callback(lambda _: self._forget_inflight(route, future))
+            return future
+
+    def _submit_sync(self, request: Request) -> concurrent.futures.Future:
+        """INTERNAL!!! Runs `_dispatch` for a request on the thread pool of it's priority lane."""
+        return self.executors[request.priority].submit(self._dispatch, request)
+
+    def _cached_request(
+        self, route: str, priority: Priority | None = None
+    ) -> "Response | Request":
+        """INTERNAL!!!
+        Returns the cached response for a GET if it's still fresh. Otherwise returns the request to send,
+        which asks discord to only send the body again if it changed when there's a stale copy with an ETag."""
+        if not self.cache.cacheable(route):
+            return Request("GET", None, route, priority=priority)
+        entry = self.cache.get(route)
+        if entry is not None and entry.expires_at > time.monotonic():
+            return entry.response
+        if entry is not None and entry.etag:
+            return Request(
+                "GET", None, route, {"If-None-Match": entry.etag}, priority
             )
-            result_to_check = self.loop.run_in_executor(
-                None, self.http_connection.getresponse
-            )  # we can ensure there's only one of these
-            jsonified = json.loads(result_to_check.result().read())
-            self.requests_left = result_to_check.result().headers.getallmatchingheaders(
-                "X-Ratelimit-Remaining"
-            )[0]
-            if result_to_check.result().getcode() == 429:
-                logger.warning(
-                    "Reached ratelimit, checking fields for when to send again."
-                )
-                logger.warning(
-                    f"Sending pending request(s) in {jsonified["retry_after"]}s."
+        return Request("GET", None, route, priority=priority)
+
+    def _store_response(self, request: Request, response: Response) -> Response:
+        """INTERNAL!!!
+        Keeps successful GETs in the cache, and drops cached copies of anything another method may have changed."""
+        if request.method != "GET":
+            self.cache.invalidate(request.api_route)
+            return response
+        if response.status == 304:
+            cached = self.cache.revalidate(request.api_route)
+            if cached is not None:
+                return cached
+            return response
+        if self.cache.cacheable(request.api_route):
+            self.cache.set(request.api_route, response)
+        return response
+
+    def _forget_inflight(self, route: str, future: concurrent.futures.Future):
+        with self._inflight_lock:
+            if self._inflight.get(route) is future:
+                del self._inflight[route]
+
+    def _dispatch(self, request: Request) -> Response:
+        """INTERNAL!!!
+        Waits for the request's bucket to have room, sends it, and feeds the ratelimit headers back to the limiter.
+        Requests that still get a 429 are held until `retry_after` and sent again, 5xx and connection errors go through `retry_policy`."""
+        attempt = 0
+        while True:
+            delay = self.ratelimiter.reserve(request.method, request.api_route)
+            if delay > 0:
+                time.sleep(delay)
+            self.ratelimiter.release(request.method, request.api_route, delay)
+            global_delay = self.global_limiter.reserve(request.api_route)
+            if global_delay > 0:
+                time.sleep(global_delay)
+            self.global_limiter.release(global_delay)
+            while self.global_limiter.pause_remaining(request.api_route) > 0:
+                time.sleep(self.global_limiter.pause_remaining(request.api_route))
+            self.scheduler.acquire_sync(request.priority, request.deadline)
+            attempt += 1
+            self.retry_policy.record_request()
+            error = None
+            try:
+                response = self._send(request)
+            except RETRYABLE_ERRORS as e:
+                error = e
+            finally:
+                self.scheduler.release()
+            backoff = self.retry_policy.retry_after(
+                request.method,
+                request.api_route,
+                attempt,
+                None if error else response.status,
+                error,
+            )
+            if backoff is not None:
+                time.sleep(backoff)
+                continue
+            if error is not None:
+                raise error
+            if not self._handle_response(request, response):
+                return self._store_response(request, response)
+
+    async def request(
+        self,
+        method: typing.Literal["POST", "GET", "PUT", "DELETE", "PATCH"],
+        route: str,
+        data: dict | None = None,
+        priority: Priority | None = None,
+        files: "list[Attachment] | None" = None,
+        **params,
+    ) -> Response:
+        """The coroutine version of `send_request`. Nothing here blocks, so it's safe to await from the gateway loop.
+
+        Args:
+            method (Literal["POST", "GET", "PUT", "DELETE", "PATCH"]): The HTTP method of the request.
+            route (str): The api route, without the `/api/vX/` prefix.
+            data (dict | None, optional): The JSON body of the request. Defaults to None.
+            priority (Priority | None, optional): Which lane the request waits in for a connection. Defaults to None, which picks one from the route.
+            files (list[Attachment] | None, optional): Files to upload with the request, streamed from their file objects. Defaults to None.
+            params: Query string parameters.
+
+        Returns:
+            Response: The fully read response.
+        """
+        if params:
+            route = f"{route}?{query_string(params)}"
+        if method != "GET":
+            return await self._request(
+                Request(method, data, route, priority=priority, files=files)
+            )
+        cached = self._cached_request(route, priority)
+        if isinstance(cached, Response):
+            return cached
+        task = self._inflight_tasks.get(route)
+        if task is None:
+            task = asyncio.ensure_future(self._request(cached))
+            self._inflight_tasks[route] = task
+            task.add_done_callback(lambda _: self._inflight_tasks.pop(route, None))
+        else:
+            self.coalesced_requests += 1
+        # shielded so one waiter getting cancelled doesn't cancel the request for everyone else
+        return await asyncio.shield(task)
+
+    async def _request(self, request: Request) -> Response:
+        """INTERNAL!!!
+        The coroutine version of `_dispatch`."""
+        attempt = 0
+        while True:
+            delay = self.ratelimiter.reserve(request.method, request.api_route)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.ratelimiter.release(request.method, request.api_route, delay)
+            global_delay = self.global_limiter.reserve(request.api_route)
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+            self.global_limiter.release(global_delay)
+            while self.global_limiter.pause_remaining(request.api_route) > 0:
+                await asyncio.sleep(
+                    self.global_limiter.pause_remaining(request.api_route)
                 )
-                self.retry_after = jsonified["retry_after"]
-                self.pending_reqs.append([method, data, route])
-                self.loop.run_in_executor(None, self.handle_http_ratelimit)
-            if result_to_check.result().getcode() >= 400:
-                raise RequestException(
-                    "send_request(): Raised RequestException due to response code being above (or equal to) 400, indicating an error. Check authentication or to make sure that the request body is not malformed."
+            await self.scheduler.acquire(request.priority, request.deadline)
+            attempt += 1
+            self.retry_policy.record_request()
+            error = None
+            try:
+                status, headers, body = await self.transport.request(
+                    request.method,
+                    f"{self.path}{request.api_route}",
+                    request.body,
+                    {**self.headers, **request.headers},
                 )
-            if int(self.requests_left.split(":")[1]) < 5:
+            except RETRYABLE_ERRORS as e:
+                error = e
+            finally:
+                self.scheduler.release()
+            backoff = self.retry_policy.retry_after(
+                request.method,
+                request.api_route,
+                attempt,
+                None if error else status,
+                error,
+            )
+            if backoff is not None:
+                await asyncio.sleep(backoff)
+                continue
+            if error is not None:
+                raise error
+            response = Response(status, headers, body)
+            if not self._handle_response(request, response):
+                return self._store_response(request, response)
+
+    def _handle_response(self, request: Request, response: Response) -> bool:
+        """INTERNAL!!!
+        Feeds the ratelimit headers of a response back to the limiters.
+
+        Returns:
+            bool: True if the request got ratelimited and should be sent again.
+        """
+        self.ratelimiter.update(request.method, request.api_route, response.headers)
+        if response.status == 429:
+            try:
+                body = response.json()
+            except Exception:
+                # cloudflare's ban page is HTML, and the ban covers every route
+                retry_after = float(response.headers.get("Retry-After", 1))
                 logger.warning(
-                    "!!! Bot may hit ratelimit soon, remaining requests less than 5. !!! Please remove any unnecessary API calls if you want to prevent this from happening."
+                    f"Got a 429 that isn't from discord's API, pausing all requests for {retry_after}s."
                 )
-            else:
-                return result_to_check
+                self.global_limiter.on_ratelimited(retry_after)
+                return True
+            retry_after = float(body["retry_after"])
+            if (
+                body.get("global")
+                or response.headers.get("X-RateLimit-Global")
+                or response.headers.get("X-RateLimit-Scope") == "global"
+            ):
+                self.global_limiter.on_ratelimited(retry_after)
+                return True
+            logger.warning(
+                f"Reached ratelimit on bucket {response.headers.get('X-RateLimit-Bucket')}, sending request to {request.api_route} again in {retry_after}s."
+            )
+            self.ratelimiter.on_ratelimited(
+                request.method, request.api_route, retry_after
+            )
+            return True
+        if response.status >= 400:
+            from .exceptions import RequestException
+
+            raise RequestException(
+                "send_request(): Raised RequestException due to response code being above (or equal to) 400, indicating an error. Check authentication or to make sure that the request body is not malformed."
+            )
+        return False
+
+    def _send(self, request: Request) -> Response:
+        """INTERNAL!!!
+        Sends a request on it's own pooled connection and reads the whole response.
+        A keep-alive connection can get closed by discord right as we reuse it, so that case gets one more try on a fresh connection,
+        but only for idempotent methods: a POST may have reached discord before the connection died, and sending it again could apply it twice.
+        """
+        while True:
+            conn = self.pool.acquire()
+            reused = conn.requests_sent > 0
+            try:
+                conn.request(
+                    request.method,
+                    f"{self.path}{request.api_route}",
+                    request.body,
+                    {**self.headers, **request.headers},
+                )
+                raw = conn.getresponse()
+                response = Response(raw.status, raw.headers, raw.read())
+            except (
+                httcl.RemoteDisconnected,
+                ConnectionResetError,
+                BrokenPipeError,
+            ):
+                self.pool.release(conn, reusable=False)
+                if not reused or request.method not in IDEMPOTENT_METHODS:
+                    raise
+                logger.debug("Pooled connection was closed by discord, retrying.")
+                continue
+            except BaseException:
+                self.pool.release(conn, reusable=False)
+                raise
+            conn.requests_sent += 1
+            self.pool.release(conn)
+            return response
 
     def get_gateway_url(self):
         url = self.send_request("GET", "gateway", None)
-        url_response = url.result()  # pyright: ignore[reportOptionalMemberAccess]
-        url_unwrap: dict[str, str] = json.loads(url_response.msg.as_string())
+        url_unwrap: dict[str, str] = url.result().json()
         self.gate_url: str | None = url_unwrap["url"]
 
-    async def send_heartbeat(
-        self, serialized_data: dict, gateway: websockets.ClientConnection
+    def _gateway_address(self, url: str) -> str:
+        """INTERNAL!!! Adds the query string (version, encoding and compression) to a gateway url."""
+        query = f"v={self.version}&encoding={self.encoding}"
+        if self.compress:
+            query += "&compress=zlib-stream"
+        return f"{url.rstrip('/')}/?{query}"
+
+    def _new_inflator(self):
+        """INTERNAL!!! Starts a fresh zlib context, every gateway connection is it's own zlib stream."""
+        self.inflator = ZlibStreamDecompressor() if self.compress else None
+
+    def _decode_frame(self, frame: str | bytes) -> typing.Any:
+        """INTERNAL!!! Decodes one gateway frame, returns None if it was only part of a compressed message."""
+        if self.inflator is not None and isinstance(frame, bytes):
+            frame = self.inflator.feed(frame)
+            if frame is None:
+                return None
+        return self._decode_payload(frame)
+
+    def _decode_payload(self, message: str | bytes) -> typing.Any:
+        """INTERNAL!!! Decodes one whole (already decompressed) gateway message with the connection's encoding.
+        Dispatches nobody wants aren't decoded at all, they come back as `{"op": 0, "t": ..., "s": ..., "skipped": True}` (without `d`).
+        ETF payloads are always decoded, there's no cheap way to peek at them.
+        """
+        if self.encoding != "etf":
+            head = codec.peek_event(message)
+            if head is not None and head[0] == 0 and not self.wants_event(head[1]):  # type: ignore
+                self.skipped_events += 1
+                self.skipped_bytes += len(message)
+                self.skipped_by_event[head[1]] += len(message)  # type: ignore
+                return {"op": 0, "t": head[1], "s": head[2], "skipped": True}
+        self.decoded_bytes += len(message)
+        if self.encoding == "etf":
+            return etf.loads(message)
+        return codec.loads(message)
+
+    def require(self, intents: int = 0, events: typing.Iterable[str] = ()):
+        """Declares intents (or events, whose intents are worked out) that are needed for something other than listeners,
+        so minimizing never drops them. Only intents the bot was made with are ever used, and it takes effect at the next IDENTIFY.
+        """
+        from .dispatch import event_key
+
+        self.required_intents |= intents
+        self.required_events.update(event_key(event) for event in events)
+
+    def _needed_events(self) -> set[str]:
+        """INTERNAL!!! Every event something could want: listeners, pending waiters and declared events."""
+        return self.dispatcher.events | self.waiters.events | self.required_events
+
+    def _identify_intents(self) -> int:
+        """INTERNAL!!! The intents to IDENTIFY with. Also warns about listeners whose events can't arrive with them."""
+        plan = plan_intents(
+            self.intents,
+            self._needed_events(),
+            self.required_intents | self.member_chunker.intents,
+            self.minimize_intents,
+        )
+        if self.intent_plan is None or plan.intents != self.intent_plan.intents:
+            warn_missing(plan)
+            if self.minimize_intents:
+                logger.info(plan.report())
+        self.intent_plan = plan
+        return plan.intents
+
+    def intent_report(self) -> str:
+        """Describes what minimizing would drop for the current listeners, and how many of the bytes received so far that is.
+        Run without `minimize_intents` for a while first: once intents are dropped their events don't arrive, so they can't be counted.
+        """
+        return plan_intents(
+            self.intents,
+            self._needed_events(),
+            self.required_intents | self.member_chunker.intents,
+        ).report(self.skipped_by_event)
+
+    def wants_event(self, name: str) -> bool:
+        """Whether a dispatch has to be decoded: the library itself needs it, or something is listening to it."""
+        if name in ALWAYS_DECODED_EVENTS or self.dispatcher.listens_to(name):
+            return True
+        if name == "GUILD_MEMBERS_CHUNK" and self.member_chunker.pending:
+            return True
+        if self.waiters.waiting_for(name):
+            return True
+        return name == "INTERACTION_CREATE" and bool(self.dispatcher.commands)
+
+    def _encode_frame(self, payload: dict) -> str | bytes:
+        """INTERNAL!!! Encodes a payload for the gateway, ETF goes out as a binary frame and JSON as a text frame."""
+        if self.encoding == "etf":
+            return etf.dumps(payload)
+        return codec.dumps_text(payload)
+
+    def _start_heartbeat(self, interval: int, gateway: websockets.ClientConnection):
+        """INTERNAL!!! Starts the heartbeat of a new connection (and stops the one of the old connection, if it's still going)."""
+        if self.heartbeat is not None:
+            self.heartbeat.stop()
+        self.interval = interval
+        self.heartbeat = Heartbeat(
+            interval / 1000,
+            self.gateway_queue.send_now,
+            lambda: self.s if self.s > 0 else None,
+            # closing with 4000 keeps the session, so the close leads to a RESUME
+            lambda: gateway.close(4000),
+        )
+        self.heartbeat.start()
+        logger.info(f"Initiated heartbeat at {interval}ms.")
+
+    async def send_gateway(self, payload: dict, guild_id: int | str | None = None):
+        """Queues a payload on the gateway connection's send queue and waits until it's sent.
+        When the client is sharded, it goes out on the shard of `guild_id` (or the first shard, without one).
+        """
+        if self.shard_manager is not None:
+            if guild_id is not None:
+                shard = self.shard_manager.shard_for(guild_id)
+            else:
+                shard = next(iter(self.shard_manager.shards.values()), None)
+            if shard is None:
+                raise ValueError(f"Guild {guild_id} isn't on any shard this client runs.")
+            await shard.send(payload)
+            return
+        await self.gateway_queue.send(payload)
+
+    async def update_presence(
+        self,
+        status: typing.Literal["online", "dnd", "idle", "invisible", "offline"] = "online",
+        activities: list[dict] | None = None,
+        afk: bool = False,
+        since: int | None = None,
     ):
-        if serialized_data["op"] == 11:
-            await asyncio.sleep(self.interval / 1000)
-            await gateway.send(
-                json.dumps({"op": 1, "d": self.s if self.s > 0 else None})
-            )
-            logger.debug("Heartbeat sent.")
-        # this is temporary, to make sure it's sending the heartbeats correctly
-        elif serialized_data["op"] == 1:
-            await gateway.send(
-                json.dumps({"op": 1, "d": self.s if self.s > 0 else None})
-            )
-            logger.debug("Heartbeat sent immediately.")
+        """Changes the bot's presence (on every shard, when sharded). If an update is still queued, it's replaced by this one instead of both going out.
 
-    async def send_heartbeat_forever(self, gateway: websockets.ClientConnection):
-        while True:
-            a = (
-                await asyncio.sleep(self.interval / 1000)
-                if self.current_event["op"] != 1
-                else None
-            )  # effectively makes sure it doesn't wait if the op is 1 (this might seem chatgpt like but I just need clarification for myself ok T_T)
-            if self.current_event["op"] == 11:
-                await gateway.send(
-                    json.dumps({"op": 1, "d": self.s if self.s > 0 else None})
-                )
-                logger.debug("Heartbeat sent.")
-            if self.current_event["op"] == 1:
-                await gateway.send(
-                    json.dumps({"op": 1, "d": self.s if self.s > 0 else None})
-                )
-                logger.debug("Heartbeat sent immediately.")
+        Args:
+            status (Literal, optional): The new status. Defaults to "online".
+            activities (list[dict] | None, optional): Raw activity objects, like `{"name": "inkcord", "type": 0}`. Defaults to None.
+            afk (bool, optional): Whether the bot is AFK. Defaults to False.
+            since (int | None, optional): Unix time in milliseconds of when the bot went idle. Defaults to None.
+        """
+        payload = {
+            "op": 3,
+            "d": {"since": since, "activities": activities or [], "status": status, "afk": afk},
+        }
+        if self.shard_manager is not None:
+            await asyncio.gather(*(shard.send(payload) for shard in self.shard_manager.shards.values()))
+            return
+        await self.gateway_queue.send(payload)
 
-        # finally finished im guessing I have no idea
+    async def update_voice_state(
+        self,
+        guild_id: int | str,
+        channel_id: int | str | None,
+        self_mute: bool = False,
+        self_deaf: bool = False,
+    ):
+        """Joins, moves between or leaves (`channel_id=None`) voice channels. Only the latest queued update of a guild is sent."""
+        await self.send_gateway(
+            {
+                "op": 4,
+                "d": {
+                    "guild_id": str(guild_id),
+                    "channel_id": str(channel_id) if channel_id is not None else None,
+                    "self_mute": self_mute,
+                    "self_deaf": self_deaf,
+                },
+            },
+            guild_id,
+        )
+
+    def _attach_queue(self, gateway: websockets.ClientConnection):
+        """INTERNAL!!! Points the send queue at a new connection."""
+        self.gateway_queue.attach(lambda payload: gateway.send(self._encode_frame(payload)))
+
+    @property
+    def latency(self) -> float | None:
+        """The average gateway latency over the last few heartbeats, in seconds. None until the first heartbeat is ACKed."""
+        return self.heartbeat.average_latency if self.heartbeat is not None else None
 
     async def establish_handshake(self):
+        """Connects to the gateway and keeps it connected. Every time the connection closes it reconnects after an exponential backoff (with jitter),
+        RESUMEing when there's a session to resume and IDENTIFYing otherwise.
+
+        Raises:
+            GeneralException: The connection was closed with a close code that can't be recovered from (like a bad token),
+            or `max_reconnects` reconnects in a row failed.
+        """
+        from .exceptions import GeneralException
+
         logger.info(
             "Handshake routine was successfully called. Initiating handshake..."
         )
-        gateway = await websockets.connect(self.gate_url)  # type: ignore
-        self.gateway_conn = gateway
-        event_queue = []
-        async for message in gateway:
-            self.current_event = json.loads(message)
-            serialized_data = json.loads(message)
-            if self._debug:
-                logger.debug(message)
-            try:
-                if serialized_data["op"] == 10:
-                    self.jitter = random.uniform(0, 1)
-                    self.interval = (
-                        serialized_data["d"]["heartbeat_interval"] * self.jitter
-                    )
-                logger.info(f"Sending first heartbeat with a jitter of {self.jitter}")
-                await self.send_heartbeat(serialized_data, gateway)
-                logger.info(f"Initiated heartbeat at {self.interval}ms.")
-                self.interval = serialized_data["d"]["heartbeat_interval"]
-                self.loop.run_forever()
-                self.loop.create_task(
-                    self.send_heartbeat_forever(self.gateway_conn)
-                )  # this should work, hopefully it doesn't block
-                await gateway.send(
-                    message=json.dumps(
-                        {
-                            "op": 2,
-                            "d": {
-                                "token": self.token,
-                                "properties": {
-                                    "os": platform.platform(),
-                                    "browser": "inkcord",
-                                    "device": "inkcord",
-                                },
-                                "compress": False,
-                                "intents": self.intents,
-                            },
-                        }
-                    )
+        while True:
+            close_code = await self._connect(
+                self.session_id is not None and self.resume_url is not None
+            )
+            if close_code in FATAL_CLOSE_CODES:
+                raise GeneralException(
+                    f"Gateway connection was closed with code {close_code}, which can't be recovered from."
                 )
-                logger.info("Sent IDENTIFY packet. Waiting for response...")
-                if (
-                    serialized_data["op"] == 0
-                    and serialized_data["d"].get("v") == self.version
-                ):
-                    logger.info(
-                        f"Successfully connected to discord gateway with session id: {serialized_data["d"]["session_id"]}"
-                    )
-                    self.session_id = serialized_data["d"]["session_id"]
-                    self.resume_url = serialized_data["d"]["resume_gateway_url"]
-                    self.app_id = serialized_data["d"]["application"]["id"]
-                logger.info(
-                    "Gateway handshake is finished. Initiating normal operation."
+            if close_code in (RESUMABLE_CLOSE_CODES.INVALID_SEQ, RESUMABLE_CLOSE_CODES.TIMED_OUT):
+                # discord won't take a RESUME of this session anymore
+                self._forget_session()
+            self.num_reconnects += 1
+            if self.max_reconnects is not None and self.num_reconnects > self.max_reconnects:
+                raise GeneralException(
+                    f"Reconnecting to the gateway failed {self.max_reconnects} times in a row, giving up. Please report this error to the devs by creating an issue with tag `bug-report` at this link: \n https://github.com/sunset-hue/inkcord/issues"
                 )
-                for i in self.event_listeners:
-                    if i.event_name == self.current_event["t"]:
-                        await asyncio.create_task(
-                            coro=i.func(...)  # pyright: ignore[reportArgumentType]
-                        )
-                if self.current_event["t"] == "INTERACTION_CREATE":
-                    for i in self.slash_cmds:
-                        # this is where we're gonna pass off the interaction event to the command
-                        if i.name == self.current_event["d"]["name"]:
-                            from types.channel import Channel
-                            from types.guild import Guild
-                            from types.guild_mem import GuildMember
-
-                            arg_data = {
-                                x["name"]: x["value"]
-                                for x in self.current_event["d"]["options"]
-                            }
-                            guild = Guild(self.current_event["d"]["guild"])
-                            channel = Channel(self.current_event["d"]["channel"])
-                            member = GuildMember(self.current_event["d"]["member"])
-                            # only gonna support builtin types for now
-                            await asyncio.create_task(
-                                coro=i.func(
-                                    Interaction(
-                                        channel,
-                                        member,
-                                        guild,
-                                        self.current_event["d"]["id"],
-                                        self.current_event["d"]["token"],
-                                        self,
-                                    ),
-                                    **arg_data,
-                                )
-                            )
-                            # here, we need some way to turn the parameter object straight into values that the slash command can use
+            delay = min(60, random.uniform(1, 2 ** min(self.num_reconnects, 6)))
+            logger.warning(
+                f"Gateway connection was closed with code {close_code}, reconnecting in {delay:.1f}s ({'RESUME' if self.session_id is not None else 'IDENTIFY'})..."
+            )
+            await asyncio.sleep(delay)
 
-            except (
-                websockets.exceptions.WebSocketException,
-                websockets.ConnectionClosed,
-            ) as e:
-                if isinstance(e, websockets.exceptions.WebSocketException):
-                    logger.error(
-                        f"Encountered an exception when initiating handshake. (starting reconnect...) Error: {e.args}"
-                    )
-                if isinstance(e, websockets.ConnectionClosed):
-                    logger.warning(
-                        f"Gateway connection was closed with code {e.code}. Running reconnection routine to check whether code is resumable..."
-                    )
-                    await self.reconnect(e.code)
-
-    async def reconnect(self, close_code: int):
-        self.num_reconnects += 1
-        if self.num_reconnects == 3:
-            logger.fatal(
-                f"Tried to reconnect 3 times, failed all of them. Please report this error to the devs by creating an issue with tag `bug-report` at this link: \n https://github.com/sunset-hue/inkcord/issues"
+    async def _connect(self, resuming: bool) -> int:
+        """INTERNAL!!! Runs one gateway connection until it closes.
+
+        Args:
+            resuming (bool): Whether to RESUME the current session on `resume_url` instead of IDENTIFYing on `gate_url`.
+
+        Returns:
+            int: The close code of the connection.
+        """
+        self._new_inflator()
+        close_code = 1006
+        try:
+            gateway = await websockets.connect(
+                self._gateway_address(self.resume_url if resuming else self.gate_url)  # type: ignore
             )
-        gateway = await websockets.connect(self.resume_url)
-        async for data in gateway:
-            serialized = json.loads(data)
-            if close_code not in RESUMABLE_CLOSE_CODES:
-                logger.info("Not a resumable code. Reverting back to handshake...")
-                await self.establish_handshake()
-            if serialized["op"] == 10:
-                message = {
-                    "op": 6,
+            self.gateway_conn = gateway
+            self._attach_queue(gateway)
+            async for message in gateway:
+                serialized_data = self._decode_frame(message)
+                if serialized_data is None:
+                    continue
+                self.current_event = serialized_data
+                if self._debug:
+                    logger.debug(serialized_data)
+                if serialized_data.get("s") is not None:
+                    self.s = serialized_data["s"]
+                await self._handle_handshake_payload(serialized_data, gateway, resuming)
+            if gateway.close_code is not None:
+                close_code = gateway.close_code
+        except websockets.ConnectionClosed as e:
+            close_code = self._close_code(e)
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            logger.error(f"Gateway connection failed: {e!r}")
+        finally:
+            if self.heartbeat is not None:
+                self.heartbeat.stop()
+            self.gateway_queue.detach()
+            self._save_session(force=True)
+        return close_code
+
+    @staticmethod
+    def _close_code(error: websockets.ConnectionClosed) -> int:
+        """INTERNAL!!! The close code discord sent, or the one we sent if discord never answered (like when closing a zombie connection)."""
+        if error.rcvd is not None:
+            return error.rcvd.code
+        if error.sent is not None:
+            return error.sent.code
+        return 1006
+
+    async def _handle_handshake_payload(
+        self, serialized_data: dict, gateway: websockets.ClientConnection, resuming: bool = False
+    ):
+        """INTERNAL!!! Handles one payload of a gateway connection.
+        Reconnect requests (op 7) and invalid sessions (op 9) close the connection with 4000, `establish_handshake` then reconnects
+        and RESUMEs, or IDENTIFYs if the session was invalid and not resumable.
+        """
+        op = serialized_data["op"]
+        if op == 10:
+            self._start_heartbeat(serialized_data["d"]["heartbeat_interval"], gateway)
+            if resuming:
+                await self.gateway_queue.send_now(
+                    {
+                        "op": 6,
+                        "d": {
+                            "token": self.token,
+                            "session_id": self.session_id,
+                            "seq": self.s,
+                        },
+                    }
+                )
+                logger.info("Sent RESUME packet. Waiting for response...")
+                return
+            await self.gateway_queue.send_now(
+                {
+                    "op": 2,
                     "d": {
                         "token": self.token,
-                        "session_id": self.session_id,
-                        "seq": self.s,
+                        "properties": {
+                            "os": platform.platform(),
+                            "browser": "inkcord",
+                            "device": "inkcord",
+                        },
+                        # this is payload compression, it can't be used together with zlib-stream so it always stays off
+                        "compress": False,
+                        "intents": self._identify_intents(),
                     },
                 }
-                await gateway.send(json.dumps(message))
-            if serialized["op"] == 0 and serialized["t"] == "RESUMED":
+            )
+            logger.info("Sent IDENTIFY packet. Waiting for response...")
+        elif op == 11:
+            self.heartbeat.ack()  # type: ignore
+        elif op == 1:
+            await self.heartbeat.beat()  # type: ignore
+        elif op == 7:
+            logger.info("Discord asked for a reconnect, resuming on a new connection...")
+            await gateway.close(4000)
+        elif op == 9:
+            if not serialized_data["d"]:
+                self._forget_session()
+            logger.warning(
+                f"Invalid session (resumable: {bool(serialized_data['d'])}), {'resuming' if serialized_data['d'] else 're-identifying'} on a new connection..."
+            )
+            # discord wants a random 1-5s wait before the next IDENTIFY/RESUME
+            await asyncio.sleep(random.uniform(1, 5))
+            await gateway.close(4000)
+        elif op == 0:
+            self._save_session()
+            if serialized_data.get("skipped"):
+                return
+            if serialized_data["t"] == "READY":
+                logger.info(
+                    f"Successfully connected to discord gateway with session id: {serialized_data["d"]["session_id"]}"
+                )
+                self.session_id = serialized_data["d"]["session_id"]
+                self.resume_url = serialized_data["d"]["resume_gateway_url"]
+                self.app_id = serialized_data["d"]["application"]["id"]
+                self.num_reconnects = 0
+                self._save_session(force=True)
+                logger.info(
+                    "Gateway handshake is finished. Initiating normal operation."
+                )
+            elif serialized_data["t"] == "RESUMED":
                 logger.info("Successfully RESUMED.")
-            if serialized["op"] == 9 and serialized["d"] == False:
-                logger.error("Invalid session. Reverting to handshake")
-                await self.establish_handshake()
-
-    async def handle_http_ratelimit(self):
-        await asyncio.sleep(self.retry_after)
-        for method, data, route in self.pending_reqs:
-            self.send_request(method, route, data)
-            logger.info("Sending missed request....")
+                self.num_reconnects = 0
+            await self._dispatch_event(serialized_data["t"], serialized_data["d"])
+
+    async def _dispatch_event(self, name: str, data: typing.Any, event: typing.Any = None):
+        """INTERNAL!!! Queues an event for it's handlers (and an interaction for it's command) on the handler pool.
+        Waits when the pool is full, which holds up the reader.
+
+        Args:
+            name (str): The event name.
+            data (Any): The `d` field of the event.
+            event (Any, optional): What the handlers get instead of `data`, like a `ShardEvent`.
+        """
+        if name == "GUILD_MEMBERS_CHUNK":
+            self.member_chunker.feed(data)
+        self.waiters.dispatch(name, data, event)
+        key = ordering_key(name, data)
+        for handler in self.dispatcher.handlers(name):
+            await self.handler_pool.submit(key, handler, data if event is None else event)
+        if name == "INTERACTION_CREATE" and data.get("type") == 2:
+            command = self.dispatcher.command(data["data"]["name"])
+            if command is not None:
+                await self.handler_pool.submit(key, self._run_command, command, data)
+
+    async def _run_command(self, command: typing.Any, data: dict):
+        """INTERNAL!!! Passes an interaction off to it's command."""
+        from .types.channel import Channel
+        from .types.guild import Guild
+        from .types.guild_mem import GuildMember
+        from .inter import Interaction
+
+        arg_data = {x["name"]: x["value"] for x in data["data"].get("options", ())}
+        guild = Guild(data["guild"])
+        channel = Channel(data["channel"])
+        member = GuildMember(data["member"])
+        # only gonna support builtin types for now
+        await command.func(
+            Interaction(
+                channel,
+                member,
+                guild,
+                data["id"],
+                data["token"],
+                self,
+            ),
+            **arg_data,
+        )
+
+    async def start(self):
+        """Connects to the gateway. With a `session_store`, the stored session is RESUMEd first (IDENTIFYing if discord says it's invalid)."""
+        if self.session_store is not None:
+            session = self.session_store.load()
+            if session is not None:
+                logger.info(
+                    f"Found stored session {session.session_id} (seq {session.seq}), trying to RESUME it..."
+                )
+                self.session_id = session.session_id
+                self.resume_url = session.resume_url
+                self.s = session.seq or 0
+                self.app_id = session.app_id
+                if self.app_id is None:
+                    # stored before app ids were, and a RESUME won't send READY to get it from
+                    response = await self.request("GET", "oauth2/applications/@me")
+                    self.app_id = response.json()["id"]
+        await self.establish_handshake()
+
+    def _save_session(self, force: bool = False):
+        """INTERNAL!!! Writes the current session to the session store, if there is one (at most every `save_interval` seconds unless forced)."""
+        if self.session_store is not None and self.session_id is not None:
+            self.session_store.save(
+                self.session_id, self.resume_url, self.s, force=force, app_id=self.app_id
+            )
+
+    def _forget_session(self):
+        """INTERNAL!!! Drops a session discord said is invalid."""
+        self.session_id = None
+        self.s = 0
+        if self.session_store is not None:
+            self.session_store.clear()
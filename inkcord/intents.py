@@ -0,0 +1,252 @@
+"""
+Works out which intents a bot actually needs from what it listens to.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+Every intent discord doesn't get asked for is a whole class of events it never sends, so this saves bandwidth and decoding
+on top of `AsyncClient.wants_event` (which still has to receive the event before dropping it).
+"""
+
+import fnmatch
+import typing
+
+from .shared_types import BitIntents, logger
+
+INTENT_EVENTS: dict[BitIntents, tuple[str, ...]] = {
+    BitIntents.GUILDS: (
+        "GUILD_CREATE",
+        "GUILD_UPDATE",
+        "GUILD_DELETE",
+        "GUILD_ROLE_CREATE",
+        "GUILD_ROLE_UPDATE",
+        "GUILD_ROLE_DELETE",
+        "CHANNEL_CREATE",
+        "CHANNEL_UPDATE",
+        "CHANNEL_DELETE",
+        "CHANNEL_PINS_UPDATE",
+        "THREAD_CREATE",
+        "THREAD_UPDATE",
+        "THREAD_DELETE",
+        "THREAD_LIST_SYNC",
+        "THREAD_MEMBER_UPDATE",
+        "THREAD_MEMBERS_UPDATE",
+        "STAGE_INSTANCE_CREATE",
+        "STAGE_INSTANCE_UPDATE",
+        "STAGE_INSTANCE_DELETE",
+    ),
+    BitIntents.GUILD_MEMBERS: (
+        "GUILD_MEMBER_ADD",
+        "GUILD_MEMBER_UPDATE",
+        "GUILD_MEMBER_REMOVE",
+        "THREAD_MEMBERS_UPDATE",
+    ),
+    BitIntents.GUILD_MODERATION: (
+        "GUILD_AUDIT_LOG_ENTRY_CREATE",
+        "GUILD_BAN_ADD",
+        "GUILD_BAN_REMOVE",
+    ),
+    BitIntents.GUILD_EXPRESSIONS: (
+        "GUILD_EMOJIS_UPDATE",
+        "GUILD_STICKERS_UPDATE",
+        "GUILD_SOUNDBOARD_SOUND_CREATE",
+        "GUILD_SOUNDBOARD_SOUND_UPDATE",
+        "GUILD_SOUNDBOARD_SOUND_DELETE",
+        "GUILD_SOUNDBOARD_SOUNDS_UPDATE",
+    ),
+    BitIntents.GUILD_INTEGRATIONS: (
+        "GUILD_INTEGRATIONS_UPDATE",
+        "INTEGRATION_CREATE",
+        "INTEGRATION_UPDATE",
+        "INTEGRATION_DELETE",
+    ),
+    BitIntents.GUILD_WEBHOOKS: ("WEBHOOKS_UPDATE",),
+    BitIntents.GUILD_INVITES: ("INVITE_CREATE", "INVITE_DELETE"),
+    BitIntents.GUILD_VOICE_STATES: ("VOICE_CHANNEL_EFFECT_SEND", "VOICE_STATE_UPDATE"),
+    BitIntents.GUILD_PRESENCES: ("PRESENCE_UPDATE",),
+    BitIntents.GUILD_MESSAGES: (
+        "MESSAGE_CREATE",
+        "MESSAGE_UPDATE",
+        "MESSAGE_DELETE",
+        "MESSAGE_DELETE_BULK",
+    ),
+    BitIntents.GUILD_MESSAGE_REACTIONS: (
+        "MESSAGE_REACTION_ADD",
+        "MESSAGE_REACTION_REMOVE",
+        "MESSAGE_REACTION_REMOVE_ALL",
+        "MESSAGE_REACTION_REMOVE_EMOJI",
+    ),
+    BitIntents.GUILD_MESSAGE_TYPING: ("TYPING_START",),
+    BitIntents.DIRECT_MESSAGES: (
+        "MESSAGE_CREATE",
+        "MESSAGE_UPDATE",
+        "MESSAGE_DELETE",
+        "CHANNEL_PINS_UPDATE",
+    ),
+    BitIntents.DIRECT_MESSAGE_REACTIONS: (
+        "MESSAGE_REACTION_ADD",
+        "MESSAGE_REACTION_REMOVE",
+        "MESSAGE_REACTION_REMOVE_ALL",
+        "MESSAGE_REACTION_REMOVE_EMOJI",
+    ),
+    BitIntents.DIRECT_MESSAGE_TYPING: ("TYPING_START",),
+    BitIntents.GUILD_SCHEDULED_EVENTS: (
+        "GUILD_SCHEDULED_EVENT_CREATE",
+        "GUILD_SCHEDULED_EVENT_UPDATE",
+        "GUILD_SCHEDULED_EVENT_DELETE",
+        "GUILD_SCHEDULED_EVENT_USER_ADD",
+        "GUILD_SCHEDULED_EVENT_USER_REMOVE",
+    ),
+    BitIntents.AUTOMOD_CONFIG: (
+        "AUTO_MODERATION_RULE_CREATE",
+        "AUTO_MODERATION_RULE_UPDATE",
+        "AUTO_MODERATION_RULE_DELETE",
+    ),
+    BitIntents.AUTOMOD_EXEC: ("AUTO_MODERATION_ACTION_EXECUTION",),
+    BitIntents.GUILD_MESSAGE_POLLS: ("MESSAGE_POLL_VOTE_ADD", "MESSAGE_POLL_VOTE_REMOVE"),
+    BitIntents.DIRECT_MESSAGE_POLLS: ("MESSAGE_POLL_VOTE_ADD", "MESSAGE_POLL_VOTE_REMOVE"),
+}
+"""The events every intent gets, same as the lists in the `BitIntents` docs."""
+
+EVENT_INTENTS: dict[str, tuple[BitIntents, ...]] = {}
+"""Every intent that can deliver an event. Some events come with more than one (MESSAGE_CREATE comes with GUILD_MESSAGES and DIRECT_MESSAGES)."""
+for _intent, _events in INTENT_EVENTS.items():
+    for _event in _events:
+        EVENT_INTENTS[_event] = EVENT_INTENTS.get(_event, ()) + (_intent,)
+
+PRIVILEGED_INTENTS = (
+    BitIntents.GUILD_MEMBERS | BitIntents.GUILD_PRESENCES | BitIntents.MESSAGE_CONTENT
+)
+"""These have to be turned on in the developer portal."""
+
+ALWAYS_KEPT = BitIntents.GUILDS
+"""Kept whatever the listeners are: GUILD_CREATE is how the library finds out about the bot's guilds, and without it nothing else about them arrives."""
+
+MESSAGE_EVENTS = ("MESSAGE_CREATE", "MESSAGE_UPDATE")
+"""Events that need MESSAGE_CONTENT to have the content in them."""
+
+
+def can_arrive(event: str, intents: int) -> bool:
+    """Whether discord sends an event to a bot with these intents. Events no intent is needed for always arrive."""
+    needed = EVENT_INTENTS.get(event)
+    return needed is None or any(intents & intent for intent in needed)
+
+
+def intent_names(intents: int) -> list[str]:
+    """Returns the names of every intent in a bitmask."""
+    return [intent.name for intent in BitIntents if intents & intent]  # type: ignore
+
+
+class IntentPlan:
+    """The intents worked out for a bot, and why."""
+
+    def __init__(self, requested: int, intents: int, events: set[str], missing: dict[str, tuple[BitIntents, ...]]):
+        self.requested = requested
+        """The intents the bot was made with."""
+        self.intents = intents
+        """The intents to IDENTIFY with."""
+        self.events = events
+        """Every event something listens to."""
+        self.missing = missing
+        """Listened events that can't arrive, and the intents they'd need."""
+
+    @property
+    def dropped(self) -> int:
+        """Intents that were asked for but aren't needed."""
+        return self.requested & ~self.intents
+
+    def dropped_events(self) -> list[str]:
+        """Events discord won't send anymore because of the dropped intents."""
+        events = set()
+        for intent, delivered in INTENT_EVENTS.items():
+            if self.dropped & intent:
+                events.update(
+                    event
+                    for event in delivered
+                    if not any(self.intents & other for other in EVENT_INTENTS[event])
+                )
+        return sorted(events)
+
+    def report(self, received_bytes: typing.Mapping[str, int] | None = None) -> str:
+        """Describes what was dropped and, given how many bytes each event took up so far, how much of that traffic is gone.
+
+        Those bytes can only be counted while the events still arrive, so they're only worth passing from a run that didn't minimize
+        (see `AsyncClient.intent_report`).
+
+        Args:
+            received_bytes (Mapping[str, int] | None, optional): Bytes received per event name, like `AsyncClient.skipped_by_event`.
+        """
+        lines = [
+            f"Intents: {self.intents} (asked for {self.requested}).",
+            f"Dropped: {', '.join(intent_names(self.dropped)) or 'nothing'}.",
+        ]
+        dropped_events = self.dropped_events()
+        if dropped_events:
+            lines.append(f"No longer received: {', '.join(dropped_events)}.")
+        if received_bytes:
+            saved = sum(received_bytes.get(event, 0) for event in dropped_events)
+            total = sum(received_bytes.values())
+            lines.append(
+                f"Those events were {saved} of the {total} bytes of unhandled events received so far."
+            )
+        return "\n".join(lines)
+
+
+def plan_intents(
+    requested: int,
+    events: typing.Iterable[str],
+    extra: int = 0,
+    minimize: bool = True,
+) -> IntentPlan:
+    """Works out the intents a bot needs for the events it listens to.
+
+    Args:
+        requested (int): The intents the bot was made with. Minimizing only ever drops some of these, it never adds any.
+        events (Iterable[str]): The event names (and wildcard patterns) something listens to.
+        extra (int, optional): Intents that are needed for something other than listeners, like member chunking. Defaults to 0.
+        minimize (bool, optional): Whether to drop the intents that aren't needed, or just check the requested ones. Defaults to True.
+    """
+    exact: set[str] = set()
+    matched: set[str] = set()
+    for event in events:
+        if any(c in event for c in "*?["):
+            matched.update(fnmatch.filter(EVENT_INTENTS, event))
+        else:
+            exact.add(event)
+    if minimize:
+        intents = extra | ALWAYS_KEPT
+        for event in exact | matched:
+            for intent in EVENT_INTENTS.get(event, ()):
+                intents |= intent
+        if any(event in exact or event in matched for event in MESSAGE_EVENTS):
+            intents |= BitIntents.MESSAGE_CONTENT
+        # only ever drops intents, an intent that wasn't asked for might not be enabled (privileged ones) or wanted
+        intents &= requested
+    else:
+        intents = requested
+    # wildcards are left out, `*` would warn about every event there is
+    missing = {
+        event: EVENT_INTENTS[event]
+        for event in exact
+        if event in EVENT_INTENTS and not any(intents & intent for intent in EVENT_INTENTS[event])
+    }
+    return IntentPlan(requested, intents, exact | matched, missing)
+
+
+def warn_missing(plan: IntentPlan):
+    """Logs a warning for every listener that will never be called."""
+    for event, needed in sorted(plan.missing.items()):
+        names = ", ".join(
+            f"{intent.name} (privileged, has to be enabled in the developer portal too)"  # type: ignore
+            if intent & PRIVILEGED_INTENTS
+            else intent.name  # type: ignore
+            for intent in needed
+        )
+        logger.warning(
+            f"Something listens to {event}, but it will never arrive without one of these intents: {names}."
+        )
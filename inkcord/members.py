@@ -0,0 +1,215 @@
+"""
+Loads guild members over the gateway (REQUEST_GUILD_MEMBERS, op 8) instead of one REST request per member.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+Discord answers one op 8 with GUILD_MEMBERS_CHUNK events of up to 1000 members each. Every request gets it's own nonce,
+which discord sends back in every chunk, so any number of requests can be running at once without their chunks mixing up.
+"""
+
+import asyncio
+import itertools
+import os
+import typing
+
+from .dispatch import release_order
+from .shared_types import BitIntents, logger
+
+if typing.TYPE_CHECKING:
+    from .types.guild_mem import GuildMember
+
+MAX_USER_IDS = 100
+"""The most user ids one request can ask for."""
+
+
+def _default_convert(data: dict) -> "GuildMember":
+    from .types.guild_mem import GuildMember
+
+    return GuildMember(data)
+
+
+class MemberChunk:
+    """One GUILD_MEMBERS_CHUNK event."""
+
+    def __init__(self, data: dict, convert: typing.Callable[[dict], typing.Any] = _default_convert):
+        self.guild_id = data["guild_id"]
+        self.members: list[typing.Any] = [convert(member) for member in data["members"]]
+        """The members in this chunk, `GuildMember`s unless the request converted them to something else."""
+        self.chunk_index: int = data["chunk_index"]
+        self.chunk_count: int = data["chunk_count"]
+        self.not_found: list = data.get("not_found", [])
+        """User ids that were asked for but aren't in the guild."""
+        self.presences: list[dict] = data.get("presences", [])
+        """Raw presences of the members, if they were asked for."""
+        self.nonce: str | None = data.get("nonce")
+
+    @property
+    def last(self) -> bool:
+        """Whether this is the last chunk of it's request."""
+        return self.chunk_index >= self.chunk_count - 1
+
+    def __repr__(self):
+        return f"<MemberChunk guild={self.guild_id} {self.chunk_index + 1}/{self.chunk_count} members={len(self.members)}>"
+
+
+class MemberChunker:
+    """Sends REQUEST_GUILD_MEMBERS and hands the chunks that come back to whoever asked for them.
+    Made by `AsyncClient` as `AsyncClient.member_chunker`, use `Guild.request_members` or `Client.request_members` instead of this directly.
+    """
+
+    def __init__(self, client: typing.Any):  # not typehinted to prevent circular imports
+        self.client = client
+        self._pending: dict[str, tuple[asyncio.Queue, typing.Callable[[dict], typing.Any]]] = {}
+        self._nonces = itertools.count()
+        self._prefix = f"{os.getpid():x}"
+        self.chunks_received: int = 0
+        self.members_received: int = 0
+        self.intents: int = BitIntents.GUILD_MEMBERS | BitIntents.GUILD_PRESENCES
+        """Intents kept when the client minimizes it's intents, since a member request can be sent any time after IDENTIFY.
+        Set it to 0 (before connecting) if the bot never requests whole guilds or presences, so they can be dropped too."""
+
+    @property
+    def pending(self) -> int:
+        """How many requests are still waiting for chunks."""
+        return len(self._pending)
+
+    def _new_nonce(self) -> str:
+        # discord drops nonces over 32 characters
+        return f"{self._prefix}-{next(self._nonces)}"[:32]
+
+    def _check_intents(self, query: str | None, presences: bool):
+        from .exceptions import RequiredIntentsMissing
+
+        intents = self.client.intent_plan.intents if self.client.intent_plan is not None else self.client.intents
+        if query == "" and not intents & BitIntents.GUILD_MEMBERS:
+            raise RequiredIntentsMissing("Requesting every member of a guild needs the GUILD_MEMBERS intent.")
+        if presences and not intents & BitIntents.GUILD_PRESENCES:
+            raise RequiredIntentsMissing("Requesting presences needs the GUILD_PRESENCES intent.")
+
+    def feed(self, data: dict) -> bool:
+        """Hands a GUILD_MEMBERS_CHUNK to the request it belongs to.
+
+        Returns:
+            bool: Whether a request was waiting for it.
+        """
+        pending = self._pending.get(data.get("nonce"))  # type: ignore
+        if pending is None:
+            return False
+        queue, convert = pending
+        chunk = MemberChunk(data, convert)
+        self.chunks_received += 1
+        self.members_received += len(chunk.members)
+        queue.put_nowait(chunk)
+        return True
+
+    async def request(
+        self,
+        guild_id: int | str,
+        query: str | None = "",
+        limit: int = 0,
+        user_ids: list[int | str] | None = None,
+        presences: bool = False,
+        timeout: float = 30,
+        convert: typing.Callable[[dict], typing.Any] = _default_convert,
+    ) -> typing.AsyncIterator[MemberChunk]:
+        """Requests members of a guild and yields the chunks as they come in.
+        Breaking out of the loop stops waiting for the rest of them (discord still sends them, they just get dropped).
+
+        Args:
+            guild_id (int | str): The guild to get members from.
+            query (str | None, optional): Only members whose username starts with this. Defaults to "", which is every member (and needs the GUILD_MEMBERS intent).
+            limit (int, optional): The max number of members, has to be above 0 when `query` isn't "". Defaults to 0, which is no limit.
+            user_ids (list[int | str] | None, optional): Get these members instead of searching by `query` (at most 100). Defaults to None.
+            presences (bool, optional): Whether to get the presences of the members too, needs the GUILD_PRESENCES intent. Defaults to False.
+            timeout (float, optional): Max seconds to wait for the next chunk before giving up with `asyncio.TimeoutError`. Defaults to 30.
+            convert (Callable, optional): Turns every member dict into what ends up in `MemberChunk.members`. Defaults to `GuildMember`.
+        """
+        if user_ids is not None:
+            if len(user_ids) > MAX_USER_IDS:
+                raise ValueError(f"Can't request more than {MAX_USER_IDS} user ids at once.")
+            query = None
+        self._check_intents(query, presences)
+        nonce = self._new_nonce()
+        queue: asyncio.Queue = asyncio.Queue()
+        self._pending[nonce] = (queue, convert)
+        payload: dict = {"guild_id": str(guild_id), "presences": presences, "nonce": nonce}
+        if user_ids is not None:
+            payload["user_ids"] = [str(user_id) for user_id in user_ids]
+        else:
+            payload["query"] = query
+            payload["limit"] = limit
+        # the chunks come in on the same reader as the events, so a handler waiting for them can't hold up it's guild
+        release_order()
+        try:
+            await self.client.send_gateway({"op": 8, "d": payload}, guild_id)
+            while True:
+                try:
+                    chunk: MemberChunk = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"Member request {nonce} for guild {guild_id} got no chunk for {timeout}s, giving up."
+                    )
+                    raise
+                yield chunk
+                if chunk.last:
+                    return
+        finally:
+            del self._pending[nonce]
+
+    async def request_many(
+        self,
+        guild_ids: typing.Iterable[int | str],
+        concurrency: int = 4,
+        **kwargs,
+    ) -> typing.AsyncIterator[MemberChunk]:
+        """Requests the members of several guilds at once and yields every chunk as it comes in, in whatever order they arrive.
+        The send ratelimit of each connection still applies, so guilds on the same shard go out at most as fast as it allows.
+
+        Args:
+            guild_ids (Iterable[int | str]): The guilds to get members from.
+            concurrency (int, optional): How many guilds to wait on at once. Defaults to 4.
+            kwargs: Passed to `request` for every guild.
+        """
+        out: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        done = object()
+
+        async def pump(guild_id):
+            async with semaphore:
+                try:
+                    async for chunk in self.request(guild_id, **kwargs):
+                        await out.put(chunk)
+                except BaseException as e:
+                    await out.put(e)
+                    raise
+                finally:
+                    await out.put(done)
+
+        tasks = [asyncio.create_task(pump(guild_id)) for guild_id in guild_ids]
+        try:
+            running = len(tasks)
+            while running:
+                item = await out.get()
+                if item is done:
+                    running -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def fetch(self, guild_id: int | str, **kwargs) -> list[typing.Any]:
+        """Requests members of a guild and waits for all of them, takes the same arguments as `request`."""
+        members = []
+        async for chunk in self.request(guild_id, **kwargs):
+            members.extend(chunk.members)
+        return members
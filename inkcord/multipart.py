@@ -0,0 +1,123 @@
+"""
+Streaming multipart/form-data bodies, for sending messages with files.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import io
+import mmap
+import os
+import typing
+import uuid
+
+from . import codec
+
+if typing.TYPE_CHECKING:
+    from .types.attach import Attachment
+
+CHUNK_SIZE = 64 * 1024
+"""How many bytes of a file are read and sent at a time."""
+
+_FILENAME_ESCAPES = str.maketrans({'"': "%22", "\r": "%0D", "\n": "%0A"})
+
+
+def quote_filename(name: str) -> str:
+    """Escapes a file name for the filename parameter of a Content-Disposition header, the same way browsers do.
+    A `"` would end the parameter early and a CR/LF would start a new header, so they get percent-encoded.
+    """
+    return name.translate(_FILENAME_ESCAPES)
+
+
+def stream_size(fp: typing.Any) -> int:
+    """Returns how many bytes are left in a file-like object (or bytes/mmap) from it's current position, without reading it."""
+    if isinstance(fp, (bytes, bytearray, memoryview, mmap.mmap)):
+        return len(fp)
+    try:
+        return os.fstat(fp.fileno()).st_size - fp.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    if fp.seekable():
+        position = fp.tell()
+        end = fp.seek(0, io.SEEK_END)
+        fp.seek(position)
+        return end - position
+    from .exceptions import GeneralException
+
+    raise GeneralException(
+        f"stream_size(): Can't tell the size of {fp!r} without reading it. Pass a seekable file, bytes or an mmap instead."
+    )
+
+
+class MultipartBody:
+    """A multipart/form-data body made of a `payload_json` part and one part per file.
+    Iterating over it yields the body in chunks, reading files as it goes, so files never have to fit in memory.
+    It can be iterated more than once (to retry a request) as long as every file is seekable.
+    """
+
+    def __init__(self, payload: dict, files: "list[Attachment]"):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        payload = dict(payload)
+        payload["attachments"] = [
+            {
+                "id": index,
+                "filename": file.file_name,
+                **({"description": file.description} if file.description else {}),
+            }
+            for index, file in enumerate(files)
+        ]
+        self._payload = (
+            (
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="payload_json"\r\n'
+                "Content-Type: application/json\r\n\r\n"
+            ).encode()
+            + codec.dumps(payload)
+            + b"\r\n"
+        )
+        self._files: list[tuple[bytes, typing.Any, int, int]] = []
+        """(part header, source, start position, size) for every file."""
+        for index, file in enumerate(files):
+            head = (
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="files[{index}]"; filename="{quote_filename(file.file_name)}"\r\n'
+                f"Content-Type: {file.content_type or 'application/octet-stream'}\r\n\r\n"
+            ).encode()
+            source = file.fp
+            if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+                start = 0
+            else:
+                start = source.tell()
+            self._files.append((head, source, start, stream_size(source)))
+        self._end = f"--{self.boundary}--\r\n".encode()
+        self.content_length = (
+            len(self._payload)
+            + sum(len(head) + size + 2 for head, _, _, size in self._files)
+            + len(self._end)
+        )
+        """The exact size of the body in bytes, worked out without reading any of the files."""
+
+    def __iter__(self) -> typing.Iterator[bytes | memoryview]:
+        yield self._payload
+        for head, source, start, size in self._files:
+            yield head
+            if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+                # slices of a memoryview don't copy, so an mmap goes straight from the page cache to the socket
+                view = memoryview(source)
+                for offset in range(start, start + size, CHUNK_SIZE):
+                    yield view[offset : min(offset + CHUNK_SIZE, start + size)]
+            else:
+                source.seek(start)
+                left = size
+                while left > 0:
+                    chunk = source.read(min(CHUNK_SIZE, left))
+                    if not chunk:
+                        break
+                    left -= len(chunk)
+                    yield chunk
+            yield b"\r\n"
+        yield self._end
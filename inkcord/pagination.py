@@ -0,0 +1,84 @@
+"""
+Async iterators over paginated list endpoints.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import typing
+
+
+async def paginate(
+    conn: typing.Any,
+    route: str,
+    page_size: int,
+    direction: typing.Literal["before", "after"] = "after",
+    start: int | None = None,
+    limit: int | None = None,
+    item_id: typing.Callable[[dict], int | str] = lambda item: item["id"],
+    unwrap: typing.Callable[[typing.Any], list[dict]] = lambda page: page,
+    convert: typing.Callable[[dict], typing.Any] = lambda item: item,
+    **params,
+) -> typing.AsyncIterator[typing.Any]:
+    """Walks a list endpoint page by page, using the snowflake of the last item as the cursor for the next page.
+    Items come out oldest first when walking "after" and newest first when walking "before", whatever order the endpoint sends them in.
+    The next page is requested as soon as the current one arrives, so it's (usually) already there by the time
+    the current page has been consumed. Breaking out of the loop cancels the page that's being fetched.
+
+    Args:
+        conn (AsyncClient): The client to send the requests with.
+        route (str): The api route of the list endpoint.
+        page_size (int): How many items to ask for per page, usually the max the endpoint allows.
+        direction (Literal["before", "after"], optional): Which way to walk. Defaults to "after" (oldest first).
+        start (int | None, optional): The snowflake to start from (not included). Defaults to None, which is the start (or the end, for "before").
+        limit (int | None, optional): The max number of items to yield. Defaults to None, which is everything.
+        item_id (Callable, optional): Gets the snowflake of an item. Defaults to `item["id"]`.
+        unwrap (Callable, optional): Gets the list of items out of a page, for endpoints that wrap them in an object.
+        convert (Callable, optional): Turns every item into the object that gets yielded.
+        params: Extra query string parameters sent with every page.
+    """
+    if direction == "after" and start is None:
+        start = 0
+
+    async def fetch(cursor: int | None, size: int) -> list[dict]:
+        query = dict(params, limit=size)
+        if cursor is not None:
+            query[direction] = cursor
+        response = await conn.request("GET", route, **query)
+        return unwrap(response.json())
+
+    remaining = limit
+    pending: asyncio.Future | None = asyncio.ensure_future(
+        fetch(start, page_size if remaining is None else min(page_size, remaining))
+    )
+    try:
+        while pending is not None:
+            items = await pending
+            pending = None
+            if not items:
+                return
+            # some endpoints (messages) send every page newest first, even when walking forwards
+            items.sort(key=lambda item: int(item_id(item)), reverse=direction == "before")
+            cursor = int(item_id(items[-1]))
+            if remaining is not None:
+                remaining -= len(items)
+            if len(items) >= page_size and (remaining is None or remaining > 0):
+                # read-ahead: the next page loads while the caller goes through this one
+                pending = asyncio.ensure_future(
+                    fetch(
+                        cursor,
+                        page_size if remaining is None else min(page_size, remaining),
+                    )
+                )
+            for item in items:
+                yield convert(item)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            pending.add_done_callback(lambda f: f.cancelled() or f.exception())
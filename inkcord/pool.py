@@ -0,0 +1,137 @@
+"""
+A pool of keep-alive HTTPS connections for the REST side of inkcord.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import http.client as httcl
+import contextlib
+import select
+import ssl
+import threading
+import time
+import typing
+
+from .shared_types import logger
+
+
+class PooledConnection(httcl.HTTPSConnection):
+    """A `HTTPSConnection` that resumes the TLS session of the pool it belongs to, so new connections skip the full handshake."""
+
+    def __init__(self, pool: "ConnectionPool", host: str, **kwargs):
+        super().__init__(host, context=pool.ssl_context, timeout=pool.timeout, **kwargs)
+        self.pool = pool
+        self.last_used: float = time.monotonic()
+        """`time.monotonic()` timestamp of when this connection was last given back to the pool."""
+        self.requests_sent: int = 0
+
+    def connect(self):
+        httcl.HTTPConnection.connect(self)
+        self.sock = self.pool.ssl_context.wrap_socket(
+            self.sock, server_hostname=self.host, session=self.pool.tls_session
+        )
+        self.pool.tls_session = self.sock.session
+
+    def healthy(self) -> bool:
+        """Checks whether an idle connection can still be used.
+        An idle keep-alive socket shouldn't have anything to read, if it does the server closed it (or sent something we never asked for)."""
+        if self.sock is None:
+            return True  # never connected, http.client will connect on the first request
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+
+class ConnectionPool:
+    """A bounded pool of keep-alive connections to one host.
+    Every request gets a connection to itself, so requests from different threads never interleave on a socket.
+    When all `size` connections are busy, `connection()` blocks until one is given back.
+    """
+
+    def __init__(self, host: str, size: int = 10, idle_timeout: float = 60, timeout: float | None = 30):
+        self.host = host
+        self.size = size
+        """The max number of connections open at once."""
+        self.idle_timeout = idle_timeout
+        """Idle connections older than this (in seconds) get closed instead of reused."""
+        self.timeout = timeout
+        """Socket timeout in seconds for connecting and for every read, so a server that stops answering can't hold a connection forever.
+        Hitting it raises `TimeoutError`. None waits forever."""
+        self.ssl_context = ssl.create_default_context()
+        self.tls_session: ssl.SSLSession | None = None
+        """The most recent TLS session, handed to new connections so they can resume it."""
+        self._idle: list[PooledConnection] = []
+        self._open = 0
+        self._condition = threading.Condition()
+        self.closed = False
+
+    def _evict_idle(self):
+        """Closes idle connections that are past `idle_timeout`. Needs the condition to be held."""
+        now = time.monotonic()
+        for conn in [c for c in self._idle if now - c.last_used > self.idle_timeout]:
+            self._idle.remove(conn)
+            self._discard(conn)
+
+    def _discard(self, conn: PooledConnection):
+        conn.close()
+        self._open -= 1
+        self._condition.notify()
+
+    def acquire(self) -> PooledConnection:
+        """Takes a connection out of the pool, opening a new one if there's room. Blocks if the pool is exhausted."""
+        with self._condition:
+            while True:
+                self._evict_idle()
+                while self._idle:
+                    conn = self._idle.pop()
+                    if conn.healthy():
+                        return conn
+                    logger.debug("Dropping dead pooled connection.")
+                    self._discard(conn)
+                if self._open < self.size:
+                    self._open += 1
+                    return PooledConnection(self, self.host)
+                self._condition.wait()
+
+    def release(self, conn: PooledConnection, reusable: bool = True):
+        """Gives a connection back to the pool. Connections that errored should be released with `reusable=False`.
+        Connections the server asked to close are already closed by `http.client`, and get thrown away too."""
+        with self._condition:
+            if not reusable or conn.sock is None or self.closed:
+                self._discard(conn)
+                return
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def connection(self) -> typing.Iterator[PooledConnection]:
+        """Context manager version of `acquire`/`release`. The connection is thrown away if the block raises."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, reusable=False)
+            raise
+        self.release(conn)
+
+    def close(self):
+        """Closes every idle connection. Connections that are in use get closed when they're released."""
+        with self._condition:
+            self.closed = True
+            for conn in self._idle:
+                self._discard(conn)
+            self._idle.clear()
+
+    @property
+    def in_use(self) -> int:
+        """How many connections are currently handed out."""
+        return self._open - len(self._idle)
@@ -0,0 +1,335 @@
+"""
+Ratelimit bookkeeping for the REST side of inkcord.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+Nothing in here sleeps. `RateLimiter.reserve` just hands back how long the caller has to wait before it's allowed to send,
+so the same limiter works for the threaded `send_request` path (time.sleep) and coroutines (asyncio.sleep).
+"""
+
+import collections
+import threading
+import time
+import typing
+
+from .shared_types import logger
+
+MAJOR_PARAMETERS = ("channels", "guilds", "webhooks", "interactions")
+"""Route segments whose following id is a major parameter, meaning discord gives every value of it it's own bucket."""
+
+
+def route_key(method: str, route: str) -> tuple[str, str, str]:
+    """Turns a route into the (method, template, major parameter) discord uses to group requests into buckets.
+    Every id (and token or emoji) in the route is replaced in the template, so there's one template per endpoint no matter how many
+    channels or guilds it's used with. The major parameter is kept apart, so `channels/1/messages/2` and `channels/1/messages/3` share a bucket
+    but `channels/4/messages/2` doesn't.
+
+    Args:
+        method (str): The HTTP method of the request.
+        route (str): The api route, without the `/api/vX/` prefix. Query strings are ignored.
+    """
+    segments = route.split("?")[0].strip("/").split("/")
+    template = []
+    major = ""
+    for index, segment in enumerate(segments):
+        previous = segments[index - 1] if index > 0 else ""
+        before_previous = segments[index - 2] if index > 1 else ""
+        if previous in MAJOR_PARAMETERS and not major:
+            major = f"{previous}/{segment}"
+            template.append(":major")
+        elif before_previous in ("webhooks", "interactions") and index == 2:
+            # webhook and interaction tokens belong to the major parameter too
+            major = f"{major}/{segment}"
+            template.append(":token")
+        elif segment.isdigit():
+            template.append(":id")
+        elif previous == "reactions":
+            template.append(":emoji")
+        else:
+            template.append(segment)
+    return method, "/".join(template), major
+
+
+class Bucket:
+    """A token bucket that mirrors one discord ratelimit bucket.
+    The bucket doesn't know it's limit until the first response for it comes back, and it lets everything through until then.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        """The `X-RateLimit-Bucket` hash of this bucket (or the route it was made for, if discord hasn't told us yet)."""
+        self.limit: int | None = None
+        """How many requests fit in one window, None if unknown."""
+        self.remaining: int = 1
+        """How many requests are left in the current window."""
+        self.reset_after: float = 1.0
+        """The length of a window, in seconds."""
+        self.reset_at: float = 0.0
+        """`time.monotonic()` timestamp for when the current window ends."""
+        self.window_start: float = 0.0
+        """`time.monotonic()` timestamp for when the current window starts, which is in the future if requests are queued past this window."""
+        self.queued: int = 0
+        """How many requests are currently waiting on this bucket."""
+
+    def reserve(self, now: float) -> float:
+        """Takes a token from the bucket, and returns how many seconds the caller has to wait before it can be spent.
+        When the current window is used up the token is taken from the next window instead, so waiting requests
+        leave in order, `limit` per window, instead of stampeding the moment the bucket resets."""
+        if self.limit is None:
+            return 0.0
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.window_start = now
+            self.reset_at = now + self.reset_after
+        if self.remaining > 0:
+            self.remaining -= 1
+            return max(0.0, self.window_start - now)
+        self.window_start = self.reset_at
+        self.reset_at += self.reset_after
+        self.remaining = self.limit - 1
+        return self.window_start - now
+
+    def update(self, headers: typing.Any, now: float):
+        """Syncs the bucket with the `X-RateLimit-*` headers of a response."""
+        limit = headers.get("X-RateLimit-Limit")
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if limit is None or remaining is None or reset_after is None:
+            return
+        reset_at = now + float(reset_after)
+        if self.limit is None or now >= self.reset_at:
+            self.remaining = int(remaining)
+            self.window_start = now
+            self.reset_at = reset_at
+        elif self.reset_at - reset_at < self.reset_after:
+            # still the same window, only ever trust the smaller number since other requests may be in flight
+            self.remaining = min(self.remaining, int(remaining))
+        self.limit = int(limit)
+        if int(remaining) == int(limit) - 1 or self.reset_after < float(reset_after):
+            self.reset_after = float(reset_after)
+
+
+class RateLimiter:
+    """Maps every route to it's discord bucket and hands out send times for them.
+    One instance is shared by everything that goes through an `AsyncClient`, so it's safe to use from multiple threads.
+
+    There's a bucket for every major parameter that was used (every channel, guild, webhook...), so buckets whose window
+    is over and that nothing waits on are dropped every `sweep_interval` seconds. A dropped bucket comes back
+    with the limit it's hash had, so nothing has to be learned again.
+    """
+
+    def __init__(self, sweep_interval: float = 60):
+        self._lock = threading.Lock()
+        self.route_hashes: dict[tuple[str, str], str] = {}
+        """(method, route template) -> `X-RateLimit-Bucket` hash."""
+        self.buckets: dict[str, Bucket] = {}
+        """bucket hash + major parameter -> bucket."""
+        self.limits: dict[str, tuple[int, float]] = {}
+        """bucket hash -> (limit, reset_after), shared by every major parameter of that hash."""
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _bucket_for(self, method: str, route: str) -> Bucket:
+        method, template, major = route_key(method, route)
+        bucket_hash = self.route_hashes.get((method, template), f"{method} {template}")
+        key = f"{bucket_hash}:{major}"
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = Bucket(bucket_hash)
+            known = self.limits.get(bucket_hash)
+            if known is not None:
+                bucket.limit, bucket.reset_after = known
+                bucket.remaining = bucket.limit
+        return bucket
+
+    def _maybe_sweep(self, now: float):
+        """INTERNAL!!! Drops idle buckets, at most once every `sweep_interval` seconds. Call with the lock held."""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        idle = [
+            key
+            for key, bucket in self.buckets.items()
+            if bucket.queued <= 0 and now >= bucket.reset_at
+        ]
+        for key in idle:
+            del self.buckets[key]
+        if idle:
+            logger.debug(f"Dropped {len(idle)} idle ratelimit bucket(s), {len(self.buckets)} left.")
+
+    def reserve(self, method: str, route: str) -> float:
+        """Reserves a slot for a request, and returns how many seconds to wait before sending it.
+        Call `release` once the wait is over (even if the request ends up not being sent)."""
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_sweep(now)
+            bucket = self._bucket_for(method, route)
+            delay = bucket.reserve(now)
+            if delay > 0:
+                bucket.queued += 1
+                logger.debug(
+                    f"Bucket {bucket.name} is exhausted, holding request to {route} for {delay:.2f}s."
+                )
+            return delay
+
+    def release(self, method: str, route: str, delay: float):
+        """Marks a reservation returned by `reserve` as no longer waiting."""
+        if delay <= 0:
+            return
+        with self._lock:
+            self._bucket_for(method, route).queued -= 1
+
+    def update(self, method: str, route: str, headers: typing.Any):
+        """Feeds the ratelimit headers of a response back into the bucket for it's route."""
+        with self._lock:
+            bucket_hash = headers.get("X-RateLimit-Bucket")
+            method_, template, major = route_key(method, route)
+            if bucket_hash and self.route_hashes.get((method_, template)) != bucket_hash:
+                # first time we've seen this route's hash, move whatever we knew about it over to the real bucket
+                old = self._bucket_for(method, route)
+                self.buckets.pop(f"{old.name}:{major}", None)
+                self.route_hashes[(method_, template)] = bucket_hash
+                self.buckets.setdefault(f"{bucket_hash}:{major}", old).name = bucket_hash
+            bucket = self._bucket_for(method, route)
+            bucket.update(headers, time.monotonic())
+            if bucket.limit is not None:
+                self.limits[bucket.name] = (bucket.limit, bucket.reset_after)
+            if bucket.limit is not None and bucket.remaining < 2:
+                logger.debug(
+                    f"Bucket {bucket.name} has {bucket.remaining} request(s) left, next reset in {bucket.reset_at - time.monotonic():.2f}s."
+                )
+
+    def on_ratelimited(self, method: str, route: str, retry_after: float):
+        """Empties a bucket after a 429, so nothing else goes out on it until `retry_after` has passed."""
+        with self._lock:
+            bucket = self._bucket_for(method, route)
+            bucket.remaining = 0
+            bucket.window_start = time.monotonic()
+            bucket.reset_at = bucket.window_start + retry_after
+            if bucket.limit is None:
+                bucket.limit = 1
+
+
+class GlobalLimiter:
+    """A leaky bucket in front of every bucket, for discord's global ratelimit (50 requests per second by default).
+    Requests leave at an even `1 / rate` spacing, so bursts get smoothed out instead of all going out at once,
+    and a global 429 pauses everything until it's `retry_after` is over.
+    """
+
+    EXEMPT_ROUTES = ("interactions/",)
+    """Routes that discord doesn't count towards the global ratelimit."""
+
+    def __init__(self, rate: float = 50):
+        self._lock = threading.Lock()
+        self.rate = rate
+        """Requests per second allowed through."""
+        self.next_free: float = 0.0
+        """`time.monotonic()` timestamp of the next free slot."""
+        self.paused_until: float = 0.0
+        """`time.monotonic()` timestamp for when a global 429 stops applying."""
+        self.queued: int = 0
+        """How many requests are currently waiting on the global limit."""
+
+    def exempt(self, route: str) -> bool:
+        return route.startswith(self.EXEMPT_ROUTES)
+
+    def reserve(self, route: str) -> float:
+        """Reserves the next free slot, and returns how many seconds to wait before sending.
+        Call `release` once the wait is over."""
+        if self.exempt(route):
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_free, self.paused_until)
+            self.next_free = slot + 1 / self.rate
+            delay = slot - now
+            if delay > 0:
+                self.queued += 1
+            return delay
+
+    def release(self, delay: float):
+        """Marks a reservation returned by `reserve` as no longer waiting."""
+        if delay <= 0:
+            return
+        with self._lock:
+            self.queued -= 1
+
+    def pause_remaining(self, route: str) -> float:
+        """How much of a global pause is left, for requests that were already waiting when the 429 came in."""
+        if self.exempt(route):
+            return 0.0
+        return max(0.0, self.paused_until - time.monotonic())
+
+    def on_ratelimited(self, retry_after: float):
+        """Stops every request that isn't exempt for `retry_after` seconds."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            self.next_free = max(self.next_free, self.paused_until)
+        logger.warning(
+            f"Hit the global ratelimit, pausing all requests for {retry_after}s."
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """How many requests are waiting on the global limit right now."""
+        return self.queued
+
+    @property
+    def wait_time(self) -> float:
+        """How long a request made right now would have to wait before being sent, in seconds."""
+        now = time.monotonic()
+        return max(0.0, self.next_free - now, self.paused_until - now)
+
+
+class GatewayLimiter:
+    """The send ratelimit of one gateway connection: discord closes the connection (4008) when more than `limit`
+    payloads are sent within `per` seconds. It only keeps count, `GatewaySendQueue` does the waiting.
+
+    The last `headroom` sends of every window are kept for urgent payloads (heartbeats and IDENTIFY/RESUME),
+    so a queue full of presence updates can never make a heartbeat late.
+    """
+
+    def __init__(self, limit: int = 120, per: float = 60, headroom: int = 5):
+        self._lock = threading.Lock()
+        self.limit = limit
+        self.per = per
+        self.headroom = headroom
+        self._sent: collections.deque[float] = collections.deque()
+        """`time.monotonic()` timestamps of the sends in the last `per` seconds."""
+
+    def _expire(self, now: float):
+        while self._sent and self._sent[0] <= now - self.per:
+            self._sent.popleft()
+
+    def delay(self, urgent: bool = False) -> float:
+        """How many seconds until a payload can be sent. Doesn't take the slot, call `record` when it's actually sent."""
+        limit = self.limit if urgent else self.limit - self.headroom
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if len(self._sent) < limit:
+                return 0.0
+            return self._sent[-limit] + self.per - now
+
+    def record(self):
+        """Counts a send that just happened."""
+        with self._lock:
+            self._sent.append(time.monotonic())
+
+    def reset(self):
+        """Forgets every send, the budget is per connection so a new connection starts with all of it."""
+        with self._lock:
+            self._sent.clear()
+
+    @property
+    def remaining(self) -> int:
+        """How many non urgent payloads can be sent right now without waiting."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return max(0, self.limit - self.headroom - len(self._sent))
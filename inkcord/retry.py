@@ -0,0 +1,108 @@
+"""
+Retries for REST requests that failed because of discord (5xx) or the network, not because of the request.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import collections
+import http.client as httcl
+import random
+import threading
+
+from .ratelimit import route_key
+from .shared_types import logger
+
+RETRYABLE_STATUSES = (500, 502, 503, 504)
+RETRYABLE_ERRORS = (
+    ConnectionError,  # covers ConnectionResetError, BrokenPipeError and http.client.RemoteDisconnected
+    TimeoutError,
+    httcl.IncompleteRead,
+    asyncio.IncompleteReadError,
+)
+IDEMPOTENT_METHODS = ("GET", "PUT", "DELETE", "HEAD")
+"""Methods that are safe to send twice. POST and PATCH could end up being applied twice if the first one got through."""
+
+
+class RetryPolicy:
+    """Decides whether a failed request gets sent again, and how long to wait first.
+    Waits grow exponentially with full jitter (a random time between 0 and `base * 2 ** attempt`, capped at `cap`),
+    so clients that failed together don't all retry together.
+
+    Retries are limited by a budget: every request adds `budget_ratio` to it and every retry takes 1 out,
+    so during an outage retries can never be more than about `budget_ratio` of the traffic on top of what would be sent anyway.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base: float = 0.5,
+        cap: float = 10,
+        budget_ratio: float = 0.1,
+        max_budget: float = 10,
+        retry_non_idempotent: bool = False,
+    ):
+        self.max_attempts = max_attempts
+        """The max number of times one request is sent, including the first time."""
+        self.base = base
+        self.cap = cap
+        self.budget_ratio = budget_ratio
+        self.max_budget = max_budget
+        """The budget never goes above this, and starts at it, so a quiet client can still retry a few times."""
+        self.retry_non_idempotent = retry_non_idempotent
+        """Whether POST and PATCH requests are retried too."""
+        self.budget: float = max_budget
+        self.retries: collections.Counter[str] = collections.Counter()
+        """How many retries each route template has needed."""
+        self.budget_exhausted: int = 0
+        """How many retries were skipped because the budget was empty."""
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """Called once for every request that goes out, adds to the retry budget."""
+        with self._lock:
+            self.budget = min(self.max_budget, self.budget + self.budget_ratio)
+
+    def retry_after(
+        self,
+        method: str,
+        route: str,
+        attempt: int,
+        status: int | None = None,
+        error: BaseException | None = None,
+    ) -> float | None:
+        """Returns how many seconds to wait before sending a failed request again, or None if it shouldn't be retried.
+
+        Args:
+            method (str): The HTTP method of the request.
+            route (str): The api route of the request.
+            attempt (int): How many times the request has been sent so far.
+            status (int | None, optional): The status code discord answered with, if it answered.
+            error (BaseException | None, optional): The exception sending the request raised, if it raised.
+        """
+        if status is not None and status not in RETRYABLE_STATUSES:
+            return None
+        if error is not None and not isinstance(error, RETRYABLE_ERRORS):
+            return None
+        if attempt >= self.max_attempts:
+            return None
+        if method not in IDEMPOTENT_METHODS and not self.retry_non_idempotent:
+            return None
+        with self._lock:
+            if self.budget < 1:
+                self.budget_exhausted += 1
+                return None
+            self.budget -= 1
+            _, template, _ = route_key(method, route)
+            self.retries[f"{method} {template}"] += 1
+        delay = random.uniform(0, min(self.cap, self.base * 2**attempt))
+        logger.warning(
+            f"{method} {route} failed ({status if status is not None else repr(error)}), retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_attempts})."
+        )
+        return delay
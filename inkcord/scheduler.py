@@ -0,0 +1,179 @@
+"""
+Priority lanes for REST requests.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import enum
+import heapq
+import itertools
+import threading
+import time
+
+from .shared_types import logger
+
+
+class Priority(enum.IntEnum):
+    """How urgent a request is. Lower values get sent first when requests are waiting for a connection."""
+
+    INTERACTION = 0
+    """Interaction responses, discord drops them if they don't arrive within 3 seconds."""
+    USER = 1
+    """Anything a user is waiting on, like sending a message. This is the default."""
+    BACKGROUND = 2
+    """Bulk and maintenance work, like mass role assignment or syncing commands."""
+
+
+DEADLINES: dict[Priority, float | None] = {
+    Priority.INTERACTION: 3.0,
+    Priority.USER: None,
+    Priority.BACKGROUND: None,
+}
+"""Seconds a request of each priority has before it's useless, None if it doesn't have a deadline."""
+
+
+def priority_for(route: str) -> Priority:
+    """The priority a request gets if the caller doesn't pick one."""
+    if route.startswith("interactions/"):
+        return Priority.INTERACTION
+    return Priority.USER
+
+
+class _Waiter:
+    def __init__(self, priority: Priority, deadline: float | None):
+        self.priority = priority
+        self.deadline = deadline
+        self.event: threading.Event | None = None
+        self.future: asyncio.Future | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.cancelled = False
+        self.granted = False
+
+    def wake(self):
+        self.granted = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(  # pyright: ignore[reportOptionalMemberAccess]
+                _resolve, self.future
+            )
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RequestScheduler:
+    """Hands out send slots (one per connection) to waiting requests by priority, and earliest deadline within the same priority.
+    `BACKGROUND` requests can never take the last `reserved` slots, so there's always room for an interaction to go out straight away.
+    Works from threads (`acquire_sync`) and coroutines (`acquire`) at the same time.
+    """
+
+    def __init__(self, slots: int = 10, reserved: int = 2):
+        self.slots = slots
+        """How many requests can be sent at once."""
+        self.reserved = min(reserved, slots - 1)
+        """Slots that `BACKGROUND` requests aren't allowed to use."""
+        self.in_use: int = 0
+        self._lock = threading.Lock()
+        self._heap: list[tuple[int, float, int, _Waiter]] = []
+        self._order = itertools.count()
+        self.missed_deadlines: int = 0
+        """How many requests only got a slot after their deadline had already passed."""
+
+    def _has_room(self, priority: Priority) -> bool:
+        if priority == Priority.BACKGROUND:
+            return self.in_use < self.slots - self.reserved
+        return self.in_use < self.slots
+
+    def _take(self, priority: Priority, deadline: float | None) -> _Waiter | None:
+        """Takes a slot straight away if nobody more urgent is waiting, else queues a waiter. Needs the lock to be held."""
+        if not self._heap and self._has_room(priority):
+            self.in_use += 1
+            return None
+        waiter = _Waiter(priority, deadline)
+        heapq.heappush(
+            self._heap,
+            (
+                priority,
+                deadline if deadline is not None else float("inf"),
+                next(self._order),
+                waiter,
+            ),
+        )
+        return waiter
+
+    def _wake_next(self):
+        """Gives free slots to the most urgent waiters that are allowed to have them. Needs the lock to be held."""
+        while self._heap:
+            priority, _, _, waiter = self._heap[0]
+            if waiter.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            if not self._has_room(priority):
+                return
+            heapq.heappop(self._heap)
+            self.in_use += 1
+            waiter.wake()
+
+    def _check_deadline(self, priority: Priority, deadline: float | None):
+        if deadline is not None and time.monotonic() > deadline:
+            self.missed_deadlines += 1
+            logger.warning(
+                f"A {priority.name} request only got sent {time.monotonic() - deadline:.2f}s after it's deadline."
+            )
+
+    def acquire_sync(self, priority: Priority, deadline: float | None = None):
+        """Blocks the calling thread until the request can be sent. Call `release` after the response is read."""
+        with self._lock:
+            waiter = self._take(priority, deadline)
+            if waiter is not None:
+                waiter.event = threading.Event()
+                self._wake_next()
+        if waiter is not None:
+            waiter.event.wait()  # pyright: ignore[reportOptionalMemberAccess]
+        self._check_deadline(priority, deadline)
+
+    async def acquire(self, priority: Priority, deadline: float | None = None):
+        """Waits until the request can be sent. Call `release` after the response is read."""
+        with self._lock:
+            waiter = self._take(priority, deadline)
+            if waiter is not None:
+                waiter.loop = asyncio.get_running_loop()
+                waiter.future = waiter.loop.create_future()
+                self._wake_next()
+        if waiter is not None:
+            try:
+                await waiter.future  # pyright: ignore[reportGeneralTypeIssues]
+            except asyncio.CancelledError:
+                with self._lock:
+                    waiter.cancelled = True
+                    if waiter.granted:
+                        # we got a slot right as we got cancelled, give it to someone else
+                        self.in_use -= 1
+                        self._wake_next()
+                raise
+        self._check_deadline(priority, deadline)
+
+    def release(self):
+        """Gives a slot back, waking the most urgent waiter."""
+        with self._lock:
+            self.in_use -= 1
+            self._wake_next()
+
+    def queue_depth(self) -> dict[Priority, int]:
+        """How many requests of each priority are waiting for a slot right now."""
+        with self._lock:
+            depth = {priority: 0 for priority in Priority}
+            for priority, _, _, waiter in self._heap:
+                if not waiter.cancelled:
+                    depth[Priority(priority)] += 1
+            return depth
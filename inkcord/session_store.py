@@ -0,0 +1,142 @@
+"""
+Keeps gateway sessions on disk, so a restarted bot can RESUME instead of IDENTIFYing again.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+A RESUME replays only the events missed since the stored sequence number, instead of a GUILD_CREATE for every guild,
+and it doesn't use up a session start. The sequence number is only written every `save_interval` seconds,
+so after a crash the last few seconds of events can be replayed (and handled) a second time.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .shared_types import logger
+
+
+class StoredSession:
+    def __init__(
+        self,
+        session_id: str,
+        resume_url: str,
+        seq: int | None,
+        shard_count: int,
+        saved_at: float,
+        app_id: str | None = None,
+    ):
+        self.session_id = session_id
+        self.resume_url = resume_url
+        self.seq = seq
+        self.shard_count = shard_count
+        self.saved_at = saved_at
+        """Unix time of when the session was last written."""
+        self.app_id = app_id
+        """The application id from READY, since a RESUME never sends READY again. None in files written before it was stored."""
+
+
+class SessionStore:
+    """Stores one session per shard, as `session-<shard id>.json` in a directory.
+    Writes are atomic (a temp file that's renamed over the old one), so a crash mid write never leaves a broken file.
+    """
+
+    def __init__(self, directory: str | os.PathLike, max_age: float = 300, save_interval: float = 5):
+        """
+        Args:
+            directory (str | PathLike): Where to keep the session files, it's made if it doesn't exist.
+            max_age (float, optional): Sessions older than this many seconds aren't tried, since discord has most likely invalidated them already. Defaults to 300.
+            save_interval (float, optional): Min seconds between two writes of the same shard (READY and shutdown always write). Defaults to 5.
+        """
+        self.directory = os.fspath(directory)
+        self.max_age = max_age
+        self.save_interval = save_interval
+        self._last_write: dict[int, float] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, shard_id: int) -> str:
+        return os.path.join(self.directory, f"session-{shard_id}.json")
+
+    def load(self, shard_id: int = 0, shard_count: int = 1) -> StoredSession | None:
+        """Returns the stored session of a shard, or None if there isn't one, it's too old, or the shard count changed."""
+        try:
+            with open(self._path(shard_id), "rb") as f:
+                data = json.load(f)
+            session = StoredSession(
+                data["session_id"],
+                data["resume_url"],
+                data["seq"],
+                data["shard_count"],
+                data["saved_at"],
+                data.get("app_id"),
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring the unreadable stored session of shard {shard_id}: {e!r}")
+            return None
+        if session.shard_count != shard_count:
+            return None
+        if time.time() - session.saved_at > self.max_age:
+            logger.info(f"Stored session of shard {shard_id} is too old to resume.")
+            return None
+        return session
+
+    def save(
+        self,
+        session_id: str,
+        resume_url: str,
+        seq: int | None,
+        shard_id: int = 0,
+        shard_count: int = 1,
+        force: bool = False,
+        app_id: str | None = None,
+    ) -> bool:
+        """Writes a shard's session, unless it was written less than `save_interval` seconds ago (and `force` is False).
+
+        Returns:
+            bool: Whether it was written.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_write.get(shard_id, float("-inf")) < self.save_interval:
+                return False
+            self._last_write[shard_id] = now
+        data = {
+            "session_id": session_id,
+            "resume_url": resume_url,
+            "seq": seq,
+            "shard_count": shard_count,
+            "saved_at": time.time(),
+            "app_id": app_id,
+        }
+        fd, temp = tempfile.mkstemp(dir=self.directory, prefix=f".session-{shard_id}-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, self._path(shard_id))
+        except BaseException:
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+            raise
+        return True
+
+    def clear(self, shard_id: int = 0):
+        """Forgets a shard's session, for when discord said it's invalid."""
+        try:
+            os.unlink(self._path(shard_id))
+        except FileNotFoundError:
+            pass
+        self._last_write.pop(shard_id, None)
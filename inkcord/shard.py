@@ -0,0 +1,414 @@
+"""
+Sharding: running many gateway sessions on one event loop.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+Every shard is it's own gateway connection that gets the events of the guilds where `(guild_id >> 22) % shard_count == shard_id`.
+Discord only lets `max_concurrency` shards IDENTIFY every 5 seconds, one per bucket (`shard_id % max_concurrency`),
+so shards in the same bucket start one after the other while different buckets start at the same time.
+"""
+
+import asyncio
+import enum
+import platform
+import random
+import time
+import typing
+
+import websockets
+
+from .heartbeat import Heartbeat
+from .gateway_queue import GatewaySendQueue
+from .shared_types import RESUMABLE_CLOSE_CODES, logger
+from .zlib_stream import ZlibStreamDecompressor
+
+IDENTIFY_INTERVAL = 5
+"""Seconds between two IDENTIFYs in the same concurrency bucket."""
+FATAL_CLOSE_CODES = (4004, 4010, 4011, 4012, 4013, 4014)
+"""Close codes that mean reconnecting will never work (bad token, bad shard, sharding required, bad intents)."""
+
+
+class ShardState(enum.Enum):
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    IDENTIFYING = "identifying"
+    RESUMING = "resuming"
+    READY = "ready"
+    STOPPED = "stopped"
+    """Closed with a fatal close code or by `ShardManager.close`, this shard won't reconnect."""
+
+
+class ShardEvent:
+    """A dispatch (op 0) event, with the shard it came from."""
+
+    def __init__(self, shard_id: int, name: str, data: typing.Any, seq: int | None):
+        self.shard_id = shard_id
+        self.name = name
+        """The event name, like `MESSAGE_CREATE`."""
+        self.data = data
+        """The `d` field of the payload."""
+        self.seq = seq
+
+    def __repr__(self):
+        return f"<ShardEvent {self.name} shard={self.shard_id} seq={self.seq}>"
+
+
+class IdentifyLimiter:
+    """Staggers IDENTIFYs so at most one per concurrency bucket goes out every `IDENTIFY_INTERVAL` seconds."""
+
+    def __init__(self, max_concurrency: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._last: dict[int, float] = {}
+
+    async def wait(self, shard_id: int):
+        """Waits until `shard_id` is allowed to IDENTIFY, and takes it's bucket's turn."""
+        bucket = shard_id % self.max_concurrency
+        lock = self._locks.setdefault(bucket, asyncio.Lock())
+        async with lock:
+            delay = self._last.get(bucket, 0) + IDENTIFY_INTERVAL - time.monotonic()
+            if delay > 0:
+                logger.debug(
+                    f"Shard {shard_id} waiting {delay:.2f}s to IDENTIFY (bucket {bucket})."
+                )
+                await asyncio.sleep(delay)
+            self._last[bucket] = time.monotonic()
+
+
+class Shard:
+    """One gateway connection. Made and run by `ShardManager`, don't instantiate it yourself."""
+
+    def __init__(self, manager: "ShardManager", shard_id: int, shard_count: int):
+        self.manager = manager
+        self.client = manager.client
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.state = ShardState.DISCONNECTED
+        self.session_id: str | None = None
+        self.resume_url: str | None = None
+        self.seq: int | None = None
+        self.inflator: ZlibStreamDecompressor | None = None
+        self.reconnects: int = 0
+        self.close_code: int | None = None
+        """The fatal close code that stopped this shard, if one did."""
+        self.ws: typing.Any = None
+        self.heartbeat: Heartbeat | None = None
+        self.queue = GatewaySendQueue(name=f"Shard {shard_id}")
+        """Everything this shard sends goes through here, see `GatewaySendQueue`."""
+
+    def __repr__(self):
+        return f"<Shard {self.shard_id}/{self.shard_count} {self.state.value}>"
+
+    @property
+    def latency(self) -> float | None:
+        """The average heartbeat latency of this shard over the last few beats, None until the first ACK."""
+        return self.heartbeat.average_latency if self.heartbeat is not None else None
+
+    async def send(self, payload: dict):
+        """Queues a payload and waits until it's sent, see `GatewaySendQueue`."""
+        await self.queue.send(payload)
+
+    async def _send_raw(self, payload: dict):
+        await self.ws.send(self.client._encode_frame(payload))
+
+    def _decode(self, frame: str | bytes) -> typing.Any:
+        """INTERNAL!!! Decodes a frame with this shard's own zlib context."""
+        if self.inflator is not None and isinstance(frame, bytes):
+            frame = self.inflator.feed(frame)
+            if frame is None:
+                return None
+        return self.client._decode_payload(frame)
+
+    async def run(self):
+        """Connects and keeps reconnecting (resuming when possible) until the shard is stopped.
+        With a session store on the client, the stored session is RESUMEd first.
+        """
+        store = self.client.session_store
+        if store is not None and self.session_id is None:
+            session = store.load(self.shard_id, self.shard_count)
+            if session is not None:
+                logger.info(f"Shard {self.shard_id} found a stored session, trying to RESUME it...")
+                self.session_id = session.session_id
+                self.resume_url = session.resume_url
+                self.seq = session.seq
+                if self.client.app_id is None:
+                    self.client.app_id = session.app_id
+                if self.client.app_id is None:
+                    # a RESUME never sends READY, which is where the app id normally comes from
+                    response = await self.client.request("GET", "oauth2/applications/@me")
+                    self.client.app_id = response.json()["id"]
+        while self.state is not ShardState.STOPPED:
+            resuming = self.session_id is not None and self.resume_url is not None
+            url = self.resume_url if resuming else self.manager.gateway_url
+            self.state = ShardState.CONNECTING
+            self.inflator = ZlibStreamDecompressor() if self.client.compress else None
+            try:
+                self.ws = await websockets.connect(self.client._gateway_address(url))
+                self.queue.attach(self._send_raw)
+                await self._listen(resuming)
+            except websockets.ConnectionClosed as e:
+                code = e.rcvd.code if e.rcvd is not None else None
+                if code in FATAL_CLOSE_CODES:
+                    logger.fatal(
+                        f"Shard {self.shard_id} was closed with code {code}, which can't be recovered from."
+                    )
+                    self.close_code = code
+                    self.state = ShardState.STOPPED
+                    break
+                if code in (RESUMABLE_CLOSE_CODES.INVALID_SEQ, RESUMABLE_CLOSE_CODES.TIMED_OUT):
+                    # discord won't take a RESUME of this session anymore
+                    self._forget_session()
+                logger.warning(
+                    f"Shard {self.shard_id} was closed with code {code}, reconnecting..."
+                )
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                logger.error(f"Shard {self.shard_id} lost it's connection: {e!r}")
+            finally:
+                self._stop_heartbeat()
+                self.queue.detach()
+                self._save_session(force=True)
+            if self.state is ShardState.STOPPED:
+                break
+            self.state = ShardState.DISCONNECTED
+            self.reconnects += 1
+            await asyncio.sleep(min(60, random.uniform(1, 2**min(self.reconnects, 6))))
+
+    async def _listen(self, resuming: bool):
+        """INTERNAL!!! Reads frames off the current connection until it closes or asks to be reconnected."""
+        async for frame in self.ws:
+            payload = self._decode(frame)
+            if payload is None:
+                continue
+            op = payload["op"]
+            if op == 0:
+                await self._on_dispatch(payload)
+            elif op == 10:
+                self.heartbeat = Heartbeat(
+                    payload["d"]["heartbeat_interval"] / 1000,
+                    self.queue.send_now,
+                    lambda: self.seq,
+                    lambda: self.ws.close(4000),
+                )
+                self.heartbeat.start()
+                if resuming:
+                    self.state = ShardState.RESUMING
+                    await self.queue.send_now(
+                        {
+                            "op": 6,
+                            "d": {
+                                "token": self.client.token,
+                                "session_id": self.session_id,
+                                "seq": self.seq,
+                            },
+                        }
+                    )
+                else:
+                    await self.identify()
+            elif op == 11:
+                self.heartbeat.ack()  # type: ignore
+            elif op == 1:
+                await self.heartbeat.beat()  # type: ignore
+            elif op == 7:
+                logger.info(f"Shard {self.shard_id} was asked to reconnect.")
+                await self.ws.close(4000)
+                return
+            elif op == 9:
+                if not payload["d"]:
+                    self._forget_session()
+                logger.warning(
+                    f"Shard {self.shard_id} got an invalid session (resumable: {bool(payload['d'])})."
+                )
+                await asyncio.sleep(random.uniform(1, 5))
+                await self.ws.close(4000)
+                return
+
+    async def identify(self):
+        """Sends IDENTIFY, once the concurrency bucket allows it."""
+        self.state = ShardState.IDENTIFYING
+        await self.manager.identify_limiter.wait(self.shard_id)  # type: ignore
+        await self.queue.send_now(
+            {
+                "op": 2,
+                "d": {
+                    "token": self.client.token,
+                    "properties": {
+                        "os": platform.platform(),
+                        "browser": "inkcord",
+                        "device": "inkcord",
+                    },
+                    "compress": False,
+                    "intents": self.client._identify_intents(),
+                    "shard": [self.shard_id, self.shard_count],
+                },
+            }
+        )
+        logger.info(f"Shard {self.shard_id} sent IDENTIFY.")
+
+    async def _on_dispatch(self, payload: dict):
+        """INTERNAL!!! Keeps track of the session and hands the event to the manager."""
+        self.seq = payload["s"]
+        self._save_session()
+        if payload.get("skipped"):
+            return
+        name = payload["t"]
+        if name == "READY":
+            self.session_id = payload["d"]["session_id"]
+            self.resume_url = payload["d"]["resume_gateway_url"]
+            self.client.app_id = payload["d"]["application"]["id"]
+            self.state = ShardState.READY
+            self.reconnects = 0
+            self._save_session(force=True)
+            logger.info(f"Shard {self.shard_id} is READY.")
+        elif name == "RESUMED":
+            self.state = ShardState.READY
+            self.reconnects = 0
+            logger.info(f"Shard {self.shard_id} RESUMED.")
+        await self.manager._route(ShardEvent(self.shard_id, name, payload["d"], self.seq))
+
+    def _save_session(self, force: bool = False):
+        """INTERNAL!!! Writes this shard's session to the client's session store, if it has one."""
+        store = self.client.session_store
+        if store is not None and self.session_id is not None:
+            store.save(self.session_id, self.resume_url, self.seq, self.shard_id, self.shard_count, force, self.client.app_id)  # type: ignore
+
+    def _forget_session(self):
+        """INTERNAL!!! Drops a session discord said is invalid, so the next connection IDENTIFYs."""
+        self.session_id = self.resume_url = self.seq = None
+        if self.client.session_store is not None:
+            self.client.session_store.clear(self.shard_id)
+
+    def _stop_heartbeat(self):
+        if self.heartbeat is not None:
+            self.heartbeat.stop()
+
+    async def close(self):
+        self.state = ShardState.STOPPED
+        self._stop_heartbeat()
+        self.queue.close()
+        if self.ws is not None:
+            await self.ws.close()
+
+
+class ShardManager:
+    """Runs a group of shards on one event loop and routes all their events to the client's listeners.
+    Listeners get a `ShardEvent`, so they can tell which shard an event came from.
+
+    Example:
+    ```python
+    manager = ShardManager(bot._CONN)
+    await manager.start()
+    print(manager.status())
+    ```
+    """
+
+    def __init__(
+        self,
+        client: typing.Any,  # not typehinted to prevent circular imports
+        shard_count: int | None = None,
+        shard_ids: list[int] | None = None,
+        max_concurrency: int | None = None,
+        gateway_url: str | None = None,
+        identify_limiter: IdentifyLimiter | None = None,
+    ):
+        """
+        Args:
+            client (AsyncClient): The client to send requests with and to take the token, intents and listeners from.
+            shard_count (int | None, optional): The total number of shards. Defaults to None, which is what discord recommends.
+            shard_ids (list[int] | None, optional): The shards this manager runs. Defaults to None, which is all of them.
+            max_concurrency (int | None, optional): How many shards can IDENTIFY at once. Defaults to None, which is what discord says.
+            gateway_url (str | None, optional): The gateway url. Defaults to None, which asks discord for it.
+            identify_limiter (IdentifyLimiter | None, optional): Staggers the IDENTIFYs, pass one to share it with other managers. Defaults to None, which makes one.
+        """
+        self.client = client
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+        self.max_concurrency = max_concurrency
+        self.gateway_url = gateway_url
+        self.shards: dict[int, Shard] = {}
+        self.identify_limiter = identify_limiter
+        self._tasks: list[asyncio.Task] = []
+
+    async def fetch_gateway(self) -> dict:
+        """Asks discord (`gateway/bot`) for the gateway url, the recommended shard count and the IDENTIFY concurrency."""
+        response = await self.client.request("GET", "gateway/bot")
+        info = response.json()
+        self.gateway_url = info["url"]
+        if self.shard_count is None:
+            self.shard_count = info["shards"]
+        if self.max_concurrency is None:
+            self.max_concurrency = info["session_start_limit"]["max_concurrency"]
+        remaining = info["session_start_limit"]["remaining"]
+        if remaining < len(self.shard_ids or range(self.shard_count)):  # type: ignore
+            logger.warning(
+                f"Only {remaining} session starts left today, resets in {info['session_start_limit']['reset_after'] / 1000:.0f}s."
+            )
+        return info
+
+    async def start(self):
+        """Starts every shard. IDENTIFYs are staggered by concurrency bucket, so this returns before all of them are READY."""
+        if None in (self.gateway_url, self.shard_count, self.max_concurrency):
+            await self.fetch_gateway()
+        if self.identify_limiter is None:
+            self.identify_limiter = IdentifyLimiter(self.max_concurrency)  # type: ignore
+        # so send_gateway, presence/voice updates and member requests go out on the shard of their guild
+        self.client.shard_manager = self
+        ids = self.shard_ids if self.shard_ids is not None else range(self.shard_count)  # type: ignore
+        logger.info(
+            f"Starting {len(ids)} of {self.shard_count} shards (max concurrency {self.max_concurrency})."
+        )
+        for shard_id in ids:
+            shard = Shard(self, shard_id, self.shard_count)  # type: ignore
+            self.shards[shard_id] = shard
+            self._tasks.append(asyncio.create_task(shard.run()))
+
+    async def wait(self):
+        """Waits until every shard has stopped."""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def close(self):
+        """Closes every shard."""
+        for shard in self.shards.values():
+            await shard.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def shard_for(self, guild_id: int) -> Shard | None:
+        """Returns the shard that gets the events of a guild, if this manager runs it."""
+        return self.shards.get((int(guild_id) >> 22) % self.shard_count)  # type: ignore
+
+    async def _route(self, event: ShardEvent):
+        """INTERNAL!!! Hands an event to every handler for it in the client's registry."""
+        await self.client._dispatch_event(event.name, event.data, event)
+
+    @property
+    def latencies(self) -> dict[int, float | None]:
+        """The heartbeat latency of every shard, in seconds."""
+        return {shard_id: shard.latency for shard_id, shard in self.shards.items()}
+
+    @property
+    def latency(self) -> float | None:
+        """The average heartbeat latency over every shard that has one."""
+        known = [latency for latency in self.latencies.values() if latency is not None]
+        return sum(known) / len(known) if known else None
+
+    def status(self) -> dict[int, dict]:
+        """Returns the state, latency, reconnect count and send queue of every shard."""
+        return {
+            shard_id: {
+                "state": shard.state.value,
+                "latency": shard.latency,
+                "reconnects": shard.reconnects,
+                "session_id": shard.session_id,
+                "send_queue": shard.queue.depth,
+                "send_latency": shard.queue.average_latency,
+            }
+            for shard_id, shard in self.shards.items()
+        }
@@ -199,8 +199,9 @@ class Sticker:
 
 
 class FormatterThreading(logging.Formatter):
-    def format(self):
+    def format(self, record: logging.LogRecord) -> str:
         self._style._fmt = "[ \x1b[38;2;255;128;0m \x1b[3;1m%(name)s-gateway_handler] | %(levelname)s \x1b[0m ~\x1b[38;2;255;217;0m \x1b[4;1m%(asctime)s~: %(message)s"
+        return super().format(record)
 
 
 class ThreadMetadata:
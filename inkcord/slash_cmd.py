@@ -4,7 +4,8 @@ import functools
 import logging
 import inspect
 import re
-import json
+
+from . import codec
 
 if typing.TYPE_CHECKING:
     from .exceptions import HandleableException, GeneralException
@@ -63,7 +64,7 @@ class InteractionCommand:
             "description": self.desc if self.desc is not None else self.func.__doc__,
             "options": self._jsonify_params(),
         }
-        return json.dumps(dictified)
+        return codec.dumps_text(dictified)
 
     def _jsonify_params(self):
         l = []
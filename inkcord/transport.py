@@ -0,0 +1,211 @@
+"""
+An HTTP/1.1 client built on asyncio streams, so REST calls can be awaited without a thread per request.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import http.client as httcl
+import io
+import ssl
+import time
+import typing
+
+from .retry import IDEMPOTENT_METHODS
+from .shared_types import logger
+
+
+class StreamConnection:
+    """One keep-alive connection, as a reader/writer pair."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.last_used: float = time.monotonic()
+        self.requests_sent: int = 0
+
+    def healthy(self) -> bool:
+        """An idle keep-alive connection shouldn't have anything to read, or be at EOF."""
+        return not (
+            self.writer.is_closing()
+            or self.reader.at_eof()
+            or len(self.reader._buffer)  # pyright: ignore[reportAttributeAccessIssue]
+        )
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncTransport:
+    """Sends HTTP/1.1 requests over a bounded set of keep-alive TLS streams to one host.
+    Waiting for a connection, the server or the body only suspends the calling coroutine.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 443,
+        size: int = 10,
+        idle_timeout: float = 60,
+        timeout: float | None = 30,
+    ):
+        self.host = host
+        self.port = port
+        self.size = size
+        """The max number of connections open at once."""
+        self.idle_timeout = idle_timeout
+        """Idle connections older than this (in seconds) get closed instead of reused."""
+        self.timeout = timeout
+        """Max seconds for connecting, and for sending a request and reading it's whole response.
+        Hitting it raises `TimeoutError` and throws the connection away. None waits forever."""
+        self.ssl_context = ssl.create_default_context()
+        self._idle: list[StreamConnection] = []
+        self._slots: asyncio.Semaphore | None = None
+
+    async def _acquire(self) -> StreamConnection:
+        if self._slots is None:
+            # created lazily so it's bound to the loop that's actually running the requests
+            self._slots = asyncio.Semaphore(self.size)
+        await self._slots.acquire()
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if now - conn.last_used <= self.idle_timeout and conn.healthy():
+                return conn
+            conn.close()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    self.host, self.port, ssl=self.ssl_context, server_hostname=self.host
+                ),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            self._slots.release()
+            raise TimeoutError(f"Connecting to {self.host} took longer than {self.timeout}s.")
+        except BaseException:
+            self._slots.release()
+            raise
+        return StreamConnection(reader, writer)
+
+    def _release(self, conn: StreamConnection, reusable: bool):
+        if reusable:
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()  # pyright: ignore[reportOptionalMemberAccess]
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes | typing.Iterable[bytes | memoryview] | None,
+        headers: dict[str, str],
+    ) -> tuple[int, httcl.HTTPMessage, bytes]:
+        """Sends one request and reads the whole response.
+        `body` can be an iterable of chunks (like a `MultipartBody`), which gets written chunk by chunk,
+        waiting for the socket to drain in between. A `Content-Length` header has to be given for those.
+
+        A keep-alive stream that discord closed right as it was reused gets one more try on a fresh connection,
+        but only for idempotent methods, since a POST may have gone through before the stream died.
+
+        Returns:
+            (status, headers, body) of the response.
+        """
+        while True:
+            conn = await self._acquire()
+            reused = conn.requests_sent > 0
+            try:
+                status, response_headers, response_body = await asyncio.wait_for(
+                    self._exchange(conn, method, path, body, headers), self.timeout
+                )
+            except (
+                asyncio.IncompleteReadError,
+                ConnectionResetError,
+                BrokenPipeError,
+            ):
+                self._release(conn, reusable=False)
+                if not reused or method not in IDEMPOTENT_METHODS:
+                    raise
+                logger.debug("Keep-alive stream was closed by discord, retrying.")
+                continue
+            except asyncio.TimeoutError:
+                self._release(conn, reusable=False)
+                raise TimeoutError(f"{method} {path} got no full response within {self.timeout}s.")
+            except BaseException:
+                self._release(conn, reusable=False)
+                raise
+            conn.requests_sent += 1
+            self._release(
+                conn,
+                reusable=response_headers.get("Connection", "").lower() != "close",
+            )
+            return status, response_headers, response_body
+
+    async def _exchange(
+        self,
+        conn: StreamConnection,
+        method: str,
+        path: str,
+        body: bytes | typing.Iterable[bytes | memoryview] | None,
+        headers: dict[str, str],
+    ) -> tuple[int, httcl.HTTPMessage, bytes]:
+        """INTERNAL!!! Writes one request on a connection and reads it's response."""
+        conn.writer.write(self._encode_head(method, path, body, headers))
+        if isinstance(body, (bytes, bytearray, memoryview)):
+            conn.writer.write(body)
+        elif body is not None:
+            for chunk in body:
+                conn.writer.write(chunk)
+                await conn.writer.drain()
+        await conn.writer.drain()
+        return await self._read_response(conn.reader, method)
+
+    def _encode_head(
+        self, method: str, path: str, body: typing.Any, headers: dict[str, str]
+    ) -> bytes:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if "Content-Length" not in headers:
+            lines.append(f"Content-Length: {len(body) if body else 0}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    async def _read_response(
+        self, reader: asyncio.StreamReader, method: str
+    ) -> tuple[int, httcl.HTTPMessage, bytes]:
+        head = await reader.readuntil(b"\r\n\r\n")
+        status_line, _, header_block = head.partition(b"\r\n")
+        status = int(status_line.split(b" ", 2)[1])
+        headers = httcl.parse_headers(io.BytesIO(header_block))
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            return status, headers, b""
+        if headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    # skip trailers, they end with an empty line
+                    while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            return status, headers, b"".join(chunks)
+        length = headers.get("Content-Length")
+        if length is not None:
+            return status, headers, await reader.readexactly(int(length))
+        # no length and not chunked means the body runs until the server closes the connection
+        return status, headers, await reader.read()
+
+    def close(self):
+        """Closes every idle connection."""
+        for conn in self._idle:
+            conn.close()
+        self._idle.clear()
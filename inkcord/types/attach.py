@@ -1,18 +1,25 @@
 import typing
 import mimetypes
+import os
+
+from ..multipart import stream_size
 
 
 class Attachment:
     """A representation of the `Attachment` object as provieded in the discord documentation."""
 
     def __init__(self, _data: typing.IO | dict, path: str | None = None):
-        __instance_check = lambda: isinstance(_data, dict)
+        __instance_check = isinstance(_data, dict)
         self.__type = _data
         # it takes in an IO so we can abstract away the File object that libs like discord.py implement, and we can implement special types of stuff later
+        self.fp: typing.Any = None if __instance_check else _data
+        """The file (or bytes/mmap) to upload, if this attachment was made to be sent. It's streamed from it's current position when the message is sent, never read into memory all at once."""
         self.id = _data.get("id") if __instance_check else None
         """The ID of the attachment."""
         self.file_name: str | typing.Any = (
-            _data.name if __instance_check else _data.get("name")
+            _data.get("filename")
+            if __instance_check
+            else os.path.basename(path or getattr(_data, "name", "file"))
         )
         """The filename of the attached file."""
         self.title: str | None = _data.get("title") if __instance_check else None
@@ -24,13 +31,13 @@ class Attachment:
         self.content_type: str | None = (
             _data.get("content_type")
             if __instance_check
-            else mimetypes.guess_type(path)[0]
+            else mimetypes.guess_type(self.file_name)[0]
         )
         """The MIME content type of this file. Note that if a IO object is provided, inkcord tries to guess the type, and if it can't, then it will issue a warning if verbosity level is high enough or ignore."""
         self.size: int | None = (
-            _data.__sizeof__() if not __instance_check else _data.get("size")
+            stream_size(_data) if not __instance_check else _data.get("size")
         )
-        """The size of this file, in bytes. is the `.__sizeof__()` attribute of an IO if applicable, else just returns the size retrieved from the dictionary."""
+        """The size of this file, in bytes. For an IO this is how much is left from it's current position (found without reading it), else just returns the size retrieved from the dictionary."""
         self.url: str | None = _data.get("url") if __instance_check else None
         """URL of the source file."""
         self.proxy_url: str | None = (
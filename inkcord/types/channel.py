@@ -1,10 +1,15 @@
 import typing
 import datetime
 
+from .message import Message
+from ..pagination import paginate
+from .. import codec
+
 if typing.TYPE_CHECKING:
     from ..resourceid import ResourceID
     from .permissions import PermissionOverwrite, Permissions
     from .user import User
+    from .attach import Attachment
     from ..shared_types import ThreadMetadata
 
 
@@ -124,6 +129,63 @@ class Channel:
 
     # yes, there are other fields, but I just feel like they are way too useless and too much work to implement
 
+    def send(
+        self,
+        bot,
+        content: str | None = None,
+        files: list[Attachment] | None = None,
+        tts: bool = False,
+    ) -> Message:
+        """Sends a message in this channel.
+        Files are streamed straight from their file objects while the request is sent, so big files don't get loaded into memory.
+
+        Args:
+            bot (inkcord.Client, not typehinted to prevent circular imports)
+            content (str | None, optional): The text of the message. Defaults to None.
+            files (list[Attachment] | None, optional): Files to upload with the message, made with `inkcord.Attachment(open(path, "rb"))`. Defaults to None.
+            tts (bool, optional): Whether this message is TTS. Defaults to False.
+
+        Returns:
+            inkcord.Message: The sent message.
+        """
+        data = {"content": content, "tts": tts}
+        res = bot._CONN.send_request(
+            "POST",
+            f"channels/{self.id}/messages",
+            {x: data[x] for x in data if data[x] is not None},
+            files=files,
+        )
+        return Message(codec.loads(res.result().read()))
+
+    def iter_messages(
+        self,
+        bot,
+        before_id: ResourceID | None = None,
+        after_id: ResourceID | None = None,
+        limit: int | None = None,
+    ) -> typing.AsyncIterator[Message]:
+        """Goes through the message history of this channel, newest first (or oldest first if `after_id` is given).
+        The next page is fetched while the current one is being used, and breaking out of the loop stops fetching.
+
+        Args:
+            bot (inkcord.Client, not typehinted to prevent circular imports)
+            before_id (ResourceID | None, optional): Only messages before this message id. Defaults to None, which starts at the newest message.
+            after_id (ResourceID | None, optional): Only messages after this message id, walking forwards. Defaults to None.
+            limit (int | None, optional): The max number of messages to return. Defaults to None, which is the whole history.
+
+        Returns:
+            AsyncIterator[inkcord.Message]: The messages, one at a time.
+        """
+        return paginate(
+            bot._CONN,
+            f"channels/{self.id}/messages",
+            100,
+            "after" if after_id is not None else "before",
+            after_id if after_id is not None else before_id,
+            limit,
+            convert=Message,
+        )
+
 
 class DMChannel(Channel):
     """An object that represents a channel in the context of a DM. Inherits from `inkcord.Channel`."""
@@ -1,11 +1,13 @@
 import typing
-import json
 from typing import Self
 import PIL.Image
 import base64
 from typing import overload
 import datetime
 
+from ..pagination import paginate
+from .. import codec
+
 
 if typing.TYPE_CHECKING:
     from ..resourceid import ResourceID
@@ -16,6 +18,7 @@ if typing.TYPE_CHECKING:
     from .channel import Channel, VoiceChannel
     from ..exceptions import ImproperUsage
     from .guild_mem import GuildMember
+    from ..members import MemberChunk
 
 
 class ThreadMember:
@@ -355,7 +358,7 @@ class Guild:
         """
         request = bot._CONN.send_request("GET", f"guilds/{id}", with_counts=with_counts)
         result = self(
-            json.loads(request.result().read())
+            codec.loads(request.result().read())
         )  # shut up python this is fine
         return result
 
@@ -448,7 +451,7 @@ class Guild:
             f"guilds/{self.id}",
             data={x: data[x] for x in data if data[x] is not None},
         )
-        return self.__init__(json)
+        return self.__init__(codec.loads(res.result().read()))
 
     def get_all_channels(self, bot) -> list[Channel]:
         """Returns all the channels in this Guild.
@@ -478,8 +481,8 @@ class Guild:
         """
         res = bot._CONN.send_request("POST", f"guilds/{self.id}/channels", kwargs)
         if type is Channel:
-            return Channel(json.loads(res.result()))
-        return VoiceChannel(json.loads(res.result()))
+            return Channel(codec.loads(res.result().read()))
+        return VoiceChannel(codec.loads(res.result().read()))
 
     def modify_channel_positions(
         self,
@@ -533,8 +536,10 @@ class Guild:
         Returns:
             list [(inkcord.Channel,ThreadMember)] A list containing all the active threads, and all the members that are in that specific thread, packed into a tuple.
         """
-        res = json.loads(
-            bot._CONN.send_request("GET", f"guilds/{self.id}/threads/active").result()
+        res = codec.loads(
+            bot._CONN.send_request("GET", f"guilds/{self.id}/threads/active")
+            .result()
+            .read()
         )
         thr_list = []
         for i, r in zip(res["threads"], res["members"]):
@@ -551,9 +556,146 @@ class Guild:
         Returns:
             GuildMember: The returned guild member.
         """
-        res = json.loads(
+        res = codec.loads(
             bot._CONN.send_request("GET", f"guilds/{self.id}/members/{id}")
+            .result()
+            .read()
         )
         gm = GuildMember(res)
         gm.guild = self
         return gm
+
+    def iter_members(
+        self, bot, after_id: ResourceID | None = None, limit: int | None = None
+    ) -> typing.AsyncIterator[GuildMember]:
+        """Goes through every member of this guild, ordered by user id. Needs the `GUILD_MEMBERS` intent.
+        The next page is fetched while the current one is being used, and breaking out of the loop stops fetching.
+
+        Args:
+            bot (not typehinted, should be inkcord.Client): Your bot.
+            after_id (ResourceID | None, optional): Only members with a user id above this one. Defaults to None.
+            limit (int | None, optional): The max number of members to return. Defaults to None, which is all of them.
+
+        Returns:
+            AsyncIterator[GuildMember]: The members, one at a time.
+        """
+
+        def convert(data: dict) -> GuildMember:
+            gm = GuildMember(data)
+            gm.guild = self
+            return gm
+
+        return paginate(
+            bot._CONN,
+            f"guilds/{self.id}/members",
+            1000,
+            "after",
+            after_id,
+            limit,
+            item_id=lambda item: item["user"]["id"],
+            convert=convert,
+        )
+
+    def request_members(
+        self,
+        bot,
+        query: str | None = "",
+        limit: int = 0,
+        user_ids: list[ResourceID] | None = None,
+        presences: bool = False,
+        timeout: float = 30,
+    ) -> typing.AsyncIterator[MemberChunk]:
+        """Loads members of this guild over the gateway, in chunks of up to 1000, without a REST request per member.
+        Loading every member needs the `GUILD_MEMBERS` intent.
+
+        Example:
+        ```python
+        async for chunk in guild.request_members(bot):
+            for member in chunk.members:
+                ...
+        ```
+
+        Args:
+            bot (not typehinted, should be inkcord.Client): Your bot.
+            query (str | None, optional): Only members whose username starts with this. Defaults to "", which is every member.
+            limit (int, optional): The max number of members, has to be above 0 when `query` isn't "". Defaults to 0, which is no limit.
+            user_ids (list[ResourceID] | None, optional): Load these members instead of searching by `query` (at most 100). Defaults to None.
+            presences (bool, optional): Whether to load presences too, needs the `GUILD_PRESENCES` intent. Defaults to False.
+            timeout (float, optional): Max seconds to wait for the next chunk. Defaults to 30.
+
+        Returns:
+            AsyncIterator[MemberChunk]: The chunks, as they come in.
+        """
+
+        def convert(data: dict) -> GuildMember:
+            gm = GuildMember(data)
+            gm.guild = self
+            return gm
+
+        return bot._CONN.member_chunker.request(
+            self.id, query, limit, user_ids, presences, timeout, convert
+        )
+
+    def iter_bans(
+        self,
+        bot,
+        before_id: ResourceID | None = None,
+        after_id: ResourceID | None = None,
+        limit: int | None = None,
+    ) -> typing.AsyncIterator[dict]:
+        """Goes through the bans of this guild, ordered by user id. Needs the `BAN_MEMBERS` permission.
+        Every ban is yielded as the raw dict discord sends (`{"reason": ..., "user": {...}}`).
+
+        Args:
+            bot (not typehinted, should be inkcord.Client): Your bot.
+            before_id (ResourceID | None, optional): Walk backwards from this user id. Defaults to None.
+            after_id (ResourceID | None, optional): Walk forwards from this user id. Defaults to None, which starts from the first ban.
+            limit (int | None, optional): The max number of bans to return. Defaults to None, which is all of them.
+
+        Returns:
+            AsyncIterator[dict]: The bans, one at a time.
+        """
+        return paginate(
+            bot._CONN,
+            f"guilds/{self.id}/bans",
+            1000,
+            "before" if before_id is not None else "after",
+            before_id if before_id is not None else after_id,
+            limit,
+            item_id=lambda item: item["user"]["id"],
+        )
+
+    def iter_audit_log(
+        self,
+        bot,
+        before_id: ResourceID | None = None,
+        after_id: ResourceID | None = None,
+        user_id: ResourceID | None = None,
+        action_type: int | None = None,
+        limit: int | None = None,
+    ) -> typing.AsyncIterator[dict]:
+        """Goes through the audit log of this guild, newest first (or oldest first if `after_id` is given). Needs the `VIEW_AUDIT_LOG` permission.
+        Every entry is yielded as the raw dict discord sends.
+
+        Args:
+            bot (not typehinted, should be inkcord.Client): Your bot.
+            before_id (ResourceID | None, optional): Only entries before this entry id. Defaults to None, which starts at the newest entry.
+            after_id (ResourceID | None, optional): Only entries after this entry id, walking forwards. Defaults to None.
+            user_id (ResourceID | None, optional): Only entries made by this user. Defaults to None.
+            action_type (int | None, optional): Only entries of this action type. Defaults to None.
+            limit (int | None, optional): The max number of entries to return. Defaults to None, which is all of them.
+
+        Returns:
+            AsyncIterator[dict]: The audit log entries, one at a time.
+        """
+        filters = {"user_id": user_id, "action_type": action_type}
+        return paginate(
+            bot._CONN,
+            f"guilds/{self.id}/audit-logs",
+            100,
+            "after" if after_id is not None else "before",
+            after_id if after_id is not None else before_id,
+            limit,
+            unwrap=lambda page: page["audit_log_entries"],
+            **{x: filters[x] for x in filters if filters[x] is not None},
+        )
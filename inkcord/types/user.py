@@ -9,10 +9,12 @@ THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR I
 
 import typing
 from typing import Any, List
-import json
 from PIL import Image
 import base64
 
+from ..pagination import paginate
+from .. import codec
+
 if typing.TYPE_CHECKING:
     from ..resourceid import ResourceID
     from .avatar import AvatarDecoration, Nameplate, PrimaryGuild
@@ -125,7 +127,7 @@ class User:
             inkcord.User : The returned user id.
         """
         request = bot._CONN.send_request("GET", f"users/{id}", None)
-        result = json.loads(request.result().read())
+        result = codec.loads(request.result().read())
         return self.__init__(result)
         # the init is here because just doing self() raised an error
 
@@ -157,7 +159,7 @@ class User:
         if banner is None:
             data.pop("banner")
         request = bot._CONN.send_request("PATCH", "users/@me", data)
-        result = json.loads(request.result().read())
+        result = codec.loads(request.result().read())
         if all([username == None, avatar == None, banner == None]):
             raise ImproperUsage(
                 f"{self.global_name}.modify_self()",
@@ -195,10 +197,50 @@ class User:
             with_counts=with_counts,
             limit=limit,
         )
-        result: list = json.loads(request.result().read())
+        result: list = codec.loads(request.result().read())
         formatted_rslt = [PartialGuild(gld) for gld in result]
         return formatted_rslt
 
+    def iter_guilds(
+        self,
+        bot,
+        before_id: ResourceID | None = None,
+        after_id: ResourceID | None = None,
+        with_counts: bool = False,
+        limit: int | None = None,
+    ) -> typing.AsyncIterator[PartialGuild]:
+        """Like `current_user_guilds`, but goes through every page instead of returning one.
+        The next page is fetched while the current one is being used, and breaking out of the loop stops fetching.
+
+        Example:
+        ```python
+
+        async for guild in user.iter_guilds(bot):
+            print(guild.name)
+
+        ```
+
+        Args:
+            bot (inkcord.Client): Not typehinted to prevent circular imports.
+            before_id (ResourceID | None, optional): Walk backwards from this guild id. Defaults to None.
+            after_id (ResourceID | None, optional): Walk forwards from this guild id. Defaults to None, which starts from the first guild.
+            with_counts (bool, optional): Whether to return the approximate member counts/presence counts. Defaults to False.
+            limit (int | None, optional): The max number of guilds to return. Defaults to None, which is all of them.
+
+        Returns:
+            AsyncIterator[inkcord.PartialGuild]: The guilds, one at a time.
+        """
+        return paginate(
+            bot._CONN,
+            "users/@me/guilds",
+            200,
+            "before" if before_id is not None else "after",
+            before_id if before_id is not None else after_id,
+            limit,
+            convert=PartialGuild,
+            with_counts=with_counts,
+        )
+
     def user_guild_member(self, bot, id: ResourceID):
         """The guild member object that the user has in the guild.
 
@@ -209,7 +251,7 @@ class User:
             inkcord.GuildMember: The guild member.
         """
         request = bot._CONN.send_request("GET", f"users/@me/guilds/{id}/member", None)
-        result = GuildMember(json.loads(request.result().read()))
+        result = GuildMember(codec.loads(request.result().read()))
         result.user = self  # pyright: ignore[reportAttributeAccessIssue]
         return result
 
@@ -233,4 +275,4 @@ class User:
             recipient (ResourceID): The ID of the user to create a DM with.
         """
         dm_channel = bot._CONN.send_request("POST", f"users/@me/channels")
-        return DMChannel(json.loads(dm_channel).result().read())
+        return DMChannel(codec.loads(dm_channel.result().read()))
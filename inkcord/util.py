@@ -1,5 +1,17 @@
 """Helper functions for internal and external purposes."""
 
+import urllib.parse
+
+
+def query_string(params: dict) -> str:
+    """Urlencodes query string parameters the way discord expects them, booleans become `true`/`false` instead of python's `True`/`False`."""
+    return urllib.parse.urlencode(
+        {
+            key: ("true" if value else "false") if isinstance(value, bool) else value
+            for key, value in params.items()
+        }
+    )
+
 
 # don't modify __version__ it's automatically supplied by the set_semver function
 def _set_semver(
@@ -0,0 +1,58 @@
+"""
+zlib-stream transport compression for the gateway.
+
+Copyright © 2025 sunset-hue
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the “Software”), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+With `compress=zlib-stream` the whole connection is one zlib stream. Every gateway message ends with a Z_SYNC_FLUSH,
+which always ends in the 4 bytes `00 00 ff ff`, but a message can be split across several websocket frames,
+so frames are buffered until that suffix shows up.
+"""
+
+import zlib
+
+ZLIB_SUFFIX = b"\x00\x00\xff\xff"
+
+
+class ZlibStreamDecompressor:
+    """Decompresses one gateway connection. Make a new one for every connection, the zlib context can't be shared or reused."""
+
+    def __init__(self):
+        self._inflator = zlib.decompressobj()
+        self._buffer = bytearray()
+        self.compressed_bytes: int = 0
+        """How many bytes came in over the wire."""
+        self.decompressed_bytes: int = 0
+        """How many bytes those turned into."""
+
+    def feed(self, frame: bytes) -> bytes | None:
+        """Feeds one websocket frame in.
+
+        Returns:
+            bytes | None: The decompressed message if this frame finished one, else None.
+        """
+        self.compressed_bytes += len(frame)
+        if not self._buffer and frame.endswith(ZLIB_SUFFIX):
+            # most messages fit in one frame, so they can skip the buffer entirely
+            data = self._inflator.decompress(frame)
+        else:
+            self._buffer += frame
+            if not self._buffer.endswith(ZLIB_SUFFIX):
+                return None
+            data = self._inflator.decompress(self._buffer)
+            # del keeps the buffer's allocation around for the next split message, instead of making a new bytearray
+            del self._buffer[:]
+        self.decompressed_bytes += len(data)
+        return data
+
+    @property
+    def ratio(self) -> float:
+        """How many times smaller the traffic is thanks to compression."""
+        if not self.compressed_bytes:
+            return 1.0
+        return self.decompressed_bytes / self.compressed_bytes
@@ -0,0 +1,86 @@
+import time
+import unittest
+
+from inkcord.cache import DEFAULT_TTLS, ResponseCache, route_template
+
+
+class FakeResponse:
+    def __init__(self, etag=None):
+        self.headers = {"ETag": etag} if etag else {}
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_route_template(self):
+        self.assertEqual(route_template("guilds/1?with_counts=true"), "guilds/:id")
+        self.assertEqual(route_template("/guilds/1/channels/"), "guilds/:id/channels")
+
+    def test_only_routes_with_a_ttl_are_cached(self):
+        cache = ResponseCache()
+        cache.set("channels/1/messages", FakeResponse())
+        self.assertIsNone(cache.get("channels/1/messages"))
+        response = FakeResponse("abc")
+        cache.set("guilds/1", response)
+        entry = cache.get("guilds/1")
+        self.assertIs(entry.response, response)
+        self.assertEqual(entry.etag, "abc")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_query_strings_are_cached_separately(self):
+        cache = ResponseCache()
+        cache.set("guilds/1?with_counts=true", FakeResponse())
+        self.assertIsNone(cache.get("guilds/1"))
+        self.assertIsNotNone(cache.get("guilds/1?with_counts=true"))
+
+    def test_stale_entries_count_as_misses_until_revalidated(self):
+        cache = ResponseCache(ttls={"guilds/:id": 60})
+        response = FakeResponse("abc")
+        cache.set("guilds/1", response)
+        cache.get("guilds/1").expires_at = time.monotonic() - 1
+        self.assertIsNotNone(cache.get("guilds/1"))
+        self.assertEqual(cache.misses, 1)
+        self.assertIs(cache.revalidate("guilds/1"), response)
+        self.assertGreater(cache.get("guilds/1").expires_at, time.monotonic())
+        self.assertEqual((cache.hits, cache.revalidated), (2, 1))
+        self.assertIsNone(cache.revalidate("guilds/2"))
+
+    def test_least_recently_used_is_dropped(self):
+        cache = ResponseCache(max_size=2)
+        cache.set("guilds/1", FakeResponse())
+        cache.set("guilds/2", FakeResponse())
+        cache.get("guilds/1")
+        cache.set("guilds/3", FakeResponse())
+        self.assertIsNotNone(cache.get("guilds/1"))
+        self.assertIsNone(cache.get("guilds/2"))
+
+    def test_writes_invalidate_the_route_its_children_and_its_collection(self):
+        cache = ResponseCache()
+        for route in ("guilds/1", "guilds/1/channels", "guilds/2", "users/5"):
+            cache.set(route, FakeResponse())
+        cache.invalidate("guilds/1/channels")
+        self.assertIsNone(cache.get("guilds/1/channels"))
+        self.assertIsNone(cache.get("guilds/1"))
+        self.assertIsNotNone(cache.get("guilds/2"))
+        cache.invalidate("guilds/2")
+        self.assertIsNone(cache.get("guilds/2"))
+        self.assertIsNotNone(cache.get("users/5"))
+
+    def test_turned_off(self):
+        cache = ResponseCache(ttls={})
+        cache.set("guilds/1", FakeResponse())
+        self.assertFalse(cache.cacheable("guilds/1"))
+        self.assertIsNone(cache.get("guilds/1"))
+
+    def test_ttls_are_not_shared(self):
+        defaults = dict(DEFAULT_TTLS)
+        first, second = ResponseCache(), ResponseCache()
+        first.ttls["channels/:id"] = 10
+        del first.ttls["guilds/:id"]
+        self.assertEqual(second.ttls, defaults)
+        self.assertEqual(DEFAULT_TTLS, defaults)
+        ttls = {"guilds/:id": 5}
+        ResponseCache(ttls=ttls).ttls["users/:id"] = 5
+        self.assertEqual(ttls, {"guilds/:id": 5})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from inkcord.cache import ResponseCache
+from inkcord.client import Client
+from inkcord.http_gateway import AsyncClient
+from inkcord.retry import RetryPolicy
+from inkcord.session_store import SessionStore
+from inkcord.shared_types import BitIntents
+
+
+class ClientOptionsTests(unittest.TestCase):
+    def make(self, **kwargs):
+        # setup asks discord for the gateway url, which isn't what's being tested
+        with mock.patch.object(AsyncClient, "get_gateway_url"):
+            client = Client(BitIntents.GUILDS, "token", **kwargs)
+        self.addCleanup(client._CONN.close)
+        return client._CONN
+
+    def test_options_reach_the_connection(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = ResponseCache(ttls={})
+        retry_policy = RetryPolicy(max_attempts=5)
+        session_store = SessionStore(directory.name)
+        conn = self.make(
+            version=9,
+            minimize_intents=True,
+            global_rate=20,
+            pool_size=3,
+            idle_timeout=5,
+            request_timeout=7,
+            cache=cache,
+            retry_policy=retry_policy,
+            compress=False,
+            encoding="etf",
+            handler_workers=2,
+            handler_queue=10,
+            session_store=session_store,
+        )
+        self.assertEqual(conn.path, "/api/v9/")
+        self.assertTrue(conn.minimize_intents)
+        self.assertEqual(conn.pool.size, 3)
+        self.assertEqual(conn.pool.timeout, 7)
+        self.assertEqual(conn.transport.timeout, 7)
+        self.assertIs(conn.cache, cache)
+        self.assertIs(conn.retry_policy, retry_policy)
+        self.assertFalse(conn.compress)
+        self.assertEqual(conn.encoding, "etf")
+        self.assertEqual((conn.handler_pool.workers, conn.handler_pool.max_queue), (2, 10))
+        self.assertIs(conn.session_store, session_store)
+
+    def test_defaults(self):
+        conn = self.make()
+        self.assertEqual(conn.path, "/api/v10/")
+        self.assertTrue(conn.compress)
+        self.assertEqual(conn.encoding, "json")
+        self.assertIsNone(conn.session_store)
+
+
+if __name__ == "__main__":
+    unittest.main()
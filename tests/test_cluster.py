@@ -0,0 +1,151 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+from inkcord.cluster import FATAL_EXIT_CODE, Cluster, SharedIdentifyLimiter, _Group
+from inkcord.http_gateway import AsyncClient, Response
+
+
+def gateway_bot_response():
+    future = concurrent.futures.Future()
+    future.set_result(
+        Response(
+            200,
+            {},
+            b'{"url": "wss://gateway.discord.gg", "shards": 6, "session_start_limit": {"max_concurrency": 2}}',
+        )
+    )
+    return future
+
+
+def make_bot():
+    return None
+
+
+def crash_once():
+    """A factory that crashes the first time it's worker runs, and exits cleanly after that."""
+    path = os.environ["INKCORD_TEST_RUNS"]
+    with open(path, "a") as f:
+        f.write("run\n")
+    with open(path) as f:
+        runs = len(f.readlines())
+    sys.exit(1 if runs == 1 else 0)
+
+
+def identify(locks, last, times, index):
+    """Takes a turn of bucket 0 from another process."""
+    with mock.patch("inkcord.cluster.IDENTIFY_INTERVAL", 0.3):
+        SharedIdentifyLimiter(1, locks, last)._wait_blocking(0, 0)
+    times[index] = time.time()
+
+
+class FetchGatewayTests(unittest.TestCase):
+    def test_fetch_gateway(self):
+        cluster = Cluster(make_bot, "token", processes=2)
+        with mock.patch.object(AsyncClient, "send_request", return_value=gateway_bot_response()) as send:
+            with mock.patch.object(AsyncClient, "close", autospec=True, side_effect=AsyncClient.close) as close:
+                cluster.fetch_gateway()
+        send.assert_called_once_with("GET", "gateway/bot")
+        close.assert_called_once()
+        self.assertEqual((cluster.gateway_url, cluster.shard_count, cluster.max_concurrency), ("wss://gateway.discord.gg", 6, 2))
+
+    def test_given_shard_count_is_kept(self):
+        cluster = Cluster(make_bot, "token", shard_count=4)
+        with mock.patch.object(AsyncClient, "send_request", return_value=gateway_bot_response()):
+            cluster.fetch_gateway()
+        self.assertEqual(cluster.shard_count, 4)
+
+
+class SharedIdentifyLimiterTests(unittest.TestCase):
+    def setUp(self):
+        self.context = multiprocessing.get_context("spawn")
+        self.locks = [self.context.Lock() for _ in range(2)]
+        self.last = self.context.Array("d", 2)
+
+    def test_processes_take_turns(self):
+        times = self.context.Array("d", 2)
+        workers = [self.context.Process(target=identify, args=(self.locks, self.last, times, index)) for index in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            self.assertEqual(worker.exitcode, 0)
+        self.assertGreaterEqual(abs(times[1] - times[0]), 0.25)
+
+    def test_buckets_are_independent(self):
+        limiter = SharedIdentifyLimiter(2, self.locks, self.last)
+
+        async def identify_all():
+            start = time.monotonic()
+            for shard_id in (0, 1):
+                await limiter.wait(shard_id)
+            return time.monotonic() - start
+
+        with mock.patch("inkcord.cluster.IDENTIFY_INTERVAL", 1):
+            self.assertLess(asyncio.run(identify_all()), 0.5)
+            self.assertGreater(self.last[0], 0)
+            self.assertGreater(self.last[1], 0)
+
+
+class SupervisorTests(unittest.TestCase):
+    def setUp(self):
+        self.cluster = Cluster(make_bot, "token", max_restarts=2, restart_window=600)
+
+    def exited(self, code, group=None, uptime=1):
+        group = group or _Group(0, [0])
+        group.process = types.SimpleNamespace(exitcode=code)
+        group.started_at = time.monotonic() - uptime
+        with self.assertLogs("inkcord-establish", "INFO"):
+            self.cluster._on_exit(group)
+        return group
+
+    def test_clean_exit_is_finished(self):
+        group = self.exited(0)
+        self.assertTrue(group.finished)
+        self.assertIsNone(group.restart_at)
+
+    def test_fatal_exit_is_not_restarted(self):
+        group = self.exited(FATAL_EXIT_CODE)
+        self.assertTrue(group.fatal)
+        self.assertIsNone(group.restart_at)
+
+    def test_crashes_back_off_until_the_restart_limit(self):
+        group = self.exited(1)
+        self.assertAlmostEqual(group.restart_at - time.monotonic(), 1, places=1)
+        group = self.exited(1, group)
+        self.assertAlmostEqual(group.restart_at - time.monotonic(), 2, places=1)
+        self.assertEqual(group.restarts, 2)
+        group = self.exited(1, group)
+        self.assertTrue(group.fatal)
+
+    def test_restart_count_is_reset_after_a_long_uptime(self):
+        group = _Group(0, [0])
+        group.restarts = 2
+        group = self.exited(1, group, uptime=601)
+        self.assertFalse(group.fatal)
+        self.assertEqual(group.restarts, 1)
+
+    def test_run_restarts_a_crashed_worker(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        runs = os.path.join(directory.name, "runs")
+        cluster = Cluster(crash_once, "token", shard_count=1, processes=1)
+        cluster.gateway_url = "wss://gateway.invalid"
+        with mock.patch.dict(os.environ, {"INKCORD_TEST_RUNS": runs}):
+            with self.assertLogs("inkcord-establish", "INFO"):
+                cluster.run()
+        with open(runs) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assertEqual(cluster.status()[0]["restarts"], 1)
+        self.assertTrue(cluster.groups[0].finished)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from inkcord import codec
+
+
+PAYLOAD = {"op": 0, "t": "MESSAGE_CREATE", "s": 42, "d": {"content": "héllo \"quoted\" 💬", "id": "1", "nested": [1, None, True]}}
+
+
+class CodecTests(unittest.TestCase):
+    def codecs(self):
+        found = [codec.JSONCodec()]
+        for cls in (codec.OrjsonCodec, codec.MsgspecCodec):
+            try:
+                found.append(cls())
+            except ImportError:
+                pass
+        return found
+
+    def test_every_installed_codec_round_trips(self):
+        for c in self.codecs():
+            with self.subTest(c.name):
+                self.assertEqual(c.loads(c.dumps(PAYLOAD)), PAYLOAD)
+                self.assertEqual(c.loads(c.dumps_text(PAYLOAD)), PAYLOAD)
+                self.assertIsInstance(c.dumps(PAYLOAD), bytes)
+                self.assertIsInstance(c.dumps_text(PAYLOAD), str)
+
+    def test_codecs_agree(self):
+        encoded = codec.JSONCodec().dumps(PAYLOAD)
+        for c in self.codecs():
+            with self.subTest(c.name):
+                self.assertEqual(c.loads(encoded), PAYLOAD)
+
+    def test_set_codec(self):
+        previous = codec.get_codec()
+
+        class Counting(codec.JSONCodec):
+            calls = 0
+
+            def loads(self, data):
+                Counting.calls += 1
+                return super().loads(data)
+
+        try:
+            codec.set_codec(Counting())
+            self.assertEqual(codec.loads(b'{"a":1}'), {"a": 1})
+            self.assertEqual(Counting.calls, 1)
+        finally:
+            codec.set_codec(previous)
+
+
+class PeekEventTests(unittest.TestCase):
+    def test_bytes_and_str(self):
+        for message in (codec.dumps(PAYLOAD), codec.dumps_text(PAYLOAD)):
+            self.assertEqual(codec.peek_event(message), (0, "MESSAGE_CREATE", 42))
+
+    def test_nulls(self):
+        self.assertEqual(codec.peek_event(b'{"t":null,"s":null,"op":11,"d":null}'), (11, None, None))
+
+    def test_fields_inside_d_are_ignored(self):
+        message = b'{"d":{"t":"FAKE","s":1,"op":0},"t":"READY","s":1,"op":0}'
+        self.assertIsNone(codec.peek_event(message))
+        message = b'{"t":"READY","s":1,"op":0,"d":{"content":"\\"t\\":\\"FAKE\\""}}'
+        self.assertEqual(codec.peek_event(message), (0, "READY", 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+
+from inkcord.dispatch import EventRegistry, HandlerPool, ordering_key
+
+
+class HandlerPoolTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pool = HandlerPool(workers=4, max_queue=100)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_events_of_one_key_run_in_order(self):
+        order = []
+
+        async def handler(n):
+            await asyncio.sleep(0.001 * (5 - n % 5))
+            order.append(n)
+
+        for n in range(20):
+            await self.pool.submit(("guild", 1), handler, n)
+        await asyncio.wait_for(self.pool.join(), 2)
+        self.assertEqual(order, list(range(20)))
+
+    async def test_a_slow_key_doesnt_hold_up_other_keys(self):
+        # with one worker per hash, every key that hashed next to the slow one would wait behind it
+        pool = HandlerPool(workers=2, max_queue=100)
+        blocker = asyncio.Event()
+        done = []
+
+        async def slow():
+            await blocker.wait()
+
+        async def fast(key):
+            done.append(key)
+
+        await pool.submit(("guild", 0), slow)
+        for key in range(1, 50):
+            await pool.submit(("guild", key), fast, key)
+        await asyncio.sleep(0.05)
+        self.assertEqual(sorted(done), list(range(1, 50)))
+        blocker.set()
+        await asyncio.wait_for(pool.join(), 2)
+        await pool.close()
+
+    async def test_the_same_key_never_runs_twice_at_once(self):
+        running = set()
+        overlaps = []
+
+        async def handler(key):
+            if key in running:
+                overlaps.append(key)
+            running.add(key)
+            await asyncio.sleep(0.001)
+            running.discard(key)
+
+        for n in range(60):
+            await self.pool.submit(("guild", n % 3), handler, n % 3)
+        await asyncio.wait_for(self.pool.join(), 2)
+        self.assertEqual(overlaps, [])
+        self.assertEqual(self.pool.handled, 60)
+
+    async def test_submit_waits_when_full(self):
+        pool = HandlerPool(workers=1, max_queue=2)
+        blocker = asyncio.Event()
+
+        async def handler():
+            await blocker.wait()
+
+        await pool.submit(None, handler)
+        await asyncio.sleep(0.01)  # running
+        await pool.submit(None, handler)
+        await pool.submit(None, handler)  # two waiting
+        blocked = asyncio.ensure_future(pool.submit(None, handler))
+        await asyncio.sleep(0.01)
+        self.assertFalse(blocked.done())
+        self.assertEqual(pool.backpressure_waits, 1)
+        blocker.set()
+        await asyncio.wait_for(blocked, 1)
+        await asyncio.wait_for(pool.join(), 1)
+        await pool.close()
+
+    async def test_failing_handlers_are_counted(self):
+        async def broken():
+            raise RuntimeError("boom")
+
+        with self.assertLogs("inkcord-establish", "ERROR"):
+            await self.pool.submit(None, broken)
+            await asyncio.wait_for(self.pool.join(), 1)
+        self.assertEqual(self.pool.failed, 1)
+
+
+class RegistryTests(unittest.TestCase):
+    def test_wildcards_and_names(self):
+        registry = EventRegistry()
+        exact, wildcard = object(), object()
+        registry.add("on_message_create", exact)
+        registry.add("MESSAGE_*", wildcard)
+        self.assertEqual(registry.handlers("MESSAGE_CREATE"), (exact, wildcard))
+        self.assertEqual(registry.handlers("MESSAGE_DELETE"), (wildcard,))
+        self.assertTrue(registry.remove("message_create", exact))
+        self.assertEqual(registry.handlers("MESSAGE_CREATE"), (wildcard,))
+
+    def test_ordering_key(self):
+        self.assertEqual(ordering_key("MESSAGE_CREATE", {"guild_id": "1", "channel_id": "2"}), ("guild", "1"))
+        self.assertEqual(ordering_key("MESSAGE_CREATE", {"channel_id": "2"}), ("channel", "2"))
+        self.assertEqual(ordering_key("GUILD_CREATE", {"id": "1"}), ("guild", "1"))
+        self.assertIsNone(ordering_key("READY", {"v": 10}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import struct
+import unittest
+import zlib
+
+from inkcord import etf
+
+
+class ETFTests(unittest.TestCase):
+    def test_round_trip(self):
+        payload = {
+            "op": 2,
+            "d": {
+                "token": "abc",
+                "intents": 3276799,
+                "id": 1234567890123456789,
+                "negative": -(2**70),
+                "small": 7,
+                "int32": -5,
+                "float": 1.5,
+                "flags": [True, False, None],
+                "empty": [],
+                "nested": {"content": "héllo 💬"},
+                "huge": 2 ** (8 * 300),
+            },
+        }
+        self.assertEqual(etf._py_loads(etf._py_dumps(payload)), payload)
+        self.assertEqual(etf.loads(etf.dumps(payload)), payload)
+
+    def test_tuples_decode_as_tuples_and_encode_as_lists(self):
+        self.assertEqual(etf._py_loads(etf._py_dumps((1, 2))), [1, 2])
+        self.assertEqual(etf._py_loads(bytes([131, 104, 2, 97, 1, 97, 2])), (1, 2))
+
+    def test_terms_only_discord_sends(self):
+        atom = bytes([131, 100, 0, 4]) + b"true"
+        self.assertIs(etf._py_loads(atom), True)
+        small_atom = bytes([131, 115, 3]) + b"nil"
+        self.assertIsNone(etf._py_loads(small_atom))
+        self.assertEqual(etf._py_loads(bytes([131, 119, 5]) + b"hello"), "hello")
+        self.assertEqual(etf._py_loads(bytes([131, 107, 0, 2]) + b"hi"), "hi")
+        old_float = bytes([131, 99]) + b"1.25000000000000000000e+00".ljust(31, b"\x00")
+        self.assertEqual(etf._py_loads(old_float), 1.25)
+
+    def test_compressed_frames(self):
+        inner = etf._py_dumps({"op": 0, "d": {"a": "b" * 1000}})[1:]
+        frame = bytes([131, 80]) + struct.pack(">I", len(inner)) + zlib.compress(inner)
+        self.assertEqual(etf._py_loads(frame), {"op": 0, "d": {"a": "b" * 1000}})
+
+    def test_bad_frames(self):
+        with self.assertRaises(etf.ETFDecodeError):
+            etf._py_loads(b'{"op":0}')
+        with self.assertRaises(etf.ETFDecodeError):
+            etf._py_loads(etf._py_dumps(1) + b"\x00")
+        with self.assertRaises(etf.ETFDecodeError):
+            etf._py_loads(bytes([131, 90, 0]))
+        with self.assertRaises(TypeError):
+            etf._py_dumps({"x": object()})
+
+    def test_normalize_matches_the_python_decoder(self):
+        raw = {b"t": b"READY", b"d": [{b"id": 1}]}
+        self.assertEqual(etf._normalize(raw), {"t": "READY", "d": [{"id": 1}]})
+
+
+if __name__ == "__main__":
+    unittest.main()
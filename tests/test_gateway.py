@@ -0,0 +1,77 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+import websockets
+
+from inkcord.exceptions import GeneralException
+from inkcord.http_gateway import AsyncClient
+from inkcord.shared_types import BitIntents
+
+
+class GatewayReconnectTests(unittest.IsolatedAsyncioTestCase):
+    """Runs the client against a local gateway that asks for a reconnect, invalidates the session and then closes for good."""
+
+    async def asyncSetUp(self):
+        self.received = []
+        self.connections = 0
+        self.server = await websockets.serve(self.gateway, "127.0.0.1", 0)
+        self.url = f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        self.client = AsyncClient("token", BitIntents.GUILDS, compress=False)
+        self.client.gate_url = self.url
+        # no backoff or op 9 waits, the test would take seconds otherwise
+        patcher = mock.patch("inkcord.http_gateway.random.uniform", return_value=0.001)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.client.handler_pool.close()
+        self.client.close()
+
+    async def gateway(self, ws):
+        self.connections += 1
+        connection = self.connections
+        await ws.send(json.dumps({"op": 10, "d": {"heartbeat_interval": 45000}}))
+        try:
+            async for raw in ws:
+                payload = json.loads(raw)
+                self.received.append((connection, payload["op"]))
+                if payload["op"] == 2:
+                    await ws.send(json.dumps({
+                        "op": 0, "s": 1, "t": "READY",
+                        "d": {"session_id": f"session-{connection}", "resume_gateway_url": self.url, "application": {"id": "42"}},
+                    }))
+                    if connection == 1:
+                        await ws.send(json.dumps({"op": 7, "d": None}))
+                    else:
+                        await ws.close(4004)
+                elif payload["op"] == 6:
+                    await ws.send(json.dumps({"op": 0, "s": 2, "t": "RESUMED", "d": {}}))
+                    await ws.send(json.dumps({"op": 9, "d": False}))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def test_reconnect_resume_invalid_session_and_fatal_close(self):
+        with self.assertLogs("inkcord-establish", "INFO") as logs:
+            with self.assertRaises(GeneralException):
+                await asyncio.wait_for(self.client.start(), 10)
+        # IDENTIFY, op 7 -> RESUME, op 9 (not resumable) -> IDENTIFY, 4004 -> give up
+        self.assertEqual(self.received, [(1, 2), (2, 6), (3, 2)])
+        self.assertEqual(self.client.app_id, "42")
+        self.assertEqual(self.client.session_id, "session-3")
+        self.assertTrue(any("4004" in line for line in logs.output))
+
+    async def test_gives_up_after_max_reconnects(self):
+        self.client.gate_url = "ws://127.0.0.1:1"
+        self.client.max_reconnects = 2
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            with self.assertRaises(GeneralException):
+                await asyncio.wait_for(self.client.start(), 10)
+        self.assertEqual(self.client.num_reconnects, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
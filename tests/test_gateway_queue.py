@@ -0,0 +1,97 @@
+import asyncio
+import unittest
+
+from inkcord.gateway_queue import GatewaySendQueue, coalesce_key
+from inkcord.ratelimit import GatewayLimiter
+
+
+def presence(status):
+    return {"op": 3, "d": {"status": status}}
+
+
+def voice(guild_id, channel_id):
+    return {"op": 4, "d": {"guild_id": guild_id, "channel_id": channel_id}}
+
+
+class GatewaySendQueueTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.sent = []
+        self.queue = GatewaySendQueue(GatewayLimiter(limit=5, per=0.2, headroom=2))
+
+    async def asyncTearDown(self):
+        self.queue.close()
+
+    async def send(self, payload):
+        self.sent.append(payload)
+
+    async def test_coalescing_keeps_the_latest_in_the_first_ones_place(self):
+        first = self.queue.put(presence("idle"))
+        chunk = self.queue.put({"op": 8, "d": {}})
+        other_guild = self.queue.put(voice(2, 1))
+        latest = self.queue.put(presence("dnd"))
+        same_guild = self.queue.put(voice("2", None))
+        self.assertEqual(self.queue.depth, 3)
+        self.assertEqual(self.queue.coalesced, 2)
+        self.queue.attach(self.send)
+        await asyncio.wait_for(asyncio.gather(first, chunk, other_guild, latest, same_guild), 1)
+        self.assertEqual(self.sent, [presence("dnd"), {"op": 8, "d": {}}, voice("2", None)])
+
+    async def test_sent_payloads_arent_replaced(self):
+        self.queue.attach(self.send)
+        await self.queue.send(presence("idle"))
+        await self.queue.send(presence("dnd"))
+        self.assertEqual(self.sent, [presence("idle"), presence("dnd")])
+
+    async def test_queue_keeps_headroom_for_urgent_payloads(self):
+        self.queue.attach(self.send)
+        for n in range(4):
+            self.queue.put({"op": 8, "d": {"n": n}})
+        await asyncio.sleep(0.05)
+        # 5 per window with 2 kept back, so only 3 went out
+        self.assertEqual(len(self.sent), 3)
+        await self.queue.send_now({"op": 1, "d": None})
+        await self.queue.send_now({"op": 1, "d": None})
+        self.assertEqual(len(self.sent), 5)
+        # the window is used up, so even an urgent payload waits for it now
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            await self.queue.send_now({"op": 1, "d": None})
+        self.assertGreater(loop.time() - started, 0.1)
+
+    async def test_payloads_wait_while_detached(self):
+        waiter = self.queue.put({"op": 8, "d": {}})
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+        with self.assertRaises(ConnectionError):
+            await self.queue.send_now({"op": 1, "d": None})
+        self.queue.attach(self.send)
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(self.queue.sent, 1)
+        self.assertIsNotNone(self.queue.latency)
+
+    async def test_failed_sends_fail_their_waiters(self):
+        async def broken(payload):
+            raise ConnectionResetError()
+
+        self.queue.attach(broken)
+        with self.assertRaises(ConnectionResetError):
+            await asyncio.wait_for(self.queue.send({"op": 8, "d": {}}), 1)
+
+    async def test_close_fails_what_was_left(self):
+        waiter = self.queue.put({"op": 8, "d": {}})
+        self.queue.close()
+        with self.assertRaises(ConnectionError):
+            await waiter
+
+
+class CoalesceKeyTests(unittest.TestCase):
+    def test_keys(self):
+        self.assertEqual(coalesce_key(presence("online")), ("presence",))
+        self.assertEqual(coalesce_key(voice(1, 2)), coalesce_key(voice("1", None)))
+        self.assertNotEqual(coalesce_key(voice(1, 2)), coalesce_key(voice(2, 2)))
+        self.assertIsNone(coalesce_key({"op": 8, "d": {}}))
+
+
+if __name__ == "__main__":
+    unittest.main()
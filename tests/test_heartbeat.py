@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+import websockets
+
+from inkcord.heartbeat import Heartbeat
+
+
+class HeartbeatTests(unittest.IsolatedAsyncioTestCase):
+    def make(self, interval=0.05, auto_ack=True, error=None):
+        self.sent = []
+        self.zombies = 0
+
+        async def send(payload):
+            if error is not None:
+                raise error
+            self.sent.append(payload)
+            if auto_ack:
+                self.heartbeat.ack()
+
+        async def on_zombie():
+            self.zombies += 1
+
+        self.heartbeat = Heartbeat(interval, send, lambda: 7, on_zombie, window=3)
+        self.addCleanup(self.heartbeat.stop)
+        return self.heartbeat
+
+    async def test_beats_with_the_last_sequence(self):
+        heartbeat = self.make()
+        heartbeat.start()
+        await asyncio.sleep(0.18)
+        self.assertGreaterEqual(len(self.sent), 3)
+        self.assertEqual(self.sent[0], {"op": 1, "d": 7})
+        self.assertTrue(heartbeat.running)
+        self.assertEqual(self.zombies, 0)
+
+    async def test_latency_is_kept_over_the_window(self):
+        heartbeat = self.make(auto_ack=False)
+        self.assertIsNone(heartbeat.latency)
+        for _ in range(5):
+            await heartbeat.beat()
+            heartbeat.ack()
+        self.assertEqual(len(heartbeat.latencies), 3)
+        self.assertIsNotNone(heartbeat.latency)
+        self.assertIsNotNone(heartbeat.average_latency)
+
+    async def test_missed_ack_is_a_zombie(self):
+        heartbeat = self.make(auto_ack=False)
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            heartbeat.start()
+            await asyncio.sleep(0.15)
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.zombies, 1)
+        self.assertEqual(heartbeat.missed_acks, 1)
+        self.assertFalse(heartbeat.running)
+
+    async def test_closed_connection_stops_the_heartbeat(self):
+        heartbeat = self.make(error=websockets.ConnectionClosed(None, None))
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        heartbeat.start()
+        task = heartbeat._task
+        await asyncio.sleep(0.1)
+        self.assertTrue(task.done())
+        self.assertIsNone(task.exception())
+        self.assertFalse(heartbeat.running)
+        self.assertEqual(self.zombies, 0)
+        del task
+        self.assertEqual(errors, [])
+
+    async def test_stop(self):
+        heartbeat = self.make()
+        heartbeat.start()
+        heartbeat.stop()
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.sent, [])
+        self.assertFalse(heartbeat.running)
+
+
+if __name__ == "__main__":
+    unittest.main()
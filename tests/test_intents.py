@@ -0,0 +1,58 @@
+import unittest
+
+from inkcord.intents import can_arrive, plan_intents
+from inkcord.shared_types import BitIntents
+
+EVERYTHING = 0
+for intent in BitIntents:
+    EVERYTHING |= intent
+
+
+class PlanIntentsTests(unittest.TestCase):
+    def test_only_listened_intents_are_kept(self):
+        plan = plan_intents(EVERYTHING, {"MESSAGE_REACTION_ADD"})
+        self.assertTrue(plan.intents & BitIntents.GUILD_MESSAGE_REACTIONS)
+        self.assertFalse(plan.intents & BitIntents.GUILD_PRESENCES)
+        self.assertFalse(plan.intents & BitIntents.GUILD_MESSAGES)
+
+    def test_guilds_is_always_kept(self):
+        self.assertTrue(plan_intents(EVERYTHING, set()).intents & BitIntents.GUILDS)
+        self.assertTrue(plan_intents(EVERYTHING, {"MESSAGE_CREATE"}).intents & BitIntents.GUILDS)
+
+    def test_never_adds_intents_that_werent_asked_for(self):
+        plan = plan_intents(BitIntents.GUILD_MESSAGES, {"PRESENCE_UPDATE"})
+        self.assertFalse(plan.intents & BitIntents.GUILD_PRESENCES)
+        self.assertFalse(plan.intents & BitIntents.GUILDS)
+        self.assertIn("PRESENCE_UPDATE", plan.missing)
+
+    def test_extra_intents_are_kept(self):
+        # like member chunking, which sends op 8 long after IDENTIFY
+        extra = BitIntents.GUILD_MEMBERS | BitIntents.GUILD_PRESENCES
+        plan = plan_intents(EVERYTHING, set(), extra)
+        self.assertEqual(plan.intents & extra, extra)
+
+    def test_message_events_keep_message_content(self):
+        self.assertTrue(plan_intents(EVERYTHING, {"MESSAGE_CREATE"}).intents & BitIntents.MESSAGE_CONTENT)
+
+    def test_wildcards(self):
+        plan = plan_intents(EVERYTHING, {"GUILD_BAN_*"})
+        self.assertTrue(plan.intents & BitIntents.GUILD_MODERATION)
+        self.assertEqual(plan.missing, {})
+
+    def test_not_minimizing_keeps_everything(self):
+        self.assertEqual(plan_intents(EVERYTHING, set(), minimize=False).intents, EVERYTHING)
+
+    def test_report_counts_bytes_of_dropped_events(self):
+        plan = plan_intents(EVERYTHING, {"MESSAGE_CREATE"})
+        report = plan.report({"PRESENCE_UPDATE": 300, "MESSAGE_CREATE": 100})
+        self.assertIn("PRESENCE_UPDATE", report)
+        self.assertIn("300 of the 400 bytes", report)
+
+    def test_can_arrive(self):
+        self.assertTrue(can_arrive("MESSAGE_CREATE", BitIntents.DIRECT_MESSAGES))
+        self.assertFalse(can_arrive("MESSAGE_CREATE", BitIntents.GUILDS))
+        self.assertTrue(can_arrive("INTERACTION_CREATE", 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
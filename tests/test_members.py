@@ -0,0 +1,108 @@
+import asyncio
+import unittest
+
+from inkcord.exceptions import RequiredIntentsMissing
+from inkcord.members import MemberChunker
+from inkcord.shared_types import BitIntents
+
+
+class FakeClient:
+    def __init__(self, intents=BitIntents.GUILD_MEMBERS | BitIntents.GUILD_PRESENCES):
+        self.intents = intents
+        self.intent_plan = None
+        self.sent = []
+
+    async def send_gateway(self, payload, guild_id=None):
+        self.sent.append(payload)
+
+
+def chunk(guild_id, nonce, index, count, *user_ids):
+    return {
+        "guild_id": guild_id,
+        "nonce": nonce,
+        "chunk_index": index,
+        "chunk_count": count,
+        "members": [{"user": {"id": user_id}} for user_id in user_ids],
+    }
+
+
+def user_id(member):
+    return member["user"]["id"]
+
+
+class MemberChunkerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = FakeClient()
+        self.chunker = MemberChunker(self.client)
+
+    async def wait_sent(self, count):
+        while len(self.client.sent) < count:
+            await asyncio.sleep(0)
+
+    async def test_interleaved_chunks_go_to_their_own_request(self):
+        first = asyncio.ensure_future(self.chunker.fetch("1", convert=user_id))
+        second = asyncio.ensure_future(self.chunker.fetch("2", convert=user_id))
+        await self.wait_sent(2)
+        one, two = (payload["d"]["nonce"] for payload in self.client.sent)
+        self.assertNotEqual(one, two)
+        self.assertEqual(self.chunker.pending, 2)
+        self.assertTrue(self.chunker.feed(chunk("2", two, 0, 2, "c")))
+        self.assertTrue(self.chunker.feed(chunk("1", one, 0, 2, "a")))
+        self.assertTrue(self.chunker.feed(chunk("2", two, 1, 2, "d")))
+        self.assertTrue(self.chunker.feed(chunk("1", one, 1, 2, "b")))
+        self.assertEqual(await asyncio.wait_for(first, 1), ["a", "b"])
+        self.assertEqual(await asyncio.wait_for(second, 1), ["c", "d"])
+        self.assertEqual(self.chunker.pending, 0)
+        self.assertEqual(self.chunker.members_received, 4)
+
+    async def test_unknown_nonces_are_ignored(self):
+        self.assertFalse(self.chunker.feed(chunk("1", "someone-else", 0, 1, "a")))
+        self.assertFalse(self.chunker.feed(chunk("1", None, 0, 1, "a")))
+
+    async def test_payload(self):
+        request = asyncio.ensure_future(self.chunker.fetch("1", user_ids=[5, 6], presences=True, convert=user_id))
+        await self.wait_sent(1)
+        payload = self.client.sent[0]
+        self.assertEqual(payload["op"], 8)
+        self.assertEqual(payload["d"]["user_ids"], ["5", "6"])
+        self.assertNotIn("query", payload["d"])
+        self.assertTrue(payload["d"]["presences"])
+        self.chunker.feed(chunk("1", payload["d"]["nonce"], 0, 1, "5", "6"))
+        self.assertEqual(await asyncio.wait_for(request, 1), ["5", "6"])
+
+    async def test_timeout_forgets_the_request(self):
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.chunker.fetch("1", timeout=0.01)
+        self.assertEqual(self.chunker.pending, 0)
+
+    async def test_missing_intents(self):
+        chunker = MemberChunker(FakeClient(BitIntents.GUILDS))
+        with self.assertLogs("inkcord-establish", "CRITICAL"):
+            with self.assertRaises(RequiredIntentsMissing):
+                await chunker.fetch("1")
+            with self.assertRaises(RequiredIntentsMissing):
+                await chunker.fetch("1", user_ids=[1], presences=True)
+
+    async def test_request_many_yields_every_guild(self):
+        async def answer():
+            answered = 0
+            while answered < 3:
+                await asyncio.sleep(0)
+                for payload in self.client.sent[answered:]:
+                    d = payload["d"]
+                    self.chunker.feed(chunk(d["guild_id"], d["nonce"], 0, 1, d["guild_id"]))
+                    answered += 1
+
+        responder = asyncio.ensure_future(answer())
+        members = [
+            member
+            async for c in self.chunker.request_many(["1", "2", "3"], concurrency=2, convert=user_id)
+            for member in c.members
+        ]
+        await responder
+        self.assertEqual(sorted(members), ["1", "2", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
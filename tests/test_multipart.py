@@ -0,0 +1,36 @@
+import io
+import json
+import types
+import unittest
+
+from inkcord.multipart import MultipartBody, quote_filename
+
+
+def attachment(name, data, **kwargs):
+    return types.SimpleNamespace(file_name=name, fp=data, description=kwargs.get("description"), content_type=kwargs.get("content_type"))
+
+
+class MultipartTests(unittest.TestCase):
+    def test_filename_cant_break_out_of_the_header(self):
+        body = MultipartBody({}, [attachment('evil".txt\r\nX-Injected: 1', b"hi")])
+        raw = b"".join(bytes(chunk) for chunk in body)
+        self.assertNotIn(b"\r\nX-Injected", raw)
+        self.assertIn(b'filename="evil%22.txt%0D%0AX-Injected: 1"', raw)
+
+    def test_quote_filename_leaves_normal_names_alone(self):
+        self.assertEqual(quote_filename("cat picture (1).png"), "cat picture (1).png")
+
+    def test_payload_keeps_the_real_filename(self):
+        body = MultipartBody({"content": "x"}, [attachment('a"b.txt', b"hi")])
+        payload = body._payload.split(b"\r\n\r\n", 1)[1].rstrip(b"\r\n")
+        self.assertEqual(json.loads(payload)["attachments"][0]["filename"], 'a"b.txt')
+
+    def test_content_length_matches_the_body(self):
+        body = MultipartBody({}, [attachment("a.bin", io.BytesIO(b"x" * 100_000)), attachment("b.bin", b"y" * 10)])
+        self.assertEqual(body.content_length, sum(len(chunk) for chunk in body))
+        # and again, for a retry
+        self.assertEqual(body.content_length, sum(len(chunk) for chunk in body))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import urllib.parse
+
+from inkcord.pagination import paginate
+from inkcord.util import query_string
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class FakeMessages:
+    """Answers message history requests the way discord does, newest first whichever way you walk."""
+
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+        self.queries = []
+
+    async def request(self, method, route, **params):
+        self.queries.append(query_string(params))
+        limit = params["limit"]
+        if "after" in params:
+            page = [i for i in self.ids if i > params["after"]][:limit]
+        else:
+            before = params.get("before")
+            page = [i for i in self.ids if before is None or i < before][-limit:]
+        return Response([{"id": str(i)} for i in reversed(page)])
+
+
+async def collect(iterator):
+    return [int(item["id"]) async for item in iterator]
+
+
+class PaginateTests(unittest.IsolatedAsyncioTestCase):
+    async def test_after_walks_oldest_first(self):
+        conn = FakeMessages(range(1, 26))
+        self.assertEqual(await collect(paginate(conn, "channels/1/messages", 10, "after", 0)), list(range(1, 26)))
+
+    async def test_before_walks_newest_first(self):
+        conn = FakeMessages(range(1, 26))
+        self.assertEqual(await collect(paginate(conn, "channels/1/messages", 10, "before")), list(range(25, 0, -1)))
+
+    async def test_limit_stops_early(self):
+        conn = FakeMessages(range(1, 26))
+        self.assertEqual(await collect(paginate(conn, "channels/1/messages", 10, "after", 5, limit=12)), list(range(6, 18)))
+        self.assertEqual(len(conn.queries), 2)
+
+    async def test_booleans_are_lower_case(self):
+        conn = FakeMessages(range(1, 3))
+        await collect(paginate(conn, "users/@me/guilds", 200, with_counts=False))
+        self.assertEqual(urllib.parse.parse_qs(conn.queries[0])["with_counts"], ["false"])
+
+
+class QueryStringTests(unittest.TestCase):
+    def test_values(self):
+        self.assertEqual(query_string({"with_counts": True, "limit": 5, "q": "a b"}), "with_counts=true&limit=5&q=a+b")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import socket
+import threading
+import time
+import unittest
+
+from inkcord.pool import ConnectionPool, PooledConnection
+
+
+class SilentServer:
+    """Accepts connections and never answers, like a hung server."""
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        self.accepted = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepted.append(conn)
+
+    def close(self):
+        self.sock.close()
+        for conn in self.accepted:
+            conn.close()
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def test_hung_server_times_out(self):
+        server = SilentServer()
+        self.addCleanup(server.close)
+        pool = ConnectionPool("127.0.0.1", size=1, timeout=0.2)
+        conn = PooledConnection(pool, "127.0.0.1", port=server.port)
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            conn.connect()
+        self.assertLess(time.monotonic() - start, 2)
+        conn.close()
+
+    def test_size_is_bounded(self):
+        pool = ConnectionPool("127.0.0.1", size=2)
+        first, second = pool.acquire(), pool.acquire()
+        self.assertEqual(pool.in_use, 2)
+        released = []
+        threading.Timer(0.05, lambda: (released.append(True), pool.release(first))).start()
+        third = pool.acquire()
+        self.assertTrue(released)
+        self.assertEqual(pool.in_use, 2)
+        pool.release(second)
+        pool.release(third)
+
+    def test_broken_connections_are_not_reused(self):
+        pool = ConnectionPool("127.0.0.1", size=1)
+        conn = pool.acquire()
+        pool.release(conn, reusable=False)
+        self.assertIsNot(pool.acquire(), conn)
+
+    def test_connection_is_thrown_away_when_the_block_raises(self):
+        pool = ConnectionPool("127.0.0.1", size=1)
+        with self.assertRaises(ValueError):
+            with pool.connection():
+                raise ValueError
+        self.assertEqual(pool.in_use, 0)
+        self.assertEqual(pool._open, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
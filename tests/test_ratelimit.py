@@ -0,0 +1,96 @@
+import time
+import unittest
+
+from inkcord.ratelimit import Bucket, GlobalLimiter, RateLimiter, route_key
+
+
+def headers(limit, remaining, reset_after, bucket="abc"):
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset-After": str(reset_after),
+        "X-RateLimit-Bucket": bucket,
+    }
+
+
+class RouteKeyTests(unittest.TestCase):
+    def test_major_parameter_is_not_in_the_template(self):
+        _, template_a, major_a = route_key("GET", "channels/1/messages/2")
+        _, template_b, major_b = route_key("GET", "channels/4/messages/3")
+        self.assertEqual(template_a, template_b)
+        self.assertEqual(template_a, "channels/:major/messages/:id")
+        self.assertEqual((major_a, major_b), ("channels/1", "channels/4"))
+
+    def test_tokens_and_emojis_are_replaced(self):
+        _, template_a, major_a = route_key("POST", "webhooks/1/token-a/messages/5")
+        _, template_b, _ = route_key("POST", "webhooks/2/token-b/messages/6")
+        self.assertEqual(template_a, template_b)
+        self.assertEqual(major_a, "webhooks/1/token-a")
+        _, template_c, _ = route_key("PUT", "channels/1/messages/2/reactions/%F0%9F%91%8D/@me")
+        _, template_d, _ = route_key("PUT", "channels/1/messages/2/reactions/custom:3/@me")
+        self.assertEqual(template_c, template_d)
+
+    def test_query_string_is_ignored(self):
+        self.assertEqual(
+            route_key("GET", "guilds/1/members?limit=1000"),
+            route_key("GET", "guilds/1/members"),
+        )
+
+
+class BucketTests(unittest.TestCase):
+    def test_unknown_limit_lets_everything_through(self):
+        bucket = Bucket("x")
+        self.assertEqual([bucket.reserve(0) for _ in range(10)], [0.0] * 10)
+
+    def test_exhausted_bucket_queues_into_the_next_window(self):
+        bucket = Bucket("x")
+        bucket.update(headers(2, 1, 1.0), 100.0)
+        self.assertEqual(bucket.reserve(100.0), 0.0)
+        self.assertAlmostEqual(bucket.reserve(100.0), 1.0)
+        self.assertAlmostEqual(bucket.reserve(100.0), 1.0)
+        self.assertAlmostEqual(bucket.reserve(100.0), 2.0)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_buckets_are_per_major_parameter(self):
+        limiter = RateLimiter()
+        limiter.update("GET", "channels/1/messages", headers(1, 0, 5))
+        self.assertGreater(limiter.reserve("GET", "channels/1/messages"), 0)
+        self.assertEqual(limiter.reserve("GET", "channels/2/messages"), 0)
+
+    def test_idle_buckets_are_swept_but_limits_are_kept(self):
+        limiter = RateLimiter(sweep_interval=0)
+        for channel in range(100):
+            limiter.update("GET", f"channels/{channel}/messages", headers(5, 4, 0.01))
+        self.assertEqual(len(limiter.route_hashes), 1)
+        self.assertEqual(len(limiter.buckets), 100)
+        time.sleep(0.02)
+        limiter.reserve("GET", "channels/500/messages")
+        self.assertEqual(len(limiter.buckets), 1)
+        self.assertEqual(limiter.buckets["abc:channels/500"].limit, 5)
+
+    def test_ratelimited_bucket_waits(self):
+        limiter = RateLimiter()
+        limiter.on_ratelimited("POST", "channels/1/messages", 2.0)
+        delay = limiter.reserve("POST", "channels/1/messages")
+        self.assertGreater(delay, 1.5)
+        limiter.release("POST", "channels/1/messages", delay)
+
+
+class GlobalLimiterTests(unittest.TestCase):
+    def test_requests_are_spaced_evenly(self):
+        limiter = GlobalLimiter(rate=10)
+        delays = [limiter.reserve("channels/1") for _ in range(3)]
+        self.assertAlmostEqual(delays[1] - delays[0], 0.1, places=2)
+        self.assertAlmostEqual(delays[2] - delays[1], 0.1, places=2)
+
+    def test_interactions_are_exempt(self):
+        limiter = GlobalLimiter(rate=1)
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            limiter.on_ratelimited(10)
+        self.assertEqual(limiter.reserve("interactions/1/token/callback"), 0.0)
+        self.assertGreater(limiter.reserve("channels/1"), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
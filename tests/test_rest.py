@@ -0,0 +1,229 @@
+import asyncio
+import contextlib
+import threading
+import unittest
+
+from inkcord.exceptions import RequestException
+from inkcord.http_gateway import AsyncClient, Request, Response
+from inkcord.shared_types import BitIntents
+
+
+class RestTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs an `AsyncClient` against a fake transport, which answers with whatever `answer` returns."""
+
+    async def asyncSetUp(self):
+        self.client = AsyncClient("token", BitIntents.GUILDS, global_rate=1000)
+        self.sent = []
+        self.client.transport.request = self.fake_request
+
+    async def asyncTearDown(self):
+        self.client.close()
+
+    async def fake_request(self, method, path, body, headers):
+        self.sent.append((method, path))
+        return await self.answer(method, path)
+
+    async def answer(self, method, path):
+        return 200, {}, b"{}"
+
+
+class RateLimitResponseTests(RestTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.answers = []
+
+    async def answer(self, method, path):
+        return self.answers.pop(0)
+
+    async def test_429_without_json_body_backs_off_on_retry_after(self):
+        self.answers = [
+            (429, {"Retry-After": "0.2", "Content-Type": "text/html"}, b"<html>Error 1015</html>"),
+            (200, {}, b'{"id": "1"}'),
+        ]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            response = await self.client.request("GET", "users/@me")
+        self.assertEqual(response.json(), {"id": "1"})
+        self.assertEqual(len(self.sent), 2)
+        self.assertGreaterEqual(loop.time() - start, 0.15)
+        # the pause covers every route, not just the one that got the 429
+        self.assertGreater(self.client.global_limiter.paused_until, 0)
+
+    async def test_429_with_json_body_waits_on_the_bucket(self):
+        self.answers = [
+            (429, {"X-RateLimit-Bucket": "abc"}, b'{"retry_after": 0.1, "global": false}'),
+            (200, {}, b"{}"),
+        ]
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            await self.client.request("POST", "channels/1/messages", {"content": "hi"})
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(self.client.global_limiter.paused_until, 0)
+
+
+class CoalescingTests(RestTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.release = asyncio.Event()
+        self.status = 200
+
+    async def answer(self, method, path):
+        await self.release.wait()
+        return self.status, {}, b'{"id": "1"}'
+
+    async def gather(self, *requests):
+        tasks = [asyncio.ensure_future(request) for request in requests]
+        await asyncio.sleep(0.05)
+        self.release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def test_identical_gets_share_one_request(self):
+        responses = await self.gather(*(self.client.request("GET", "channels/1/messages", limit=5) for _ in range(5)))
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.client.coalesced_requests, 4)
+        self.assertTrue(all(response is responses[0] for response in responses))
+        # once it's done, the next GET goes out again
+        await self.client.request("GET", "channels/1/messages", limit=5)
+        self.assertEqual(len(self.sent), 2)
+
+    async def test_different_query_strings_are_not_shared(self):
+        await self.gather(
+            self.client.request("GET", "channels/1/messages", limit=5),
+            self.client.request("GET", "channels/1/messages", limit=6),
+        )
+        self.assertEqual(len(self.sent), 2)
+
+    async def test_other_methods_are_never_coalesced(self):
+        await self.gather(*(self.client.request("POST", "channels/1/messages", {"content": "hi"}) for _ in range(3)))
+        self.assertEqual(len(self.sent), 3)
+        self.assertEqual(self.client.coalesced_requests, 0)
+
+    async def test_error_reaches_every_waiter(self):
+        self.status = 403
+        with self.assertLogs("inkcord-establish", "CRITICAL"):
+            results = await self.gather(*(self.client.request("GET", "channels/1/messages") for _ in range(3)))
+        self.assertEqual(len(self.sent), 1)
+        self.assertTrue(all(isinstance(result, RequestException) for result in results))
+
+    async def test_cancelled_waiter_does_not_cancel_the_others(self):
+        first = asyncio.ensure_future(self.client.request("GET", "channels/1/messages"))
+        second = asyncio.ensure_future(self.client.request("GET", "channels/1/messages"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        self.release.set()
+        self.assertEqual((await second).status, 200)
+        self.assertEqual(len(self.sent), 1)
+
+
+class SyncCoalescingTests(RestTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.release = threading.Event()
+        self.sync_sent = []
+        self.client._send = self.fake_send
+
+    def fake_send(self, request):
+        self.sync_sent.append(request.method)
+        self.release.wait(5)
+        return Response(200, {}, b"{}")
+
+    async def test_identical_gets_share_one_future(self):
+        futures = [self.client.send_request("GET", "channels/1/messages") for _ in range(3)]
+        self.release.set()
+        self.assertTrue(all(future is futures[0] for future in futures))
+        futures[0].result(5)
+        self.assertEqual(self.sync_sent, ["GET"])
+        self.assertEqual(self.client.coalesced_requests, 2)
+
+    async def test_other_methods_are_never_coalesced(self):
+        futures = [self.client.send_request("DELETE", "channels/1/messages/2") for _ in range(3)]
+        self.release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual(self.sync_sent, ["DELETE"] * 3)
+
+
+class BatchTests(RestTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.finished = 0
+
+    async def answer(self, method, path):
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        try:
+            number = int(path.rsplit("/", 1)[1])
+            # later requests finish first, so the order has to be restored
+            await asyncio.sleep(0.1 - number * 0.02)
+            self.finished += 1
+            if number == 3:
+                return 403, {}, b"{}"
+            return 200, {}, b'{"number": %d}' % number
+        finally:
+            self.in_flight -= 1
+
+    def requests(self, count):
+        return [Request("PUT", None, f"guilds/1/members/{number}") for number in range(count)]
+
+    async def test_results_keep_the_request_order(self):
+        with self.assertLogs("inkcord-establish", "CRITICAL"):
+            results = await self.client.send_batch(self.requests(8), concurrency=8)
+        self.assertEqual([result.index for result in results], list(range(8)))
+        self.assertEqual(
+            [result.response.json()["number"] for result in results if result.ok],
+            [0, 1, 2, 4, 5, 6, 7],
+        )
+
+    async def test_one_failure_does_not_stop_the_others(self):
+        with self.assertLogs("inkcord-establish", "CRITICAL"):
+            results = await self.client.send_batch(self.requests(6))
+        failed = [result for result in results if not result.ok]
+        self.assertEqual([result.index for result in failed], [3])
+        self.assertIsInstance(failed[0].error, RequestException)
+        self.assertIsNone(failed[0].response)
+        self.assertEqual(sum(result.ok for result in results), 5)
+
+    async def test_concurrency_is_bounded(self):
+        with self.assertLogs("inkcord-establish", "CRITICAL"):
+            results = await self.client.send_batch(self.requests(10), concurrency=3)
+        self.assertEqual(len(results), 10)
+        self.assertEqual(self.most_in_flight, 3)
+
+    async def test_requests_are_pulled_lazily(self):
+        pulled = []
+
+        async def generate():
+            for request in self.requests(3):
+                pulled.append(request)
+                yield request
+
+        async with contextlib.aclosing(self.client.iter_batch(generate(), concurrency=1)) as results:
+            await results.__anext__()
+            self.assertLessEqual(len(pulled), 2)
+
+    async def test_breaking_out_cancels_the_rest(self):
+        async with contextlib.aclosing(self.client.iter_batch(self.requests(10), concurrency=2)) as results:
+            first = await results.__anext__()
+        self.assertEqual(first.index, 1)
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.finished, 1)
+        self.assertEqual(self.in_flight, 0)
+        self.assertLessEqual(len(self.sent), 3)
+
+    async def test_send_multiple_requests(self):
+        def fake_send(request):
+            if request.api_route.endswith("/1"):
+                raise ValueError("broken")
+            return Response(200, {}, b"{}")
+
+        self.client._send = fake_send
+        results = self.client.send_multiple_requests(*self.requests(3))
+        self.assertEqual([result.index for result in results], [0, 1, 2])
+        self.assertEqual([result.ok for result in results], [True, False, True])
+        self.assertIsInstance(results[1].error, ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
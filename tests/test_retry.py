@@ -0,0 +1,63 @@
+import asyncio
+import random
+import unittest
+
+from inkcord.retry import RetryPolicy
+
+
+class RetryPolicyTests(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.policy = RetryPolicy(max_attempts=3, base=0.5, cap=10)
+
+    def retry(self, *args, **kwargs):
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            return self.policy.retry_after(*args, **kwargs)
+
+    def test_server_errors_are_retried_with_jitter(self):
+        for attempt in (1, 2):
+            delay = self.retry("GET", "guilds/1", attempt, status=503)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, 0.5 * 2**attempt)
+
+    def test_delay_is_capped(self):
+        policy = RetryPolicy(max_attempts=100, base=1, cap=2)
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            self.assertLessEqual(policy.retry_after("GET", "guilds/1", 50, status=500), 2)
+
+    def test_what_isnt_retried(self):
+        self.assertIsNone(self.policy.retry_after("GET", "guilds/1", 1, status=404))
+        self.assertIsNone(self.policy.retry_after("GET", "guilds/1", 1, error=ValueError()))
+        self.assertIsNone(self.policy.retry_after("GET", "guilds/1", 3, status=500))
+        self.assertIsNone(self.policy.retry_after("POST", "channels/1/messages", 1, status=500))
+
+    def test_connection_errors_are_retried(self):
+        self.assertIsNotNone(self.retry("GET", "guilds/1", 1, error=ConnectionResetError()))
+        self.assertIsNotNone(self.retry("GET", "guilds/1", 1, error=asyncio.IncompleteReadError(b"", 10)))
+
+    def test_non_idempotent_retries_can_be_turned_on(self):
+        policy = RetryPolicy(retry_non_idempotent=True)
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            self.assertIsNotNone(policy.retry_after("POST", "channels/1/messages", 1, status=502))
+
+    def test_budget_limits_retries(self):
+        policy = RetryPolicy(max_attempts=10, budget_ratio=0.5, max_budget=2)
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            self.assertIsNotNone(policy.retry_after("GET", "guilds/1", 1, status=500))
+            self.assertIsNotNone(policy.retry_after("GET", "guilds/1", 1, status=500))
+        self.assertIsNone(policy.retry_after("GET", "guilds/1", 1, status=500))
+        self.assertEqual(policy.budget_exhausted, 1)
+        policy.record_request()
+        policy.record_request()
+        with self.assertLogs("inkcord-establish", "WARNING"):
+            self.assertIsNotNone(policy.retry_after("GET", "guilds/1", 1, status=500))
+
+    def test_retries_are_counted_per_route_template(self):
+        for guild in range(5):
+            self.retry("GET", f"guilds/{guild}/channels", 1, status=500)
+        self.assertEqual(len(self.policy.retries), 1)
+        self.assertEqual(sum(self.policy.retries.values()), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from inkcord.scheduler import Priority, RequestScheduler, priority_for
+
+
+class SchedulerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_waiters_are_woken_by_priority(self):
+        scheduler = RequestScheduler(slots=1, reserved=0)
+        await scheduler.acquire(Priority.USER)
+        order = []
+
+        async def wait(priority):
+            await scheduler.acquire(priority)
+            order.append(priority)
+            scheduler.release()
+
+        tasks = [
+            asyncio.ensure_future(wait(priority))
+            for priority in (Priority.BACKGROUND, Priority.USER, Priority.INTERACTION)
+        ]
+        await asyncio.sleep(0)
+        self.assertEqual(
+            scheduler.queue_depth(),
+            {Priority.INTERACTION: 1, Priority.USER: 1, Priority.BACKGROUND: 1},
+        )
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, [Priority.INTERACTION, Priority.USER, Priority.BACKGROUND])
+
+    async def test_earliest_deadline_first_within_a_priority(self):
+        scheduler = RequestScheduler(slots=1, reserved=0)
+        await scheduler.acquire(Priority.USER)
+        order = []
+
+        async def wait(name, deadline):
+            await scheduler.acquire(Priority.INTERACTION, deadline)
+            order.append(name)
+            scheduler.release()
+
+        now = time.monotonic()
+        tasks = [
+            asyncio.ensure_future(wait("late", now + 10)),
+            asyncio.ensure_future(wait("soon", now + 1)),
+        ]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, ["soon", "late"])
+
+    async def test_background_cant_take_reserved_slots(self):
+        scheduler = RequestScheduler(slots=2, reserved=1)
+        await scheduler.acquire(Priority.BACKGROUND)
+        background = asyncio.ensure_future(scheduler.acquire(Priority.BACKGROUND))
+        await asyncio.sleep(0.01)
+        self.assertFalse(background.done())
+        await asyncio.wait_for(scheduler.acquire(Priority.INTERACTION), 1)
+        scheduler.release()
+        scheduler.release()
+        await asyncio.wait_for(background, 1)
+        scheduler.release()
+
+    async def test_cancelled_waiter_gives_its_slot_away(self):
+        scheduler = RequestScheduler(slots=1, reserved=0)
+        await scheduler.acquire(Priority.USER)
+        cancelled = asyncio.ensure_future(scheduler.acquire(Priority.INTERACTION))
+        waiting = asyncio.ensure_future(scheduler.acquire(Priority.USER))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        scheduler.release()
+        await asyncio.wait_for(waiting, 1)
+        self.assertEqual(scheduler.in_use, 1)
+
+    def test_threads_and_coroutines_share_slots(self):
+        scheduler = RequestScheduler(slots=1, reserved=0)
+        scheduler.acquire_sync(Priority.USER)
+        got = threading.Event()
+
+        def worker():
+            scheduler.acquire_sync(Priority.BACKGROUND)
+            got.set()
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.assertFalse(got.wait(0.05))
+        scheduler.release()
+        self.assertTrue(got.wait(1))
+
+
+class PriorityForTests(unittest.TestCase):
+    def test_interactions_get_their_own_lane(self):
+        self.assertEqual(priority_for("interactions/1/token/callback"), Priority.INTERACTION)
+        self.assertEqual(priority_for("channels/1/messages"), Priority.USER)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from inkcord.session_store import SessionStore
+
+
+class SessionStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = SessionStore(self.dir.name)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip_keeps_the_app_id(self):
+        self.store.save("abc", "wss://resume", 42, app_id="1234")
+        session = self.store.load()
+        self.assertEqual((session.session_id, session.resume_url, session.seq, session.app_id), ("abc", "wss://resume", 42, "1234"))
+
+    def test_files_without_an_app_id_still_load(self):
+        with open(os.path.join(self.dir.name, "session-0.json"), "w") as f:
+            json.dump({"session_id": "abc", "resume_url": "wss://resume", "seq": 1, "shard_count": 1, "saved_at": time.time()}, f)
+        session = self.store.load()
+        self.assertEqual(session.session_id, "abc")
+        self.assertIsNone(session.app_id)
+
+    def test_writes_are_throttled_unless_forced(self):
+        self.assertTrue(self.store.save("abc", "wss://resume", 1))
+        self.assertFalse(self.store.save("abc", "wss://resume", 2))
+        self.assertTrue(self.store.save("abc", "wss://resume", 3, force=True))
+        self.assertEqual(self.store.load().seq, 3)
+
+    def test_old_and_mismatched_sessions_are_ignored(self):
+        self.store.save("abc", "wss://resume", 1, shard_id=0, shard_count=2)
+        self.assertIsNone(self.store.load(0, 4))
+        self.assertIsNotNone(self.store.load(0, 2))
+        self.store.max_age = -1
+        self.assertIsNone(self.store.load(0, 2))
+
+    def test_clear(self):
+        self.store.save("abc", "wss://resume", 1)
+        self.store.clear()
+        self.assertIsNone(self.store.load())
+
+
+if __name__ == "__main__":
+    unittest.main()
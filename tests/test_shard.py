@@ -0,0 +1,137 @@
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import websockets
+
+from inkcord.http_gateway import AsyncClient
+from inkcord.session_store import SessionStore
+from inkcord.shard import IdentifyLimiter, ShardManager, ShardState
+from inkcord.shared_types import BitIntents
+
+
+class IdentifyLimiterTests(unittest.IsolatedAsyncioTestCase):
+    async def test_identifies_are_spaced_per_bucket(self):
+        limiter = IdentifyLimiter(max_concurrency=2)
+        start = time.monotonic()
+        times = {}
+
+        async def identify(shard_id):
+            await limiter.wait(shard_id)
+            times[shard_id] = time.monotonic() - start
+
+        with mock.patch("inkcord.shard.IDENTIFY_INTERVAL", 0.2):
+            await asyncio.gather(*(identify(shard_id) for shard_id in range(6)))
+        # shards 0, 2 and 4 share bucket 0, shards 1, 3 and 5 share bucket 1
+        for first, second in ((0, 2), (2, 4), (1, 3), (3, 5)):
+            self.assertGreaterEqual(times[second] - times[first], 0.15)
+        self.assertLess(abs(times[0] - times[1]), 0.1)
+
+
+class ShardTests(unittest.IsolatedAsyncioTestCase):
+    """Runs one shard against a local gateway. After READY or RESUMED the gateway closes with the next code in `closes`,
+    or keeps the connection open when there's none left."""
+
+    async def asyncSetUp(self):
+        self.received = []
+        self.connections = 0
+        self.closes = []
+        self.server = await websockets.serve(self.gateway, "127.0.0.1", 0)
+        self.url = f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SessionStore(self.directory.name)
+        self.client = AsyncClient("token", BitIntents.GUILDS, compress=False, session_store=self.store)
+        self.client.app_id = "42"
+        self.manager = ShardManager(self.client, 1, [0], 1, self.url)
+        # no reconnect backoff, the test would take seconds otherwise
+        patcher = mock.patch("inkcord.shard.random.uniform", return_value=0.001)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.manager.close()
+        self.server.close()
+        await self.server.wait_closed()
+        await self.client.handler_pool.close()
+        self.client.close()
+        self.directory.cleanup()
+
+    async def gateway(self, ws):
+        self.connections += 1
+        connection = self.connections
+        await ws.send(json.dumps({"op": 10, "d": {"heartbeat_interval": 45000}}))
+        try:
+            async for raw in ws:
+                payload = json.loads(raw)
+                self.received.append((connection, payload["op"], payload["d"]))
+                if payload["op"] == 2:
+                    await ws.send(json.dumps({
+                        "op": 0, "s": 1, "t": "READY",
+                        "d": {"session_id": f"session-{connection}", "resume_gateway_url": self.url, "application": {"id": "42"}},
+                    }))
+                elif payload["op"] == 6:
+                    await ws.send(json.dumps({"op": 0, "s": payload["d"]["seq"] + 1, "t": "RESUMED", "d": {}}))
+                else:
+                    continue
+                if self.closes:
+                    await ws.close(self.closes.pop(0))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def run_shards(self):
+        with self.assertLogs("inkcord-establish", "INFO") as logs:
+            await self.manager.start()
+            await asyncio.wait_for(self.manager.wait(), 10)
+        return logs
+
+    def ops(self):
+        return [(connection, op) for connection, op, _ in self.received]
+
+    async def test_fatal_close_stops_the_shard(self):
+        self.closes = [4004]
+        await self.run_shards()
+        shard = self.manager.shards[0]
+        self.assertEqual(self.ops(), [(1, 2)])
+        self.assertEqual(shard.close_code, 4004)
+        self.assertIs(shard.state, ShardState.STOPPED)
+
+    async def test_reconnect_resumes(self):
+        self.closes = [4000, 4004]
+        await self.run_shards()
+        self.assertEqual(self.ops(), [(1, 2), (2, 6)])
+        resume = self.received[1][2]
+        self.assertEqual((resume["session_id"], resume["seq"]), ("session-1", 1))
+
+    async def test_stored_session_is_resumed(self):
+        self.store.save("stored", self.url, 7, force=True, app_id="42")
+        self.closes = [4004]
+        await self.run_shards()
+        self.assertEqual(self.ops(), [(1, 6)])
+        self.assertEqual(self.received[0][2]["session_id"], "stored")
+
+    async def test_invalid_seq_and_timeout_forget_the_session(self):
+        for code in (4007, 4009):
+            with self.subTest(code=code):
+                self.store.save("stored", self.url, 7, force=True, app_id="42")
+                self.received, self.connections, self.closes = [], 0, [code, 4004]
+                self.manager = ShardManager(self.client, 1, [0], 1, self.url)
+                with mock.patch.object(self.store, "clear", wraps=self.store.clear) as clear:
+                    await self.run_shards()
+                self.assertEqual(self.ops(), [(1, 6), (2, 2)])
+                clear.assert_called_with(0)
+
+    async def test_start_routes_gateway_sends_to_the_shard(self):
+        await self.manager.start()
+        self.assertIs(self.client.shard_manager, self.manager)
+        with self.assertLogs("inkcord-establish", "INFO"):
+            await asyncio.wait_for(self.client.update_presence("idle"), 5)
+            await asyncio.wait_for(self.client.send_gateway({"op": 8, "d": {"guild_id": "1"}}, guild_id=1), 5)
+        await asyncio.sleep(0.05)
+        self.assertEqual([op for _, op, _ in self.received], [2, 3, 8])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import unittest
+
+from inkcord.transport import AsyncTransport, StreamConnection
+
+
+class TransportTests(unittest.IsolatedAsyncioTestCase):
+    async def start_server(self, handler):
+        self.connections = 0
+
+        async def counted(reader, writer):
+            self.connections += 1
+            await handler(reader, writer)
+
+        server = await asyncio.start_server(counted, "127.0.0.1", 0)
+        self.addAsyncCleanup(self.stop_server, server)
+        return server.sockets[0].getsockname()[1]
+
+    async def stop_server(self, server):
+        server.close()
+
+    async def reused_connection(self, transport: AsyncTransport, port: int) -> StreamConnection:
+        """A plain (non TLS) keep-alive connection that looks like it was used before."""
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        conn = StreamConnection(reader, writer)
+        conn.requests_sent = 1
+        transport._idle.append(conn)
+        return conn
+
+    async def test_connect_times_out(self):
+        async def silent(reader, writer):
+            await asyncio.sleep(5)
+
+        port = await self.start_server(silent)
+        transport = AsyncTransport("127.0.0.1", port, timeout=0.2)
+        with self.assertRaises(TimeoutError):
+            await transport.request("GET", "/", None, {})
+
+    async def test_response_times_out_and_connection_is_dropped(self):
+        async def silent(reader, writer):
+            await asyncio.sleep(5)
+
+        port = await self.start_server(silent)
+        transport = AsyncTransport("127.0.0.1", port, timeout=0.2)
+        conn = await self.reused_connection(transport, port)
+        with self.assertRaises(TimeoutError):
+            await transport.request("GET", "/", None, {})
+        self.assertNotIn(conn, transport._idle)
+        self.assertTrue(conn.writer.is_closing())
+
+    async def test_reads_response(self):
+        async def answer(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nhi")
+            await writer.drain()
+
+        port = await self.start_server(answer)
+        transport = AsyncTransport("127.0.0.1", port, timeout=1)
+        conn = await self.reused_connection(transport, port)
+        status, _, body = await transport.request("GET", "/", None, {})
+        self.assertEqual((status, body), (200, b"hi"))
+        self.assertIn(conn, transport._idle)
+
+    async def test_reads_chunked_response(self):
+        async def answer(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+                b"3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n"
+            )
+            await writer.drain()
+
+        port = await self.start_server(answer)
+        transport = AsyncTransport("127.0.0.1", port, timeout=1)
+        await self.reused_connection(transport, port)
+        _, _, body = await transport.request("GET", "/", None, {})
+        self.assertEqual(body, b"abcde")
+
+    async def close_after_request(self, reader, writer):
+        await reader.read(1024)  # the request, or the TLS hello of the replay
+        writer.close()
+
+    async def test_stale_post_is_not_replayed(self):
+        port = await self.start_server(self.close_after_request)
+        transport = AsyncTransport("127.0.0.1", port, timeout=1)
+        await self.reused_connection(transport, port)
+        with self.assertRaises((asyncio.IncompleteReadError, ConnectionError)):
+            await transport.request("POST", "/", b"{}", {})
+        self.assertEqual(self.connections, 1)
+
+    async def test_stale_get_is_replayed(self):
+        port = await self.start_server(self.close_after_request)
+        transport = AsyncTransport("127.0.0.1", port, timeout=1)
+        await self.reused_connection(transport, port)
+        # the replay opens a fresh (TLS) connection, which the plain server can't answer
+        with self.assertRaises(Exception):
+            await transport.request("GET", "/", None, {})
+        self.assertEqual(self.connections, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
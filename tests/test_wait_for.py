@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+
+from inkcord.dispatch import WaiterIndex
+from inkcord.http_gateway import AsyncClient
+from inkcord.shared_types import BitIntents
+
+
+class WaiterIndexTests(unittest.IsolatedAsyncioTestCase):
+    async def test_only_matching_keys_are_resolved(self):
+        index = WaiterIndex()
+        one = index.add("MESSAGE_CREATE", {"channel_id": 1, "author.id": 5})
+        two = index.add("on_message_create", {"channel_id": 2})
+        self.assertEqual(index.dispatch("MESSAGE_CREATE", {"channel_id": "1", "author": {"id": "6"}}), 0)
+        self.assertEqual(index.dispatch("MESSAGE_CREATE", {"channel_id": "1", "author": {"id": "5"}}), 1)
+        self.assertTrue(one.done())
+        self.assertFalse(two.done())
+        await asyncio.sleep(0)  # waiters are dropped by a done callback
+        self.assertEqual(len(index), 1)
+        two.cancel()
+        await asyncio.sleep(0)
+        self.assertEqual(len(index), 0)
+        self.assertFalse(index.waiting_for("MESSAGE_CREATE"))
+
+    async def test_check_runs_after_the_key(self):
+        index = WaiterIndex()
+        seen = []
+        waiter = index.add("MESSAGE_CREATE", {"channel_id": 1}, lambda d: seen.append(d["content"]) or d["content"] == "yes")
+        index.dispatch("MESSAGE_CREATE", {"channel_id": "2", "content": "other channel"})
+        index.dispatch("MESSAGE_CREATE", {"channel_id": "1", "content": "no"})
+        index.dispatch("MESSAGE_CREATE", {"channel_id": "1", "content": "yes"})
+        self.assertEqual(seen, ["no", "yes"])
+        self.assertEqual((await waiter)["content"], "yes")
+
+    async def test_a_failing_check_fails_the_waiter(self):
+        index = WaiterIndex()
+        waiter = index.add("MESSAGE_CREATE", check=lambda d: d["missing"])
+        index.dispatch("MESSAGE_CREATE", {})
+        with self.assertRaises(KeyError):
+            await waiter
+
+    async def test_timeout(self):
+        index = WaiterIndex()
+        with self.assertRaises(asyncio.TimeoutError):
+            await index.wait("MESSAGE_CREATE", timeout=0.01)
+        self.assertEqual(len(index), 0)
+
+
+class WaitForInHandlerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = AsyncClient("token", BitIntents.GUILD_MESSAGES, handler_workers=2, handler_queue=4)
+
+    async def asyncTearDown(self):
+        await self.client.handler_pool.close()
+        self.client.close()
+
+    def message(self, content):
+        return {"channel_id": "1", "author": {"id": "5"}, "content": content}
+
+    async def test_handler_waits_for_a_reply_in_its_own_channel(self):
+        replies = []
+        handled = []
+
+        async def on_message(data):
+            handled.append(data["content"])
+            if data["content"] == "question":
+                reply = await self.client.waiters.wait(
+                    "MESSAGE_CREATE",
+                    {"channel_id": data["channel_id"], "author.id": "5"},
+                    lambda d: d["content"] == "answer",
+                    timeout=5,
+                )
+                replies.append(reply["content"])
+
+        self.client.dispatcher.add("MESSAGE_CREATE", on_message)
+        await self.client._dispatch_event("MESSAGE_CREATE", self.message("question"))
+        await asyncio.sleep(0.01)
+        # way more events of the same channel than the queue holds, the reader must never get stuck on them
+        for n in range(20):
+            await asyncio.wait_for(self.client._dispatch_event("MESSAGE_CREATE", self.message(f"chatter {n}")), 1)
+        await asyncio.wait_for(self.client._dispatch_event("MESSAGE_CREATE", self.message("answer")), 1)
+        await asyncio.wait_for(self.client.handler_pool.join(), 1)
+        self.assertEqual(replies, ["answer"])
+        # the rest of the channel still ran in order
+        self.assertEqual(handled, ["question", *(f"chatter {n}" for n in range(20)), "answer"])
+        self.assertEqual(self.client.handler_pool.released, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
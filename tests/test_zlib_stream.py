@@ -0,0 +1,52 @@
+import json
+import zlib
+import unittest
+
+from inkcord.zlib_stream import ZLIB_SUFFIX, ZlibStreamDecompressor
+
+
+def gateway_stream(*messages):
+    """Compresses messages the way discord does: one zlib stream, every message ending in a sync flush."""
+    compressor = zlib.compressobj()
+    for message in messages:
+        yield compressor.compress(message) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class ZlibStreamTests(unittest.TestCase):
+    def test_whole_frames(self):
+        messages = [json.dumps({"op": 0, "s": n, "d": {"n": n}}).encode() for n in range(5)]
+        inflator = ZlibStreamDecompressor()
+        decoded = [inflator.feed(frame) for frame in gateway_stream(*messages)]
+        self.assertEqual(decoded, messages)
+
+    def test_messages_split_across_frames(self):
+        messages = [b"x" * 50_000 + bytes([n]) for n in range(3)]
+        inflator = ZlibStreamDecompressor()
+        decoded = []
+        for frame in gateway_stream(*messages):
+            self.assertTrue(frame.endswith(ZLIB_SUFFIX))
+            pieces = [frame[i : i + 7] for i in range(0, len(frame), 7)]
+            results = [inflator.feed(piece) for piece in pieces]
+            self.assertTrue(all(result is None for result in results[:-1]))
+            decoded.append(results[-1])
+        self.assertEqual(decoded, messages)
+
+    def test_context_carries_over_between_messages(self):
+        # the second message only makes sense with the first one's dictionary, so a fresh context can't decode it
+        first, second = gateway_stream(b"hello gateway " * 20, b"hello gateway " * 20)
+        inflator = ZlibStreamDecompressor()
+        inflator.feed(first)
+        self.assertEqual(inflator.feed(second), b"hello gateway " * 20)
+        with self.assertRaises(zlib.error):
+            ZlibStreamDecompressor().feed(second)
+
+    def test_ratio(self):
+        inflator = ZlibStreamDecompressor()
+        self.assertEqual(inflator.ratio, 1.0)
+        for frame in gateway_stream(b"a" * 10_000):
+            inflator.feed(frame)
+        self.assertGreater(inflator.ratio, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()